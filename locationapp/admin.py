@@ -1,6 +1,9 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Employee, Attendance, SalaryAdjustment
+from .models import (
+    Employee, Attendance, AttendanceSession, SalaryAdjustment, AttendanceMonthlySummary, Office, LocationPing,
+    PayrollRun, PayrollLine, Holiday, WorkCalendar,
+)
 
 
 @admin.register(Employee)
@@ -17,7 +20,7 @@ class EmployeeAdmin(admin.ModelAdmin):
             'classes': ('wide',)
         }),
         ('💼 Employment Details', {
-            'fields': ('is_manager', 'salary_type', 'monthly_salary', 'hourly_rate', 'standard_hours_per_day', 'salary'),
+            'fields': ('is_manager', 'office', 'salary_type', 'monthly_salary', 'hourly_rate', 'standard_hours_per_day', 'salary'),
         }),
         ('📍 Location & Status', {
             'fields': ('latitude', 'longitude', 'location_display', 'is_checked_in', 'last_location_update'),
@@ -67,21 +70,31 @@ class EmployeeAdmin(admin.ModelAdmin):
     location_display.short_description = 'Location Status'
 
 
+class AttendanceSessionInline(admin.TabularInline):
+    model = AttendanceSession
+    extra = 0
+    fields = ['check_in_time', 'check_out_time', 'office', 'auto_checkout', 'checkout_reason']
+
+
 @admin.register(Attendance)
 class AttendanceAdmin(admin.ModelAdmin):
     list_display = ['employee_link', 'date_display', 'status_display', 'time_display', 'hours_display', 'checkout_type']
     list_filter = ['status', 'date', 'auto_checkout']
     search_fields = ['employee__E_name', 'employee__E_id']
     ordering = ['-date', '-check_in_time']
-    readonly_fields = ['date', 'latitude', 'longitude', 'location_info', 'hours_worked_display', 'auto_checkout']
+    readonly_fields = [
+        'date', 'latitude', 'longitude', 'location_info', 'hours_worked_display', 'auto_checkout',
+        'check_in_time', 'check_out_time', 'worked_hours',
+    ]
     date_hierarchy = 'date'
+    inlines = [AttendanceSessionInline]
     
     fieldsets = (
         ('📋 Attendance Information', {
             'fields': ('employee', 'date', 'status'),
         }),
         ('⏰ Time Tracking', {
-            'fields': ('check_in_time', 'check_out_time', 'hours_worked_display', 'auto_checkout', 'checkout_reason'),
+            'fields': ('check_in_time', 'check_out_time', 'worked_hours', 'hours_worked_display', 'auto_checkout', 'checkout_reason'),
         }),
         ('⚙️ Manual Adjustment (HR Only)', {
             'fields': ('manual_hours', 'adjustment_reason'),
@@ -147,6 +160,11 @@ class AttendanceAdmin(admin.ModelAdmin):
         return f"{obj.hours_worked()} hours"
     hours_worked_display.short_description = 'Calculated Hours'
 
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # Check-in/out times and worked hours come from the sessions
+        form.instance.refresh_totals()
+
 
 @admin.register(SalaryAdjustment)
 class SalaryAdjustmentAdmin(admin.ModelAdmin):
@@ -187,6 +205,113 @@ class SalaryAdjustmentAdmin(admin.ModelAdmin):
     difference.short_description = 'Difference'
 
 
+@admin.register(Office)
+class OfficeAdmin(admin.ModelAdmin):
+    list_display = ['name', 'latitude', 'longitude', 'fence_display', 'is_active']
+    list_filter = ['is_active']
+    search_fields = ['name']
+
+    def fence_display(self, obj):
+        if obj.polygon:
+            return f"Polygon ({len(obj.polygon)} points)"
+        return f"{obj.radius_m:g} m radius"
+    fence_display.short_description = 'Geofence'
+
+
+@admin.register(LocationPing)
+class LocationPingAdmin(admin.ModelAdmin):
+    list_display = ['employee', 'recorded_at', 'latitude', 'longitude', 'samples']
+    list_filter = ['day']
+    search_fields = ['employee__E_name', 'employee__E_id']
+    list_select_related = ['employee']
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(AttendanceMonthlySummary)
+class AttendanceMonthlySummaryAdmin(admin.ModelAdmin):
+    list_display = ['employee', 'month_year', 'days_present', 'full_days', 'total_hours', 'regular_hours', 'overtime_hours', 'updated_on']
+    list_filter = ['year', 'month']
+    search_fields = ['employee__E_name', 'employee__E_id']
+    list_select_related = ['employee']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        # Maintained from Attendance; use rebuild_attendance_summary to fix drift
+        return False
+
+    def month_year(self, obj):
+        return f"{obj.month}/{obj.year}"
+    month_year.short_description = 'Period'
+
+
+class PayrollLineInline(admin.TabularInline):
+    model = PayrollLine
+    extra = 0
+    fields = ['E_id', 'E_name', 'salary_type', 'base_salary', 'overtime_pay', 'total_salary', 'total_hours', 'overtime_hours', 'days_present']
+    readonly_fields = fields
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(PayrollRun)
+class PayrollRunAdmin(admin.ModelAdmin):
+    list_display = ['month_year', 'status', 'progress_display', 'started_on', 'finished_on']
+    list_filter = ['status', 'year', 'month']
+    readonly_fields = ['year', 'month', 'status', 'total_employees', 'processed_employees', 'started_on', 'finished_on', 'error']
+    inlines = [PayrollLineInline]
+
+    def has_add_permission(self, request):
+        # Created by manage.py run_payroll
+        return False
+
+    def month_year(self, obj):
+        return f"{obj.month}/{obj.year}"
+    month_year.short_description = 'Period'
+
+    def progress_display(self, obj):
+        return f"{obj.processed_employees}/{obj.total_employees} ({obj.progress}%)"
+    progress_display.short_description = 'Progress'
+
+
+@admin.register(Holiday)
+class HolidayAdmin(admin.ModelAdmin):
+    list_display = ['date', 'name', 'office_display']
+    list_filter = ['office']
+    search_fields = ['name']
+    date_hierarchy = 'date'
+
+    def office_display(self, obj):
+        return obj.office or "All offices"
+    office_display.short_description = 'Office'
+
+
+@admin.register(WorkCalendar)
+class WorkCalendarAdmin(admin.ModelAdmin):
+    list_display = ['month_year', 'office', 'working_days', 'holidays', 'computed_on']
+    list_filter = ['year', 'office']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        # Computed from Holiday rows; deleting one only makes it recomputed
+        return False
+
+    def month_year(self, obj):
+        return f"{obj.month}/{obj.year}"
+    month_year.short_description = 'Period'
+
+
 class CustomAdmin(admin.ModelAdmin):
     class Media:
         css = {
@@ -0,0 +1,252 @@
+from datetime import date
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import Employee, Attendance, AttendanceSession
+from .work_calendar import WEEKLY_OFF, is_holiday, month_calendar, working_days
+
+
+# ========================= ATTENDANCE CALENDAR =========================
+
+def _day_statuses(employee_ids, year, month):
+    """Attendance status per (employee, day) for one month (one row per day)"""
+    return Attendance.objects.filter(
+        employee_id__in=employee_ids, date__year=year, date__month=month,
+    ).values_list('employee_id', 'date', 'status')
+
+
+def build_attendance_maps(employees, year, month, total_days=None):
+    """
+    Build {employee_id: {day: status}} calendars for many employees at once.
+    Working days without a record are reported as "Absent"; Sundays and
+    holidays (company-wide and of the employee's office) without one are
+    left out. Employees given as ids use the company calendar.
+    """
+    if total_days is None:
+        total_days = month_calendar(year, month).days_in_month
+
+    offices = {e: None for e in employees if isinstance(e, int)}
+    offices.update({e.pk: e.office_id for e in employees if not isinstance(e, int)})
+    employee_ids = list(offices)
+    absent = {}
+    for office_id in set(offices.values()):
+        calendar = month_calendar(year, month, office_id)
+        absent[office_id] = {day: "Absent" for day in range(1, total_days + 1) if calendar.is_working_day(day)}
+    maps = {emp_id: dict(absent[office_id]) for emp_id, office_id in offices.items()}
+
+    for emp_id, day_date, status in _day_statuses(employee_ids, year, month):
+        if day_date.day <= total_days:
+            maps[emp_id][day_date.day] = status
+
+    return maps
+
+
+def build_attendance_map(employee, year=None, month=None, total_days=None):
+    """Build the {day: status} calendar of one employee for a month"""
+    today = date.today()
+    year = year or today.year
+    month = month or today.month
+    return build_attendance_maps([employee], year, month, total_days)[employee.pk]
+
+
+# ========================= CHECK-IN / CHECK-OUT =========================
+
+def record_check_in(employee, when=None, office=None, latitude=None, longitude=None):
+    """
+    Open a session on the employee's row for today, creating the row on the
+    first check-in of the day. Checking in while a session is already open
+    (also one opened by a concurrent check-in) does nothing.
+    Returns (attendance, session, opened).
+    """
+    when = when or timezone.now()
+    today = date.today()
+    with transaction.atomic():
+        attendance, created = Attendance.objects.get_or_create(
+            employee=employee, date=today,
+            defaults={
+                'status': 'Present',
+                'office': office,
+                'latitude': latitude,
+                'longitude': longitude,
+                'check_in_time': when,
+                'checkout_reason': 'Manual check-in',
+                'is_sunday': today.weekday() == WEEKLY_OFF,
+                'is_holiday': is_holiday(today, office),
+            },
+        )
+        if not created:
+            # Lock the day row: a concurrent check-in waits here, then finds this one's session
+            attendance = Attendance.objects.select_for_update().get(pk=attendance.pk)
+            open_session = attendance.sessions.filter(check_out_time__isnull=True).last()
+            if open_session:
+                return attendance, open_session, False
+
+        try:
+            with transaction.atomic():
+                session = AttendanceSession.objects.create(
+                    attendance=attendance, office=office, check_in_time=when, latitude=latitude, longitude=longitude,
+                )
+        except IntegrityError:
+            # attsession_one_open: a check-in that did not wait on the lock (the
+            # day's first, or no row locks on SQLite) opened the session first
+            return attendance, attendance.sessions.get(check_out_time__isnull=True), False
+        if not created:
+            # Back after a checkout (or marked absent): the day is open again
+            fields = ['status', 'check_in_time', 'check_out_time', 'auto_checkout', 'checkout_reason']
+            if attendance.check_in_time is None:
+                # A materialized Absent row: this is the day's first check-in
+                attendance.office = office
+                attendance.latitude = latitude
+                attendance.longitude = longitude
+                attendance.is_sunday = today.weekday() == WEEKLY_OFF
+                attendance.is_holiday = is_holiday(today, office)
+                fields += ['office', 'latitude', 'longitude', 'is_sunday', 'is_holiday']
+            attendance.status = 'Present'
+            attendance.check_out_time = None
+            attendance.auto_checkout = False
+            attendance.checkout_reason = 'Manual check-in'
+            attendance.check_in_time = attendance.check_in_time or when
+            attendance.save(update_fields=fields)
+    return attendance, session, True
+
+
+def record_check_out(employee, when=None, auto=False, reason="Manual checkout"):
+    """
+    Close the employee's open session of today and refresh the day totals.
+    Returns the Attendance row, or None if nothing was open.
+    """
+    when = when or timezone.now()
+    with transaction.atomic():
+        attendance = Attendance.objects.filter(employee=employee, date=date.today()).first()
+        if attendance is None:
+            return None
+        session = attendance.sessions.filter(check_out_time__isnull=True).last()
+        if session is not None:
+            session.check_out_time = when
+            session.auto_checkout = auto
+            session.checkout_reason = reason
+            session.save(update_fields=['check_out_time', 'auto_checkout', 'checkout_reason'])
+        elif attendance.check_in_time and not attendance.check_out_time and not attendance.sessions.exists():
+            # Day opened without a session: close the row itself
+            attendance.check_out_time = when
+        else:
+            return None
+
+        attendance.auto_checkout = auto
+        attendance.checkout_reason = reason
+        attendance.refresh_totals()
+    return attendance
+
+
+# ========================= ABSENCE MARKING =========================
+
+def mark_absences(start, end=None, batch_size=2000):
+    """
+    Insert an "Absent" row for every employee without a row on each
+    working day of [start, end] (company calendar and the holidays of the
+    employee's office; days before the employee's account was created are
+    skipped).
+
+    Per day, one query reads who already has a row; the missing rows are
+    written with bulk_create(ignore_conflicts=True) against the
+    one-row-per-day constraint, so reruns and a check-in racing the job
+    are harmless. A later check-in turns the row back to "Present".
+    Absent rows add nothing to monthly summaries or payroll, so no cache
+    needs refreshing. Returns the number of Absent rows written.
+    """
+    end = end or start
+    employees = [
+        (emp_id, office_id, timezone.localdate(joined) if joined else None)
+        for emp_id, office_id, joined in Employee.objects.values_list('id', 'office_id', 'user__date_joined')
+    ]
+    office_holidays = {
+        office_id: set(working_days(start, end)) - set(working_days(start, end, office_id))
+        for office_id in {office_id for _, office_id, _ in employees if office_id is not None}
+    }
+
+    inserted = 0
+    pending = []
+    for day in working_days(start, end):
+        present = set(Attendance.objects.filter(date=day).values_list('employee_id', flat=True))
+        pending.extend(
+            Attendance(employee_id=emp_id, date=day, status='Absent')
+            for emp_id, office_id, joined in employees
+            if emp_id not in present and (joined is None or joined <= day)
+            and day not in office_holidays.get(office_id, ())
+        )
+        if len(pending) >= batch_size:
+            inserted += len(Attendance.objects.bulk_create(pending, batch_size=batch_size, ignore_conflicts=True))
+            pending = []
+    if pending:
+        inserted += len(Attendance.objects.bulk_create(pending, batch_size=batch_size, ignore_conflicts=True))
+    return inserted
+
+
+# ========================= MANAGER DASHBOARD QUERIES =========================
+
+ATTENDANCE_PAGE_SIZE = 50
+
+
+def employees_with_counts(employees=None):
+    """Annotate every employee with present/absent counts in one grouped query"""
+    if employees is None:
+        employees = Employee.objects.all()
+    return employees.annotate(
+        present_count=Count('attendance', filter=Q(attendance__status='Present')),
+        absent_count=Count('attendance', filter=Q(attendance__status='Absent')),
+    ).order_by('id')
+
+
+def attendance_totals(queryset=None):
+    """Total, present and absent record counts in one aggregate query"""
+    if queryset is None:
+        queryset = Attendance.objects.all()
+    return queryset.aggregate(
+        total_records=Count('id'),
+        total_present=Count('id', filter=Q(status='Present')),
+        total_absent=Count('id', filter=Q(status='Absent')),
+    )
+
+
+def filter_attendance(queryset, date_from=None, date_to=None, E_id=None):
+    """Apply the dashboard's optional date range and employee filters"""
+    if date_from:
+        queryset = queryset.filter(date__gte=date_from)
+    if date_to:
+        queryset = queryset.filter(date__lte=date_to)
+    if E_id:
+        queryset = queryset.filter(employee__E_id=E_id)
+    return queryset
+
+
+def _parse_cursor(cursor):
+    try:
+        day, pk = cursor.split(':')
+        return date.fromisoformat(day), int(pk)
+    except (AttributeError, ValueError):
+        return None
+
+
+def attendance_page(queryset, cursor=None, page_size=ATTENDANCE_PAGE_SIZE):
+    """
+    Keyset pagination over attendance, newest first.
+    The cursor is "<date>:<id>" of the last row of the previous page, so
+    each page is an index range scan instead of an ever growing OFFSET.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    queryset = queryset.select_related('employee').order_by('-date', '-id')
+
+    position = _parse_cursor(cursor)
+    if position:
+        last_date, last_id = position
+        queryset = queryset.filter(Q(date__lt=last_date) | Q(date=last_date, id__lt=last_id))
+
+    rows = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = f"{rows[-1].date.isoformat()}:{rows[-1].id}"
+
+    return rows, next_cursor
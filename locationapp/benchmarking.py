@@ -0,0 +1,76 @@
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+
+
+# ========================= BENCHMARK HELPERS =========================
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def summarize(samples):
+    """Latency summary in milliseconds for a list of durations in seconds"""
+    ms = [s * 1000 for s in samples]
+    return {
+        'count': len(ms),
+        'mean_ms': round(sum(ms) / len(ms), 3) if ms else 0.0,
+        'p50_ms': round(percentile(ms, 50), 3),
+        'p95_ms': round(percentile(ms, 95), 3),
+        'p99_ms': round(percentile(ms, 99), 3),
+        'max_ms': round(max(ms), 3) if ms else 0.0,
+    }
+
+
+def time_calls(fn, repeat):
+    """Call fn() repeat times and return the duration of each call"""
+    durations = []
+    for i in range(repeat):
+        started = time.perf_counter()
+        fn(i)
+        durations.append(time.perf_counter() - started)
+    return durations
+
+
+def write_results(path, results):
+    """Save benchmark results as JSON so runs can be compared"""
+    with open(path, 'w') as fh:
+        json.dump(results, fh, indent=2, default=str)
+
+
+def is_throwaway_database():
+    """True for a test or temporary database, which synthetic load may be written to"""
+    name = str(connection.settings_dict['NAME'])
+    return os.path.basename(name).startswith('test_') or name.startswith(tempfile.gettempdir())
+
+
+def default_benchmark_db(name):
+    """Default SQLite file for a benchmark database"""
+    return os.path.join(tempfile.gettempdir(), f'{name}.sqlite3')
+
+
+@contextmanager
+def benchmark_database(db_name=None, keepdb=False):
+    """
+    Run a benchmark against a freshly migrated throwaway database, using
+    Django's test database machinery so the real data is never touched.
+    On SQLite the database is a file (db_name) so threads can share it.
+    """
+    old_name = connection.settings_dict['NAME']
+    if connection.vendor == 'sqlite' and db_name:
+        connection.settings_dict['TEST']['NAME'] = db_name
+
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=keepdb)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keepdb)
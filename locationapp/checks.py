@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+
+# ========================= SYSTEM CHECKS =========================
+
+# Settings naming the cache that holds cross-worker version stamps
+SHARED_CACHE_SETTINGS = (
+    ('PERMISSION_CACHE_ALIAS', 'revoked permissions keep being granted'),
+    ('EMPLOYEE_SESSION_CACHE_ALIAS', 'request.employee keeps stale profile data'),
+    ('PAYROLL_CACHE_VERSION_ALIAS', 'salary pages keep showing stale results'),
+)
+
+PER_PROCESS_BACKENDS = ('django.core.cache.backends.locmem.LocMemCache',)
+DATABASE_BACKENDS = ('django.core.cache.backends.db.DatabaseCache',)
+
+
+@register('caches')
+def check_shared_caches(app_configs, **kwargs):
+    """Version stamps in a per-process cache are not seen by the other workers"""
+    warnings = []
+    for setting, consequence in SHARED_CACHE_SETTINGS:
+        alias = getattr(settings, setting, 'default')
+        backend = settings.CACHES.get(alias, {}).get('BACKEND')
+        if backend in PER_PROCESS_BACKENDS:
+            warnings.append(Warning(
+                f"{setting} = {alias!r} is a per-process cache ({backend.rpartition('.')[2]}).",
+                hint=(
+                    f"With several worker processes, {consequence} in the workers that did not make "
+                    "the change until the entry expires. Point it at a shared cache (database, Redis, Memcached)."
+                ),
+                id='locationapp.W001',
+            ))
+    return warnings
+
+
+@register('caches', deploy=True)
+def check_database_shared_caches(app_configs, **kwargs):
+    """Stamps in a database cache cost a query on every read"""
+    aliases = {getattr(settings, setting, 'default') for setting, _ in SHARED_CACHE_SETTINGS}
+    return [
+        Warning(
+            f"The {alias!r} cache holding version stamps is a database table.",
+            hint=(
+                "Every authenticated request reads the employee version stamp and the permission "
+                "snapshot from it, a query each, and stamp bumps are writes. Set SHARED_CACHE_URL "
+                "to a Redis or Memcached server."
+            ),
+            id='locationapp.W002',
+        )
+        for alias in sorted(aliases)
+        if settings.CACHES.get(alias, {}).get('BACKEND') in DATABASE_BACKENDS
+    ]
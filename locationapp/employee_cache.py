@@ -0,0 +1,182 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.http import Http404
+
+from .models import Employee
+
+
+# ========================= E_ID LOOKUP CACHE =========================
+
+# Fields kept in the cache. The location fields change on every ping
+# (bulk_update, no signals) and is_checked_in on every check-in and
+# checkout, also from other processes: they are left out, stay deferred
+# on the instances built from a record and load fresh on first access.
+RECORD_FIELDS = (
+    'id', 'user_id', 'E_id', 'E_name', 'salary_type', 'monthly_salary', 'hourly_rate',
+    'standard_hours_per_day', 'overtime_rate_multiplier', 'salary', 'is_manager', 'office_id',
+)
+VOLATILE_FIELDS = frozenset({'latitude', 'longitude', 'last_location_update', 'is_checked_in'})
+
+EmployeeRecord = namedtuple('EmployeeRecord', RECORD_FIELDS)
+
+# Cached "no such E_id" marker, so repeated lookups of unknown ids stay cheap
+_MISSING = 'missing'
+
+
+class EmployeeCache:
+    """
+    Maps E_id to an EmployeeRecord: a bounded per-process LRU, optionally
+    backed by a shared Django cache (e.g. Redis/Memcached) so workers share
+    their misses.
+
+    Entries are dropped by the Employee post_save/post_delete signals of
+    this process. Other processes only see the change in the shared tier,
+    so local entries also expire after `ttl` seconds.
+    """
+
+    def __init__(self, maxsize=10000, ttl=300, shared_alias=None, shared_ttl=3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.shared_alias = shared_alias
+        self.shared_ttl = shared_ttl
+        self._entries = OrderedDict()
+        self._keys_by_pk = {}
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.shared_hits = 0
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias] if self.shared_alias else None
+
+    def _shared_key(self, E_id):
+        return f"employee:eid:{E_id}"
+
+    # ---- local tier ----
+
+    def _local_get(self, E_id):
+        """(found, record) from the LRU; never touches the database"""
+        with self._lock:
+            entry = self._entries.get(E_id)
+            if entry is None:
+                return False, None
+            expires, record = entry
+            if expires < time.monotonic():
+                self._drop(E_id)
+                return False, None
+            self._entries.move_to_end(E_id)
+            self.hits += 1
+            return True, record
+
+    def _local_set(self, E_id, record):
+        with self._lock:
+            self._entries[E_id] = (time.monotonic() + self.ttl, record)
+            self._entries.move_to_end(E_id)
+            if record is not None:
+                self._keys_by_pk[record.id] = E_id
+            while len(self._entries) > self.maxsize:
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, E_id):
+        # Caller holds the lock
+        expires, record = self._entries.pop(E_id, (None, None))
+        if record is not None and self._keys_by_pk.get(record.id) == E_id:
+            del self._keys_by_pk[record.id]
+
+    # ---- lookups ----
+
+    def get(self, E_id):
+        """EmployeeRecord for E_id, or None if there is no such employee"""
+        if not E_id:
+            return None
+        found, record = self._local_get(E_id)
+        if found:
+            return record
+
+        shared = self.shared
+        if shared is not None:
+            values = shared.get(self._shared_key(E_id))
+            # Entries written with another RECORD_FIELDS layout are misses
+            if values is not None and (values == _MISSING or len(values) == len(RECORD_FIELDS)):
+                self.shared_hits += 1
+                record = None if values == _MISSING else EmployeeRecord(*values)
+                self._local_set(E_id, record)
+                return record
+
+        self.misses += 1
+        values = Employee.objects.filter(E_id=E_id).values_list(*RECORD_FIELDS).first()
+        record = EmployeeRecord(*values) if values else None
+        self._local_set(E_id, record)
+        if shared is not None:
+            shared.set(self._shared_key(E_id), values or _MISSING, self.shared_ttl)
+        return record
+
+    async def aget(self, E_id):
+        """get() for async views: a local hit needs no thread"""
+        found, record = self._local_get(E_id) if E_id else (True, None)
+        if found:
+            return record
+        return await sync_to_async(self.get)(E_id)
+
+    # ---- invalidation ----
+
+    def invalidate(self, E_id=None, pk=None):
+        """Forget an employee by E_id and/or pk (covers a changed E_id)"""
+        keys = {E_id} if E_id else set()
+        with self._lock:
+            if pk is not None and pk in self._keys_by_pk:
+                keys.add(self._keys_by_pk[pk])
+            for key in keys:
+                self._drop(key)
+        shared = self.shared
+        if shared is not None and keys:
+            shared.delete_many([self._shared_key(key) for key in keys])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_pk.clear()
+
+    def stats(self):
+        lookups = self.hits + self.shared_hits + self.misses
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'shared_hits': self.shared_hits,
+            'misses': self.misses,
+            'hit_rate': round((self.hits + self.shared_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+employee_cache = EmployeeCache(
+    maxsize=getattr(settings, 'EMPLOYEE_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'EMPLOYEE_CACHE_TTL', 300),
+    shared_alias=getattr(settings, 'EMPLOYEE_CACHE_SHARED_ALIAS', None),
+)
+
+
+def employee_from_record(record):
+    """Employee instance for a cached record; the location fields load lazily"""
+    values = record._asdict()
+    # from_db expects the values in model field order
+    ordered = [f.attname for f in Employee._meta.concrete_fields if f.attname in values]
+    return Employee.from_db('default', ordered, [values[name] for name in ordered])
+
+
+def get_employee(E_id):
+    """Cached Employee.objects.get(E_id=...): raises Employee.DoesNotExist the same way"""
+    record = employee_cache.get(E_id)
+    if record is None:
+        raise Employee.DoesNotExist(f"No employee with E_id {E_id!r}")
+    return employee_from_record(record)
+
+
+def get_employee_or_404(E_id):
+    try:
+        return get_employee(E_id)
+    except Employee.DoesNotExist:
+        raise Http404("Employee not found")
@@ -0,0 +1,105 @@
+import csv
+from itertools import islice
+
+from django.utils import timezone
+
+from .models import Employee
+from .payroll import month_payroll
+
+
+# ========================= STREAMING CSV EXPORTS =========================
+
+EXPORT_CHUNK_SIZE = 2000
+
+ATTENDANCE_COLUMNS = [
+    ('E_id', 'employee__E_id'),
+    ('Name', 'employee__E_name'),
+    ('Date', 'date'),
+    ('Status', 'status'),
+    ('Office', 'office__name'),
+    ('Check-in', 'check_in_time'),
+    ('Check-out', 'check_out_time'),
+    ('Worked hours', 'worked_hours'),
+    ('Manual hours', 'manual_hours'),
+    ('Hours', 'hours'),
+    ('Overtime hours', 'overtime'),
+    ('Sunday', 'is_sunday'),
+    ('Holiday', 'is_holiday'),
+    ('Auto checkout', 'auto_checkout'),
+    ('Checkout reason', 'checkout_reason'),
+]
+
+PAYROLL_COLUMNS = [
+    ('E_id', 'E_id'),
+    ('Name', 'E_name'),
+    ('Salary type', 'salary_type'),
+    ('Days present', 'total_days_present'),
+    ('Full days', 'full_days_worked'),
+    ('Sundays/holidays', 'sunday_count'),
+    ('Total hours', 'total_hours'),
+    ('Regular hours', 'total_regular_hours'),
+    ('Overtime hours', 'overtime_hours'),
+    ('Hourly rate', 'hourly_rate'),
+    ('Base salary', 'base_salary'),
+    ('Overtime pay', 'overtime_pay'),
+    ('Calculated salary', 'total_salary'),
+    ('Final salary', 'final_salary'),
+]
+
+
+class _Echo:
+    """csv.writer target that hands each row back instead of buffering it"""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(header, rows, batch=500):
+    """Encode rows as CSV for a StreamingHttpResponse, `batch` lines per chunk sent"""
+    writer = csv.writer(_Echo())
+    lines = [writer.writerow(header)]
+    for row in rows:
+        lines.append(writer.writerow(row))
+        if len(lines) >= batch:
+            yield ''.join(lines)
+            lines = []
+    if lines:
+        yield ''.join(lines)
+
+
+def _local(value):
+    return timezone.localtime(value).strftime('%Y-%m-%d %H:%M:%S') if value else ''
+
+
+def attendance_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Attendance rows as tuples, oldest first. values_list + iterator: rows
+    are fetched chunk_size at a time and no model instance is built, so
+    memory stays flat however many rows are exported.
+    """
+    fields = [field for _, field in ATTENDANCE_COLUMNS]
+    check_in, check_out = fields.index('check_in_time'), fields.index('check_out_time')
+    rows = (
+        queryset.with_hours().with_overtime()
+        .order_by('date', 'id')
+        .values_list(*fields)
+        .iterator(chunk_size=chunk_size)
+    )
+    for row in rows:
+        row = list(row)
+        row[check_in], row[check_out] = _local(row[check_in]), _local(row[check_out])
+        yield row
+
+
+def payroll_rows(month, year, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    One row per employee, as on the salary overview (payroll run snapshot
+    or live figures), computed chunk_size employees at a time.
+    """
+    employees = Employee.objects.order_by('pk').iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(employees, chunk_size))
+        if not chunk:
+            return
+        for line in month_payroll(chunk, month, year).values():
+            yield [line[key] for _, key in PAYROLL_COLUMNS]
@@ -0,0 +1,266 @@
+import threading
+import time
+from collections import namedtuple
+from math import cos, floor, radians
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+try:
+    import numpy as np
+except ImportError:  # optional, only needed for batch audits
+    np = None
+
+from .models import Office, calculate_distance, OFFICE_LAT, OFFICE_LON, OFFICE_RADIUS_M
+
+
+# ========================= GEOFENCE ENGINE =========================
+
+METERS_PER_DEGREE = 111320
+
+# office: the matched (or nearest) Office; distance: meters to its reference point
+GeofenceMatch = namedtuple('GeofenceMatch', ['office', 'distance', 'inside'])
+
+
+def point_in_polygon(lat, lon, polygon):
+    """Ray casting test for a [[lat, lon], ...] polygon"""
+    inside = False
+    n = len(polygon)
+    for i in range(n):
+        lat1, lon1 = polygon[i]
+        lat2, lon2 = polygon[(i + 1) % n]
+        if (lon1 > lon) != (lon2 > lon):
+            crossing = lat1 + (lon - lon1) * (lat2 - lat1) / (lon2 - lon1)
+            if lat < crossing:
+                inside = not inside
+    return inside
+
+
+def office_contains(office, lat, lon, distance=None):
+    """True if (lat, lon) is inside the office geofence"""
+    if office.polygon:
+        return point_in_polygon(lat, lon, office.polygon)
+    if distance is None:
+        distance = calculate_distance(lat, lon, office.latitude, office.longitude)
+    return distance <= office.radius_m
+
+
+def office_bounds(office):
+    """(min_lat, min_lon, max_lat, max_lon) of the office geofence"""
+    if office.polygon:
+        lats = [p[0] for p in office.polygon]
+        lons = [p[1] for p in office.polygon]
+        return min(lats), min(lons), max(lats), max(lons)
+    dlat = office.radius_m / METERS_PER_DEGREE
+    dlon = office.radius_m / (METERS_PER_DEGREE * max(cos(radians(office.latitude)), 1e-6))
+    return office.latitude - dlat, office.longitude - dlon, office.latitude + dlat, office.longitude + dlon
+
+
+class GeofenceIndex:
+    """
+    Uniform grid over lat/lon: each office is registered in every cell its
+    fence overlaps, so a lookup only measures the offices of one cell
+    instead of scanning every site.
+    """
+
+    def __init__(self, offices, cell_deg=0.01, max_rings=3):
+        self.offices = list(offices)
+        self.cell_deg = cell_deg
+        self.max_rings = max_rings
+        self.cells = {}
+        for office in self.offices:
+            min_lat, min_lon, max_lat, max_lon = office_bounds(office)
+            lat_lo, lon_lo = self._cell(min_lat, min_lon)
+            lat_hi, lon_hi = self._cell(max_lat, max_lon)
+            cells = {(i, j) for i in range(lat_lo, lat_hi + 1) for j in range(lon_lo, lon_hi + 1)}
+            # Distances are measured to the reference point: its cell must hold
+            # the office too, or the ring search below could miss it
+            cells.add(self._cell(office.latitude, office.longitude))
+            for cell in cells:
+                self.cells.setdefault(cell, []).append(office)
+
+    def _cell(self, lat, lon):
+        return floor(lat / self.cell_deg), floor(lon / self.cell_deg)
+
+    def _nearest(self, lat, lon, offices):
+        best = None
+        for office in offices:
+            distance = calculate_distance(lat, lon, office.latitude, office.longitude)
+            if best is None or distance < best[1]:
+                best = (office, distance)
+        return best
+
+    def locate(self, lat, lon):
+        """Office whose fence contains the point, else the nearest office"""
+        i, j = self._cell(lat, lon)
+
+        matches = []
+        for office in self.cells.get((i, j), ()):
+            distance = calculate_distance(lat, lon, office.latitude, office.longitude)
+            if office_contains(office, lat, lon, distance):
+                matches.append((distance, office))
+        if matches:
+            distance, office = min(matches, key=lambda m: m[0])
+            return GeofenceMatch(office, distance, True)
+
+        # Outside every fence: look for the nearest office in growing rings of
+        # cells. A candidate is only final once it is closer than anything
+        # outside the searched square could be; otherwise keep widening, and
+        # fall back to a scan of every office for points far from any site.
+        seen = {}
+        for ring in range(0, self.max_rings + 1):
+            for di in range(-ring, ring + 1):
+                for dj in range(-ring, ring + 1):
+                    if max(abs(di), abs(dj)) == ring:
+                        for o in self.cells.get((i + di, j + dj), ()):
+                            seen[id(o)] = o
+            if len(seen) == len(self.offices):
+                break
+            if seen:
+                office, distance = self._nearest(lat, lon, seen.values())
+                if distance <= self._searched_radius(lat, ring):
+                    return GeofenceMatch(office, distance, False)
+
+        office, distance = self._nearest(lat, lon, self.offices)
+        return GeofenceMatch(office, distance, False)
+
+    def _searched_radius(self, lat, ring):
+        """Meters from a point to the nearest cell outside the `ring` cells around its own"""
+        # Cells are narrowest (in meters) on their side farthest from the equator
+        widest_lat = min(90.0, abs(lat) + (ring + 1) * self.cell_deg)
+        return ring * self.cell_deg * METERS_PER_DEGREE * cos(radians(widest_lat))
+
+
+# ========================= BATCH (NUMPY) GEOFENCE CHECKS =========================
+
+EARTH_RADIUS_M = 6371000
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("NumPy is required for batch geofence checks (pip install numpy)")
+
+
+def haversine_many(lats, lons, lat0, lon0):
+    """Vectorized calculate_distance: meters from each point to (lat0, lon0)"""
+    _require_numpy()
+    lat1 = np.radians(np.asarray(lats, dtype=np.float64))
+    lon1 = np.radians(np.asarray(lons, dtype=np.float64))
+    lat2, lon2 = np.radians(lat0), np.radians(lon0)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return EARTH_RADIUS_M * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def points_in_polygon_many(lats, lons, polygon):
+    """Vectorized point_in_polygon over arrays of points"""
+    _require_numpy()
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    inside = np.zeros(lats.shape, dtype=bool)
+    n = len(polygon)
+    for i in range(n):
+        lat1, lon1 = polygon[i]
+        lat2, lon2 = polygon[(i + 1) % n]
+        if lon1 == lon2:
+            continue
+        crosses = (lon1 > lons) != (lon2 > lons)
+        crossing = lat1 + (lons - lon1) * (lat2 - lat1) / (lon2 - lon1)
+        inside ^= crosses & (lats < crossing)
+    return inside
+
+
+def office_contains_many(office, lats, lons, distances=None):
+    """Vectorized office_contains; returns a boolean array"""
+    if office.polygon:
+        return points_in_polygon_many(lats, lons, office.polygon)
+    if distances is None:
+        distances = haversine_many(lats, lons, office.latitude, office.longitude)
+    return distances <= office.radius_m
+
+
+def fence_check_many(lats, lons, offices, office_ids=None):
+    """
+    Check arrays of points against the office geofences.
+    A point whose office_ids entry names one of `offices` must lie inside
+    that office's fence; any other point may lie inside any fence.
+    Returns (inside, nearest_index, nearest_distance); nearest_index
+    indexes into `offices`. Memory stays O(points) whatever the office count.
+    """
+    _require_numpy()
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    if office_ids is None:
+        office_ids = np.full(lats.shape, -1, dtype=np.int64)
+    office_ids = np.asarray(office_ids, dtype=np.int64)
+
+    inside_any = np.zeros(lats.shape, dtype=bool)
+    inside_own = np.zeros(lats.shape, dtype=bool)
+    has_known_office = np.zeros(lats.shape, dtype=bool)
+    nearest_index = np.zeros(lats.shape, dtype=np.int64)
+    nearest_distance = np.full(lats.shape, np.inf)
+
+    for k, office in enumerate(offices):
+        distances = haversine_many(lats, lons, office.latitude, office.longitude)
+        inside = office_contains_many(office, lats, lons, distances)
+        inside_any |= inside
+        if office.pk is not None:
+            own = office_ids == office.pk
+            has_known_office |= own
+            inside_own |= own & inside
+        closer = distances < nearest_distance
+        nearest_index[closer] = k
+        nearest_distance[closer] = distances[closer]
+
+    inside = np.where(has_known_office, inside_own, inside_any)
+    return inside, nearest_index, nearest_distance
+
+
+def default_office():
+    """Unsaved office for the hard-coded coordinates, used when none is configured"""
+    return Office(name="Office", latitude=OFFICE_LAT, longitude=OFFICE_LON, radius_m=OFFICE_RADIUS_M)
+
+
+_index = None
+_built_at = 0
+_lock = threading.Lock()
+
+
+def _cached_index():
+    """The current index if it is still fresh, else None (never queries)"""
+    refresh = getattr(settings, 'GEOFENCE_REFRESH_SECONDS', 60)
+    if _index is not None and time.monotonic() - _built_at <= refresh:
+        return _index
+    return None
+
+
+def get_geofence_index():
+    """
+    Per-process index of the active offices. Rebuilt when an Office changes
+    in this process (signals) or after GEOFENCE_REFRESH_SECONDS for changes
+    made elsewhere.
+    """
+    global _index, _built_at
+    with _lock:
+        if _cached_index() is None:
+            offices = list(Office.objects.filter(is_active=True)) or [default_office()]
+            _index = GeofenceIndex(offices, cell_deg=getattr(settings, 'GEOFENCE_CELL_DEGREES', 0.01))
+            _built_at = time.monotonic()
+        return _index
+
+
+def invalidate_geofence_index():
+    global _index
+    with _lock:
+        _index = None
+
+
+def locate_office(lat, lon):
+    return get_geofence_index().locate(lat, lon)
+
+
+async def alocate_office(lat, lon):
+    """Async locate_office: only touches the database when the index must be rebuilt"""
+    index = _cached_index()
+    if index is None:
+        index = await sync_to_async(get_geofence_index)()
+    return index.locate(lat, lon)
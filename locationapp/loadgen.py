@@ -0,0 +1,280 @@
+import asyncio
+import http.client
+import re
+import time
+from datetime import timedelta
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.models import Session
+from django.utils import timezone
+from django.utils.crypto import get_random_string
+
+from .models import Employee, OFFICE_LAT, OFFICE_LON
+
+
+# ========================= LOAD GENERATION HELPERS =========================
+
+# Fixed CSRF secret sent as both cookie and header so POSTs pass CsrfViewMiddleware
+CSRF_TOKEN = 'loadgen' + 'x' * 25
+
+
+def raise_fd_limit(wanted):
+    """Raise the open-file limit so thousands of sockets can be held open"""
+    try:
+        import resource
+    except ImportError:  # not available on Windows
+        return None
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    target = min(max(soft, wanted), hard) if hard != resource.RLIM_INFINITY else max(soft, wanted)
+    if target > soft:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+    return target
+
+
+def ensure_synthetic_employees(count, prefix='load', is_manager=False):
+    """
+    Create (or reuse) `count` checked-in employees with users named
+    <prefix>000000... Returns the users ordered by username.
+    """
+    id_prefix = 'M' if is_manager else 'L'
+    existing = set(
+        User.objects.filter(username__startswith=prefix).values_list('username', flat=True)
+    )
+    User.objects.bulk_create(
+        [
+            User(username=f"{prefix}{i:06d}", password='!')
+            for i in range(count) if f"{prefix}{i:06d}" not in existing
+        ],
+        batch_size=1000,
+    )
+    users = list(User.objects.filter(username__startswith=prefix).order_by('username')[:count])
+    with_employee = set(Employee.objects.filter(user__in=users).values_list('user_id', flat=True))
+    Employee.objects.bulk_create(
+        [
+            Employee(
+                user=u, E_id=f"{id_prefix}{u.username[len(prefix):]}", E_name=f"Load {u.username}",
+                is_checked_in=True, is_manager=is_manager,
+            )
+            for u in users if u.pk not in with_employee
+        ],
+        batch_size=1000,
+    )
+    return users
+
+
+def delete_synthetic_employees(prefix='load'):
+    """
+    Delete the users made by ensure_synthetic_employees(prefix) (exactly
+    <prefix> + 6 digits) with their employees and attendance (cascade)
+    """
+    return User.objects.filter(username__regex=rf'^{re.escape(prefix)}[0-9]{{6}}$').delete()[0]
+
+
+def set_password(users, password):
+    """Give every user the same password, hashed once (a real login still checks it)"""
+    User.objects.filter(pk__in=[u.pk for u in users]).update(password=make_password(password))
+
+
+def create_sessions(users, lifetime=timedelta(hours=2)):
+    """Log every user in by writing database sessions directly; returns session keys"""
+    store = SessionStore()
+    expires = timezone.now() + lifetime
+    backend = 'django.contrib.auth.backends.ModelBackend'
+    sessions = [
+        Session(
+            session_key=get_random_string(32),
+            session_data=store.encode({
+                SESSION_KEY: str(u.pk),
+                BACKEND_SESSION_KEY: backend,
+                HASH_SESSION_KEY: u.get_session_auth_hash(),
+            }),
+            expire_date=expires,
+        )
+        for u in users
+    ]
+    Session.objects.bulk_create(sessions, batch_size=1000)
+    return [s.session_key for s in sessions]
+
+
+def delete_sessions(session_keys):
+    Session.objects.filter(session_key__in=session_keys).delete()
+
+
+class KeepAliveClient:
+    """
+    Minimal HTTP/1.1 client over one persistent asyncio connection, so a
+    single process can hold thousands of simultaneous client connections.
+    """
+
+    def __init__(self, url, session_key):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.cookie = (
+            f"{settings.SESSION_COOKIE_NAME}={session_key}; "
+            f"{settings.CSRF_COOKIE_NAME}={CSRF_TOKEN}"
+        )
+        self.reader = self.writer = None
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def post(self, path, data):
+        """POST form data; returns the response status (reconnects if the server closed)"""
+        if self.writer is None or self.writer.is_closing():
+            await self.connect()
+        body = urlencode(data).encode()
+        head = (
+            f"POST {path} HTTP/1.1\r\n"
+            f"Host: {self.host}:{self.port}\r\n"
+            f"Cookie: {self.cookie}\r\n"
+            f"X-CSRFToken: {CSRF_TOKEN}\r\n"
+            "Content-Type: application/x-www-form-urlencoded\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: keep-alive\r\n\r\n"
+        )
+        self.writer.write(head.encode() + body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("Connection closed by server")
+        status = int(status_line.split()[1])
+        length, close = 0, False
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            name = name.strip().lower()
+            if name == 'content-length':
+                length = int(value)
+            elif name == 'connection' and value.strip().lower() == 'close':
+                close = True
+        if length:
+            await self.reader.readexactly(length)
+        if close:
+            await self.close()
+        return status
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+            self.writer = None
+
+
+class HttpSession:
+    """
+    One browser against a running server: a keep-alive connection plus a
+    cookie jar, so logins and CSRF-protected POSTs behave as in a browser.
+    Redirects are not followed.
+    """
+
+    def __init__(self, url, timeout=30):
+        parts = urlsplit(url)
+        self.host, self.port, self.timeout = parts.hostname, parts.port or 80, timeout
+        self.cookies = {settings.CSRF_COOKIE_NAME: CSRF_TOKEN}
+        self.connection = None
+
+    def request(self, method, path, data=None):
+        """Send one request; returns the response status"""
+        headers = {'Cookie': '; '.join(f"{k}={v}" for k, v in self.cookies.items()), 'Connection': 'keep-alive'}
+        body = None
+        if method == 'GET' and data:
+            path = f"{path}?{urlencode(data)}"
+        elif method == 'POST':
+            body = urlencode(data or {})
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+            headers['X-CSRFToken'] = self.cookies[settings.CSRF_COOKIE_NAME]
+        # Like a browser, retry once on a fresh connection when the server
+        # closed the idle keep-alive one
+        reused = self.connection is not None
+        while True:
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                self.connection.request(method, path, body=body, headers=headers)
+                response = self.connection.getresponse()
+                response.read()
+                break
+            except (BrokenPipeError, ConnectionResetError, http.client.RemoteDisconnected):
+                self.close()
+                if not reused:
+                    raise
+                reused = False
+            except (OSError, http.client.HTTPException):
+                self.close()
+                raise
+        for header in response.headers.get_all('Set-Cookie') or []:
+            name, _, value = header.split(';', 1)[0].partition('=')
+            self.cookies[name.strip()] = value.strip()
+        if response.will_close:
+            self.close()
+        return response.status
+
+    @property
+    def session_key(self):
+        return self.cookies.get(settings.SESSION_COOKIE_NAME) or None
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+async def run_location_pings(url, session_keys, interval, duration, path='/update_location/', ramp_up=5.0):
+    """
+    Simulate one open dashboard per session: every client holds a
+    keep-alive connection and posts a location every `interval` seconds.
+    Returns raw counters and per-request durations (seconds).
+    """
+    durations = []
+    stats = {'requests': 0, 'errors': 0, 'connect_errors': 0, 'connected': 0, 'peak_connected': 0}
+    deadline = time.monotonic() + duration
+
+    async def employee(n, session_key):
+        client = KeepAliveClient(url, session_key)
+        # Spread connects and pings so the load is steady rather than bursty
+        await asyncio.sleep(ramp_up * n / len(session_keys))
+        try:
+            await client.connect()
+        except OSError:
+            stats['connect_errors'] += 1
+            return
+        stats['connected'] += 1
+        stats['peak_connected'] = max(stats['peak_connected'], stats['connected'])
+        try:
+            i = 0
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    status = await client.post(path, {
+                        'latitude': OFFICE_LAT + (n % 50) * 1e-6,
+                        'longitude': OFFICE_LON + (i % 30) * 1e-6,
+                    })
+                    if status != 200:
+                        stats['errors'] += 1
+                except (OSError, ValueError, IndexError, asyncio.IncompleteReadError, ConnectionError):
+                    stats['errors'] += 1
+                    await client.close()
+                durations.append(time.perf_counter() - started)
+                stats['requests'] += 1
+                i += 1
+                await asyncio.sleep(max(0.0, interval - (time.perf_counter() - started)))
+        finally:
+            stats['connected'] -= 1
+            await client.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(employee(n, key) for n, key in enumerate(session_keys)))
+    stats['wall_seconds'] = time.perf_counter() - started
+    return stats, durations
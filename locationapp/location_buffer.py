@@ -0,0 +1,189 @@
+import logging
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from .models import Employee, LocationPing
+
+
+logger = logging.getLogger(__name__)
+
+
+# ========================= BUFFERED LOCATION WRITES =========================
+
+class LocationBuffer:
+    """
+    Keeps the latest reported position of every employee in memory and
+    writes them to Employee in batches with bulk_update.
+
+    Location pings arrive every minute from every open dashboard. Saving
+    each one makes all workers queue on the database write lock, while
+    only the newest position per employee matters. A background thread
+    flushes the pending positions every `flush_interval` seconds, or
+    sooner once `max_pending` employees are waiting.
+
+    Every ping is also kept for the LocationPing history and appended
+    with bulk_create on the same flush (when keep_history is on).
+
+    With flush_interval=0 every ping is written immediately (write-through).
+
+    Pings of employees deleted meanwhile are dropped. Both writes of a
+    flush commit together; a batch that keeps failing is retried
+    `max_attempts` times, then dropped and logged.
+
+    Nothing is written at interpreter exit: the server's shutdown calls
+    stop() (see locationproject/asgi.py), and pings still buffered when a
+    process dies are lost, like the ones of an unflushed interval.
+    """
+
+    FIELDS = ['latitude', 'longitude', 'last_location_update']
+
+    def __init__(self, flush_interval=5.0, max_pending=2000, batch_size=500, keep_history=True, max_attempts=3):
+        self.flush_interval = flush_interval
+        self.keep_history = keep_history
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self._failures = 0
+        self.dropped = 0
+        self._pending = {}
+        self._latest = {}
+        self._history = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._stopped = False
+        self.flushed = 0
+
+    def record(self, employee_id, lat, lon, when):
+        """Remember a ping; it reaches the database on the next flush"""
+        with self._lock:
+            self._pending[employee_id] = (lat, lon, when)
+            self._latest[employee_id] = (lat, lon, when)
+            if self.keep_history:
+                self._history.append((employee_id, lat, lon, when))
+            pending = max(len(self._pending), len(self._history))
+
+        if not self.flush_interval:
+            self.flush()
+        elif pending >= self.max_pending:
+            self._wakeup.set()
+        self._ensure_thread()
+
+    async def arecord(self, employee_id, lat, lon, when):
+        """record() for async views: only write-through mode needs the database"""
+        if self.flush_interval:
+            self.record(employee_id, lat, lon, when)
+        else:
+            await sync_to_async(self.record)(employee_id, lat, lon, when)
+
+    def latest(self, employee_id):
+        """Most recent (lat, lon, when) seen by this process, or None"""
+        with self._lock:
+            return self._latest.get(employee_id)
+
+    def forget(self, employee_id):
+        """Drop everything buffered for an employee (deleted)"""
+        with self._lock:
+            self._pending.pop(employee_id, None)
+            self._latest.pop(employee_id, None)
+            self._history = [ping for ping in self._history if ping[0] != employee_id]
+
+    def flush(self):
+        """Write pending positions (bulk_update) and history pings (bulk_create) in one transaction"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            history, self._history = self._history, []
+        if not pending and not history:
+            return 0
+
+        try:
+            with transaction.atomic():
+                # An employee deleted since its ping would fail the whole batch (FK)
+                existing = set(
+                    Employee.objects.filter(
+                        pk__in={*pending, *(ping[0] for ping in history)}
+                    ).values_list('pk', flat=True)
+                )
+                pending = {emp_id: position for emp_id, position in pending.items() if emp_id in existing}
+                history = [ping for ping in history if ping[0] in existing]
+                employees = [
+                    Employee(pk=emp_id, latitude=lat, longitude=lon, last_location_update=when)
+                    for emp_id, (lat, lon, when) in pending.items()
+                ]
+                if history:
+                    LocationPing.objects.bulk_create(
+                        [LocationPing.from_degrees(*ping) for ping in history], batch_size=self.batch_size
+                    )
+                Employee.objects.bulk_update(employees, self.FIELDS, batch_size=self.batch_size)
+        except Exception:
+            self._failures += 1
+            if self._failures >= self.max_attempts:
+                # Give up on this batch rather than block every later flush
+                self._failures = 0
+                self.dropped += len(pending) + len(history)
+                logger.error(
+                    "Dropping %d buffered positions and %d pings after %d failed flushes",
+                    len(pending), len(history), self.max_attempts,
+                )
+                raise
+            # Rolled back: keep the data for the next attempt unless newer positions arrived
+            with self._lock:
+                for emp_id, position in pending.items():
+                    self._pending.setdefault(emp_id, position)
+                self._history[:0] = history
+            raise
+        self._failures = 0
+        self.flushed += len(employees)
+        return len(employees)
+
+    def clear(self):
+        """Drop everything buffered without writing it (tests)"""
+        with self._lock:
+            self._pending.clear()
+            self._latest.clear()
+            self._history.clear()
+        self._failures = 0
+
+    def stop(self):
+        """Stop the flush thread and write whatever is still pending"""
+        self._stopped = True
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join()
+        self.flush()
+
+    async def astop(self):
+        await sync_to_async(self.stop)()
+
+    def _ensure_thread(self):
+        if self._stopped or not self.flush_interval or (self._thread and self._thread.is_alive()):
+            return
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='location-buffer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopped:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if self._stopped:
+                break  # stop() writes the rest in the caller
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Flushing buffered locations failed")
+            finally:
+                close_old_connections()
+
+
+location_buffer = LocationBuffer(
+    flush_interval=getattr(settings, 'LOCATION_FLUSH_INTERVAL', 5.0),
+    max_pending=getattr(settings, 'LOCATION_FLUSH_MAX_PENDING', 2000),
+    keep_history=getattr(settings, 'LOCATION_HISTORY_ENABLED', True),
+)
+
@@ -0,0 +1,98 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+
+from .models import LocationPing
+
+
+# ========================= LOCATION HISTORY MAINTENANCE =========================
+
+def downsample_day(day, bucket_minutes=15, chunk_size=5000):
+    """
+    Keep one ping per employee per `bucket_minutes` for one day.
+    The newest ping of each bucket survives and `samples` accumulates the
+    number of raw pings it stands for, so rerunning is harmless.
+    Returns the number of deleted rows.
+    """
+    bucket_seconds = bucket_minutes * 60
+    pings = LocationPing.objects.filter(day=day)
+    employee_ids = list(pings.order_by('employee_id').values_list('employee_id', flat=True).distinct())
+    return sum(
+        _downsample_pings(pings.filter(employee_id=emp_id), bucket_seconds, chunk_size) for emp_id in employee_ids
+    )
+
+
+def _downsample_pings(pings, bucket_seconds, chunk_size):
+    """
+    downsample_day() for one employee: reads keyset pages of `chunk_size`
+    along locationping_emp_time_idx and commits each page's closed
+    buckets (deletes and the keeper's new count together), so memory and
+    transactions stay bounded and an interrupted run loses no samples.
+    """
+    pings = pings.order_by('recorded_at', 'id').values_list('id', 'recorded_at', 'samples')
+    doomed, merged = [], []  # of the buckets closed in this page
+    bucket = []  # the open bucket's pings before its current keeper
+    current_key = keeper = None
+    total = deleted = 0
+
+    def close_bucket():
+        if keeper and total != keeper[1]:
+            merged.append(LocationPing(id=keeper[0], samples=total))
+        doomed.extend(bucket)
+
+    def write():
+        nonlocal deleted
+        if doomed or merged:
+            with transaction.atomic():
+                LocationPing.objects.filter(id__in=doomed).delete()
+                LocationPing.objects.bulk_update(merged, ['samples'])
+            deleted += len(doomed)
+            doomed.clear()
+            merged.clear()
+
+    page = pings
+    while True:
+        rows = list(page[:chunk_size])
+        if not rows:
+            break
+        for ping_id, recorded_at, samples in rows:
+            key = int(recorded_at.timestamp()) // bucket_seconds
+            if key != current_key:
+                close_bucket()
+                current_key, total, bucket = key, 0, []
+            elif keeper:
+                bucket.append(keeper[0])
+            keeper = (ping_id, samples)
+            total += samples
+        write()
+        last_id, last_at, _ = rows[-1]
+        page = pings.filter(Q(recorded_at__gt=last_at) | Q(recorded_at=last_at, id__gt=last_id))
+    close_bucket()
+    write()
+    return deleted
+
+
+def purge_before(day, chunk_size=5000):
+    """
+    Delete pings older than `day` in short chunked transactions, so
+    retention never holds a long lock on the table.
+    Returns the number of deleted rows.
+    """
+    deleted = 0
+    while True:
+        ids = list(LocationPing.objects.filter(day__lt=day).values_list('id', flat=True)[:chunk_size])
+        if not ids:
+            return deleted
+        with transaction.atomic():
+            deleted += LocationPing.objects.filter(id__in=ids).delete()[0]
+
+
+def days_to_downsample(today, downsample_after_days, retention_days):
+    """Days old enough to downsample but still within retention, oldest first"""
+    first = today - timedelta(days=retention_days)
+    last = today - timedelta(days=downsample_after_days)
+    return list(
+        LocationPing.objects.filter(day__gte=first, day__lte=last)
+        .order_by('day').values_list('day', flat=True).distinct()
+    )
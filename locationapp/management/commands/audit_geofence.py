@@ -0,0 +1,112 @@
+import csv
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from locationapp import geofence
+from locationapp.models import Attendance, AttendanceSession, Office
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-check historical check-ins against the current office geofences "
+        "and write every out-of-fence check-in to a CSV report. Every "
+        "session of a day is audited on its own (re-check-ins included), "
+        "as is the first check-in of days recorded without sessions."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='start', required=True, help="First date (YYYY-MM-DD)")
+        parser.add_argument('--to', dest='end', required=True, help="Last date (YYYY-MM-DD)")
+        parser.add_argument('--office', help="Only audit check-ins recorded at this office (id or name)")
+        parser.add_argument('--output', default='geofence_audit.csv', help="CSV report path")
+        parser.add_argument('--chunk-size', type=int, default=100_000, help="Rows fetched per query")
+
+    def handle(self, *args, **options):
+        if geofence.np is None:
+            raise CommandError("audit_geofence needs NumPy: pip install numpy")
+        np = geofence.np
+
+        try:
+            start = date.fromisoformat(options['start'])
+            end = date.fromisoformat(options['end'])
+        except ValueError as e:
+            raise CommandError(f"Invalid date: {e}")
+
+        # Every check-in since sessions exist, plus days recorded without any
+        sessions = AttendanceSession.objects.filter(
+            attendance__date__gte=start, attendance__date__lte=end,
+            latitude__isnull=False, longitude__isnull=False,
+        )
+        rows = Attendance.objects.filter(
+            date__gte=start, date__lte=end, latitude__isnull=False, longitude__isnull=False,
+            sessions__isnull=True,
+        )
+        offices = list(Office.objects.filter(is_active=True)) or [geofence.default_office()]
+
+        if options['office']:
+            lookup = {'pk': options['office']} if options['office'].isdigit() else {'name': options['office']}
+            office = Office.objects.filter(**lookup).first()
+            if not office:
+                raise CommandError(f"Office {options['office']} not found")
+            sessions = sessions.filter(office=office)
+            rows = rows.filter(office=office)
+            offices = [office]
+
+        sources = [
+            # (source, queryset, columns: keyset id, attendance id, session id, E_id, date, check-in, office, lat, lon)
+            ('session', sessions, (
+                'id', 'attendance_id', 'id', 'attendance__employee__E_id', 'attendance__date',
+                'check_in_time', 'office_id', 'latitude', 'longitude',
+            )),
+            ('attendance', rows, (
+                'id', 'id', 'id', 'employee__E_id', 'date', 'check_in_time', 'office_id', 'latitude', 'longitude',
+            )),
+        ]
+        chunk_size = options['chunk_size']
+        scanned = flagged = 0
+        started = time.perf_counter()
+
+        with open(options['output'], 'w', newline='') as fh:
+            writer = csv.writer(fh)
+            writer.writerow([
+                'source', 'attendance_id', 'session_id', 'E_id', 'date', 'check_in_time', 'recorded_office_id',
+                'latitude', 'longitude', 'nearest_office', 'distance_m',
+            ])
+
+            for source, queryset, columns in sources:
+                # Keyset pagination on id: every chunk is an index range scan and
+                # only one chunk is held in memory at a time
+                last_id = 0
+                while True:
+                    chunk = list(queryset.filter(id__gt=last_id).order_by('id').values_list(*columns)[:chunk_size])
+                    if not chunk:
+                        break
+                    last_id = chunk[-1][0]
+                    scanned += len(chunk)
+
+                    _, attendance_ids, session_ids, e_ids, days, check_ins, office_ids, lats, lons = zip(*chunk)
+                    office_ids = np.array([o if o is not None else -1 for o in office_ids], dtype=np.int64)
+                    inside, nearest, distance = geofence.fence_check_many(lats, lons, offices, office_ids)
+
+                    for i in np.flatnonzero(~inside):
+                        writer.writerow([
+                            source, attendance_ids[i], session_ids[i] if source == 'session' else '',
+                            e_ids[i], days[i], check_ins[i] or '', office_ids[i] if office_ids[i] >= 0 else '',
+                            lats[i], lons[i], offices[nearest[i]].name, round(float(distance[i]), 2),
+                        ])
+                    flagged += int((~inside).sum())
+
+                    elapsed = time.perf_counter() - started
+                    self.stdout.write(
+                        f"  {scanned:,} check-ins scanned, {flagged:,} flagged ({scanned / elapsed:,.0f} rows/s)",
+                        ending='\r',
+                    )
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(
+            f"Audited {scanned:,} check-ins in {elapsed:.1f}s: {flagged:,} outside the fence. "
+            f"Report: {options['output']}"
+        ))
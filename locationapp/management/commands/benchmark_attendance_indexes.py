@@ -0,0 +1,244 @@
+import time
+from datetime import date, datetime, time as dtime, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from locationapp.attendance import attendance_page, attendance_totals, build_attendance_maps
+from locationapp.benchmarking import (
+    benchmark_database, default_benchmark_db, summarize, time_calls, write_results,
+)
+from locationapp.models import Employee, Attendance
+from locationapp.payroll import month_bounds
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the Attendance hot-path queries with and without the "
+        "indexes declared on Attendance.Meta, on a throwaway database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10_000_000, help="Attendance rows to generate")
+        parser.add_argument('--employees', type=int, default=2000, help="Synthetic employees")
+        parser.add_argument('--repeat', type=int, default=50, help="Timed runs per query")
+        parser.add_argument('--batch', type=int, default=50_000, help="Rows per INSERT batch")
+        parser.add_argument(
+            '--db-name',
+            default=default_benchmark_db('bench_attendance'),
+            help="SQLite file for the benchmark database (ignored on other backends)",
+        )
+        parser.add_argument('--keepdb', action='store_true', help="Reuse/keep the benchmark database")
+        parser.add_argument('--json', help="Write the results to this JSON file")
+
+    def handle(self, *args, **options):
+        with benchmark_database(options['db_name'], options['keepdb']):
+            results = self.run_benchmark(options)
+
+        if options['json']:
+            write_results(options['json'], results)
+            self.stdout.write(f"Results written to {options['json']}")
+
+    # ------------------------------------------------------------------ setup
+
+    def run_benchmark(self, options):
+        indexes = Attendance._meta.indexes
+
+        if not Attendance.objects.exists():
+            self.stdout.write(f"Generating {options['rows']:,} attendance rows...")
+            self.set_indexes(indexes, present=False)
+            started = time.perf_counter()
+            employee_ids = self.create_employees(options['employees'])
+            self.load_attendance(employee_ids, options['rows'], options['batch'])
+            self.stdout.write(f"  loaded in {time.perf_counter() - started:.1f}s")
+        else:
+            self.set_indexes(indexes, present=False)
+
+        employee_ids = list(Employee.objects.values_list('id', flat=True))
+        queries = self.hot_path_queries(employee_ids)
+
+        self.stdout.write("Running queries WITHOUT the Attendance indexes...")
+        self.analyze()
+        before = self.measure(queries, options['repeat'])
+
+        started = time.perf_counter()
+        self.set_indexes(indexes, present=True)
+        build_seconds = time.perf_counter() - started
+        self.stdout.write(f"Indexes built in {build_seconds:.1f}s")
+
+        self.stdout.write("Running queries WITH the Attendance indexes...")
+        self.analyze()
+        after = self.measure(queries, options['repeat'])
+
+        self.report(before, after)
+        return {
+            'vendor': connection.vendor,
+            'rows': Attendance.objects.count(),
+            'employees': len(employee_ids),
+            'index_build_seconds': round(build_seconds, 2),
+            'before': before,
+            'after': after,
+        }
+
+    def set_indexes(self, indexes, present):
+        with connection.cursor() as cursor:
+            existing = connection.introspection.get_constraints(cursor, Attendance._meta.db_table)
+        with connection.schema_editor() as editor:
+            for index in indexes:
+                if present and index.name not in existing:
+                    editor.add_index(Attendance, index)
+                elif not present and index.name in existing:
+                    editor.remove_index(Attendance, index)
+
+    def analyze(self):
+        table = connection.ops.quote_name(Attendance._meta.db_table)
+        with connection.cursor() as cursor:
+            if connection.vendor == 'mysql':
+                cursor.execute(f"ANALYZE TABLE {table}")
+            else:
+                cursor.execute(f"ANALYZE {table}")
+
+    def create_employees(self, count):
+        Employee.objects.bulk_create(
+            [Employee(E_id=f"B{i:06d}", E_name=f"Bench {i}") for i in range(count)],
+            batch_size=1000,
+        )
+        return list(Employee.objects.values_list('id', flat=True))
+
+    def load_attendance(self, employee_ids, rows, batch):
+        """
+        Insert rows with raw executemany, the fastest way to load millions
+        of rows on every backend.
+        """
+        ops = connection.ops
+        fields = [f for f in Attendance._meta.concrete_fields if not f.primary_key]
+        varying = {'employee_id', 'date', 'status', 'check_in_time', 'check_out_time', 'worked_hours', 'is_sunday'}
+        defaults = {
+            f.attname: f.get_db_prep_save(f.get_default(), connection)
+            for f in fields if f.attname not in varying
+        }
+        columns = ', '.join(ops.quote_name(f.column) for f in fields)
+        placeholders = ', '.join(['%s'] * len(fields))
+        sql = f"INSERT INTO {ops.quote_name(Attendance._meta.db_table)} ({columns}) VALUES ({placeholders})"
+
+        days = max(1, rows // len(employee_ids))
+        today = date.today()
+        tz = timezone.get_current_timezone()
+
+        def generate():
+            produced = 0
+            for offset in range(days - 1, -1, -1):
+                day = today - timedelta(days=offset)
+                check_in = timezone.make_aware(datetime.combine(day, dtime(9, 0)), tz)
+                for n, emp_id in enumerate(employee_ids):
+                    if produced >= rows:
+                        return
+                    produced += 1
+                    present = (n + offset) % 10 != 0
+                    open_session = offset == 0 and n % 20 == 0
+                    values = dict(defaults)
+                    values.update({
+                        'employee_id': emp_id,
+                        'date': ops.adapt_datefield_value(day),
+                        'status': 'Present' if present else 'Absent',
+                        'check_in_time': ops.adapt_datetimefield_value(check_in) if present else None,
+                        'check_out_time': (
+                            ops.adapt_datetimefield_value(check_in + timedelta(hours=8, minutes=n % 90))
+                            if present and not open_session else None
+                        ),
+                        'worked_hours': ops.adapt_decimalfield_value(
+                            Decimal(8 + (n % 90) / 60).quantize(Decimal('0.01'))
+                            if present and not open_session else Decimal(0), 5, 2,
+                        ),
+                        'is_sunday': day.weekday() == 6,
+                    })
+                    yield [values[f.attname] for f in fields]
+
+        chunk = []
+        inserted = 0
+        with transaction.atomic(), connection.cursor() as cursor:
+            for row in generate():
+                chunk.append(row)
+                if len(chunk) >= batch:
+                    cursor.executemany(sql, chunk)
+                    inserted += len(chunk)
+                    chunk = []
+                    self.stdout.write(f"  {inserted:,} rows", ending='\r')
+            if chunk:
+                cursor.executemany(sql, chunk)
+        self.stdout.write('')
+
+    # ------------------------------------------------------------------ queries
+
+    def hot_path_queries(self, employee_ids):
+        """(name, queryset for EXPLAIN, callable(i) executing the hot path, repeat divisor)"""
+        today = date.today()
+        start, end = month_bounds(today.year, today.month)
+
+        def emp(i):
+            return employee_ids[(i * 7919) % len(employee_ids)]
+
+        def open_session(i):
+            return Attendance.objects.filter(
+                employee_id=emp(i), date=today, check_in_time__isnull=False, check_out_time__isnull=True,
+            ).order_by('-id')
+
+        def today_present(i):
+            return Attendance.objects.filter(employee_id=emp(i), date=today, status='Present')
+
+        def month_rows(i):
+            return Attendance.objects.filter(
+                employee_id=emp(i), date__gte=start, date__lt=end, status='Present',
+            ).values_list('check_in_time', 'check_out_time', 'manual_hours', 'is_sunday', 'is_holiday')
+
+        def payroll_month(i):
+            return Attendance.objects.filter(date__gte=start, date__lt=end, status='Present').values_list(
+                'employee_id', 'check_in_time', 'check_out_time', 'manual_hours', 'is_sunday', 'is_holiday'
+            )
+
+        return [
+            ('open_session (auto_checkout_if_far)', open_session, lambda i: open_session(i).first(), 1),
+            ('today_present (checkout)', today_present, lambda i: today_present(i).first(), 1),
+            ('calendar_month (employee_dashboard)',
+             lambda i: Attendance.objects.filter(employee_id=emp(i), date__gte=start, date__lt=end),
+             lambda i: build_attendance_maps([emp(i)], today.year, today.month), 1),
+            ('payroll_employee_month', month_rows, lambda i: list(month_rows(i)), 1),
+            ('payroll_all_month (salary overview)', payroll_month, lambda i: list(payroll_month(i)), 10),
+            ('dashboard_page (manager_dashboard)',
+             lambda i: Attendance.objects.order_by('-date', '-id'),
+             lambda i: attendance_page(Attendance.objects.all()), 1),
+            ('all_open_sessions (stale sessions)',
+             lambda i: Attendance.objects.filter(check_in_time__isnull=False, check_out_time__isnull=True),
+             lambda i: list(Attendance.objects.filter(
+                 check_in_time__isnull=False, check_out_time__isnull=True,
+             ).values_list('id', 'employee_id')), 1),
+            ('status_totals (manager_dashboard)',
+             lambda i: Attendance.objects.filter(status='Absent'),
+             lambda i: attendance_totals(), 10),
+        ]
+
+    def measure(self, queries, repeat):
+        results = {}
+        for name, queryset, run, divisor in queries:
+            run(0)  # warm up caches
+            samples = time_calls(run, max(1, repeat // divisor))
+            results[name] = {'plan': queryset(0).explain(), **summarize(samples)}
+        return results
+
+    def report(self, before, after):
+        self.stdout.write('')
+        self.stdout.write(f"{'query':<42}{'before p50':>12}{'after p50':>12}{'before p95':>12}{'after p95':>12}{'speedup':>10}")
+        for name in before:
+            b, a = before[name], after[name]
+            speedup = b['p50_ms'] / a['p50_ms'] if a['p50_ms'] else float('inf')
+            self.stdout.write(
+                f"{name:<42}{b['p50_ms']:>10.2f}ms{a['p50_ms']:>10.2f}ms"
+                f"{b['p95_ms']:>10.2f}ms{a['p95_ms']:>10.2f}ms{speedup:>9.1f}x"
+            )
+        self.stdout.write('')
+        for name in before:
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(f"  before: {before[name]['plan']}")
+            self.stdout.write(f"  after:  {after[name]['plan']}")
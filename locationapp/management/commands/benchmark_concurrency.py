@@ -0,0 +1,94 @@
+import asyncio
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from locationapp.benchmarking import is_throwaway_database, summarize, write_results
+from locationapp.loadgen import (
+    create_sessions, delete_sessions, delete_synthetic_employees, ensure_synthetic_employees, raise_fd_limit,
+    run_location_pings,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Simulate thousands of open dashboards pinging update_location over "
+        "keep-alive connections and compare how running servers (e.g. ASGI vs "
+        "WSGI) cope. The servers must use the same database as this command, a "
+        "test/temporary one unless --i-know is given. The synthetic users and "
+        "their data are deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target', action='append', required=True, metavar='NAME=URL',
+            help="Server to test, e.g. asgi=http://127.0.0.1:8001 (repeatable)",
+        )
+        parser.add_argument('--employees', type=int, default=5000, help="Simulated logged-in employees")
+        parser.add_argument('--interval', type=float, default=60.0, help="Seconds between pings per employee")
+        parser.add_argument('--duration', type=float, default=120.0, help="Seconds to run each target")
+        parser.add_argument('--ramp-up', type=float, default=10.0, help="Seconds to open all connections")
+        parser.add_argument(
+            '--i-know', action='store_true',
+            help="Allow a database that is not a test/temporary one",
+        )
+        parser.add_argument('--json', help="Write the results to this JSON file")
+
+    def handle(self, *args, **options):
+        targets = []
+        for target in options['target']:
+            name, sep, url = target.partition('=')
+            if not sep or not url.startswith('http://'):
+                raise CommandError(f"Invalid target {target!r}, expected NAME=http://host:port")
+            targets.append((name, url.rstrip('/')))
+        if not options['i_know'] and not is_throwaway_database():
+            raise CommandError(
+                f"This writes synthetic employees and their locations to {connection.settings_dict['NAME']}, "
+                "which is not a test/temporary database. Point the servers and this command at a throwaway "
+                "database, or pass --i-know."
+            )
+
+        count = options['employees']
+        limit = raise_fd_limit(count + 256)
+        if limit is not None and limit < count + 64:
+            self.stderr.write(f"Open-file limit is {limit}; some connections will fail to open")
+
+        results = {'vendor': connection.vendor, 'employees': count, 'interval': options['interval']}
+        session_keys = []
+        try:
+            users = ensure_synthetic_employees(count)
+            session_keys = create_sessions(users)
+            for name, url in targets:
+                self.stdout.write(f"Running {name} ({url}) for {options['duration']:.0f}s...")
+                stats, durations = asyncio.run(run_location_pings(
+                    url, session_keys, options['interval'], options['duration'], ramp_up=options['ramp_up'],
+                ))
+                results[name] = {
+                    'url': url,
+                    'peak_connections': stats['peak_connected'],
+                    'connect_errors': stats['connect_errors'],
+                    'requests': stats['requests'],
+                    'errors': stats['errors'],
+                    'throughput_per_s': round(stats['requests'] / stats['wall_seconds'], 1),
+                    **summarize(durations),
+                }
+        finally:
+            delete_sessions(session_keys)
+            deleted = delete_synthetic_employees()
+            self.stdout.write(f"Deleted {deleted:,} synthetic users, employees and related rows")
+
+        self.report(results, [name for name, _ in targets])
+        if options['json']:
+            write_results(options['json'], results)
+            self.stdout.write(f"Results written to {options['json']}")
+
+    def report(self, results, names):
+        self.stdout.write(
+            f"{'target':<10}{'conns':>8}{'conn err':>10}{'req/s':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'errors':>8}"
+        )
+        for name in names:
+            r = results[name]
+            self.stdout.write(
+                f"{name:<10}{r['peak_connections']:>8}{r['connect_errors']:>10}{r['throughput_per_s']:>10.0f}"
+                f"{r['p50_ms']:>8.2f}ms{r['p95_ms']:>8.2f}ms{r['p99_ms']:>8.2f}ms{r['errors']:>8}"
+            )
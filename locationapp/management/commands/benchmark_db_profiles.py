@@ -0,0 +1,190 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+
+from locationapp import views
+from locationapp.benchmarking import benchmark_database, default_benchmark_db, summarize, write_results
+from locationapp.loadgen import ensure_synthetic_employees
+from locationapp.location_buffer import LocationBuffer
+from locationapp.middleware import EmployeeMiddleware
+from locationapp.models import Employee, OFFICE_LAT, OFFICE_LON
+from locationproject.database import PROFILES
+
+OPERATIONS = ('check_in', 'ping', 'checkout')
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay a check-in burst (concurrent check-ins, location pings and checkouts "
+        "through the real views) against each database profile (DB_PROFILE) and "
+        "compare latency, throughput and 'database is locked' errors."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--profile', action='append', choices=PROFILES,
+            help="Profile to run (repeatable; default: the SQLite profiles)",
+        )
+        parser.add_argument('--employees', type=int, default=300)
+        parser.add_argument('--pings', type=int, default=5, help="Location pings per employee between check-in and checkout")
+        parser.add_argument('--concurrency', type=int, default=16, help="Concurrent worker threads")
+        parser.add_argument(
+            '--flush-interval', type=float, default=0,
+            help="LocationBuffer flush interval (0 = every ping is a write, the worst case)",
+        )
+        parser.add_argument('--json', help="Write the results to this JSON file")
+        # Internal: run one profile in this process (DB_PROFILE is already set)
+        parser.add_argument('--worker', action='store_true', help="Internal: run the profile of DB_PROFILE")
+
+    def handle(self, *args, **options):
+        if options['worker']:
+            result = self.run_profile(options)
+            write_results(options['json'], result)
+            return
+
+        profiles = options['profile'] or ['sqlite-legacy', 'sqlite', 'sqlite-wal']
+        results = {
+            'employees': options['employees'],
+            'pings_per_employee': options['pings'],
+            'concurrency': options['concurrency'],
+            'flush_interval': options['flush_interval'],
+        }
+        for profile in profiles:
+            self.stdout.write(f"Running {profile}...")
+            results[profile] = self.spawn(profile, options)
+
+        self.report(results, profiles)
+        if options['json']:
+            write_results(options['json'], results)
+            self.stdout.write(f"Results written to {options['json']}")
+
+    def spawn(self, profile, options):
+        """Run one profile in a child process: settings.DATABASES is read once per process"""
+        fd, path = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        command = [
+            sys.executable, str(settings.BASE_DIR / 'manage.py'), 'benchmark_db_profiles', '--worker',
+            '--employees', str(options['employees']), '--pings', str(options['pings']),
+            '--concurrency', str(options['concurrency']), '--flush-interval', str(options['flush_interval']),
+            '--json', path,
+        ]
+        try:
+            completed = subprocess.run(command, env={**os.environ, 'DB_PROFILE': profile}, capture_output=True, text=True)
+            if completed.returncode != 0:
+                raise CommandError(f"Profile {profile} failed:\n{completed.stderr[-2000:]}")
+            with open(path) as fh:
+                return json.load(fh)
+        finally:
+            os.remove(path)
+
+    # ---- one profile, in the worker process ----
+
+    def run_profile(self, options):
+        db_name = default_benchmark_db(f"bench_db_{os.environ.get('DB_PROFILE', 'sqlite')}")
+        with benchmark_database(db_name):
+            journal_mode = None
+            if connection.vendor == 'sqlite':
+                with connection.cursor() as cursor:
+                    journal_mode = cursor.execute('PRAGMA journal_mode').fetchone()[0]
+            users = ensure_synthetic_employees(options['employees'], prefix='dbbench')
+            Employee.objects.update(is_checked_in=False)
+            connection.close()
+            result = self.replay(users, options)
+        return {'vendor': connection.vendor, 'journal_mode': journal_mode, **result}
+
+    def replay(self, users, options):
+        buffer = LocationBuffer(flush_interval=options['flush_interval'])
+        original, views.location_buffer = views.location_buffer, buffer
+        factory = RequestFactory()
+        update_location = async_to_sync(EmployeeMiddleware(views.update_location))
+        employees = dict(Employee.objects.filter(user__in=users).values_list('user_id', 'E_id'))
+        concurrency = options['concurrency']
+        durations = {op: [] for op in OPERATIONS}
+        errors = {op: 0 for op in OPERATIONS}
+        locked = [0]
+        lock = threading.Lock()
+
+        def call(op, view, request, mine, failed):
+            started = time.perf_counter()
+            try:
+                response = view(request)
+                if response.status_code >= 400:
+                    failed[op] += 1
+            except Exception as e:
+                failed[op] += 1
+                if 'locked' in str(e):
+                    failed['locked'] += 1
+            mine[op].append(time.perf_counter() - started)
+
+        def worker(offset):
+            mine = {op: [] for op in OPERATIONS}
+            failed = {op: 0 for op in (*OPERATIONS, 'locked')}
+            for user in users[offset::concurrency]:
+                E_id = employees[user.pk]
+                position = {'latitude': OFFICE_LAT, 'longitude': OFFICE_LON}
+                call('check_in', views.home, factory.post('/', {'E_id': E_id, **position}), mine, failed)
+                for i in range(options['pings']):
+                    request = factory.post('/update_location/', {
+                        'latitude': OFFICE_LAT + i * 1e-6, 'longitude': OFFICE_LON,
+                    })
+                    request.user = user
+                    request.auser = sync_to_async(lambda user=user: user)
+                    request.session = SessionStore()
+                    call('ping', update_location, request, mine, failed)
+                call('checkout', views.checkout, factory.get('/checkout/', {'E_id': E_id}), mine, failed)
+            connection.close()
+            with lock:
+                for op in OPERATIONS:
+                    durations[op].extend(mine[op])
+                    errors[op] += failed[op]
+                locked[0] += failed['locked']
+
+        try:
+            threads = [threading.Thread(target=worker, args=(n,)) for n in range(concurrency)]
+            started = time.perf_counter()
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            wall = time.perf_counter() - started
+            buffer.stop()
+        finally:
+            views.location_buffer = original
+
+        requests = sum(len(d) for d in durations.values())
+        return {
+            'requests': requests,
+            'errors': sum(errors.values()),
+            'locked_errors': locked[0],
+            'wall_seconds': round(wall, 3),
+            'throughput_per_s': round(requests / wall, 1),
+            **{op: {'errors': errors[op], **summarize(durations[op])} for op in OPERATIONS},
+        }
+
+    def report(self, results, profiles):
+        self.stdout.write(
+            f"{'profile':<15}{'operation':<10}{'count':>7}{'p50':>10}{'p95':>10}{'p99':>10}{'errors':>8}"
+        )
+        for profile in profiles:
+            r = results[profile]
+            for op in OPERATIONS:
+                s = r[op]
+                self.stdout.write(
+                    f"{profile:<15}{op:<10}{s['count']:>7}{s['p50_ms']:>8.1f}ms{s['p95_ms']:>8.1f}ms"
+                    f"{s['p99_ms']:>8.1f}ms{s['errors']:>8}"
+                )
+            self.stdout.write(
+                f"{profile:<15}{'total':<10}{r['requests']:>7}  {r['throughput_per_s']:.0f} req/s, "
+                f"{r['errors']} errors ({r['locked_errors']} 'database is locked')"
+            )
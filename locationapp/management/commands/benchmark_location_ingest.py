@@ -0,0 +1,128 @@
+import threading
+import time
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.contrib.sessions.backends.db import SessionStore
+from django.test import RequestFactory
+
+from locationapp import views
+from locationapp.benchmarking import benchmark_database, default_benchmark_db, summarize, write_results
+from locationapp.location_buffer import LocationBuffer
+from locationapp.middleware import EmployeeMiddleware
+from locationapp.models import Employee, OFFICE_LAT, OFFICE_LON
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark update_location throughput and latency with write-through "
+        "saves (one UPDATE per ping, as before) against the batched LocationBuffer."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employees', type=int, default=500)
+        parser.add_argument('--pings', type=int, default=20000, help="Total pings per mode")
+        parser.add_argument('--concurrency', type=int, default=16, help="Concurrent worker threads")
+        parser.add_argument('--flush-interval', type=float, default=1.0, help="Buffered mode flush interval (s)")
+        parser.add_argument('--db-name', default=default_benchmark_db('bench_location'))
+        parser.add_argument('--json', help="Write the results to this JSON file")
+
+    def handle(self, *args, **options):
+        with benchmark_database(options['db_name']):
+            users = self.create_employees(options['employees'])
+            results = {
+                'vendor': connection.vendor,
+                'employees': options['employees'],
+                'concurrency': options['concurrency'],
+                'write_through': self.run_mode(users, options, flush_interval=0),
+                'buffered': self.run_mode(users, options, flush_interval=options['flush_interval']),
+            }
+
+        self.report(results)
+        if options['json']:
+            write_results(options['json'], results)
+            self.stdout.write(f"Results written to {options['json']}")
+
+    def create_employees(self, count):
+        User.objects.bulk_create(
+            [User(username=f"bench{i:06d}", password='!') for i in range(count)], batch_size=1000
+        )
+        users = list(User.objects.filter(username__startswith='bench').order_by('id'))
+        Employee.objects.bulk_create(
+            [
+                Employee(user=u, E_id=f"B{i:06d}", E_name=f"Bench {i}", is_checked_in=True)
+                for i, u in enumerate(users)
+            ],
+            batch_size=1000,
+        )
+        return users
+
+    def run_mode(self, users, options, flush_interval):
+        buffer = LocationBuffer(flush_interval=flush_interval)
+        original, views.location_buffer = views.location_buffer, buffer
+        factory = RequestFactory()
+        handler = async_to_sync(EmployeeMiddleware(views.update_location))
+        pings, concurrency = options['pings'], options['concurrency']
+        durations, errors = [], []
+        lock = threading.Lock()
+
+        def worker(offset):
+            mine, failed = [], 0
+            for i in range(offset, pings, concurrency):
+                # Small jitter inside the fence: pure ingestion, no auto-checkout
+                request = factory.post('/update_location/', {
+                    'latitude': OFFICE_LAT + (i % 50) * 1e-6,
+                    'longitude': OFFICE_LON + (i % 30) * 1e-6,
+                })
+                request.user = users[i % len(users)]
+                request.auser = sync_to_async(lambda user=request.user: user)
+                request.session = SessionStore()
+                started = time.perf_counter()
+                try:
+                    response = handler(request)
+                    if response.status_code != 200:
+                        failed += 1
+                except Exception:
+                    failed += 1
+                mine.append(time.perf_counter() - started)
+            connection.close()
+            with lock:
+                durations.extend(mine)
+                errors.append(failed)
+
+        try:
+            threads = [threading.Thread(target=worker, args=(n,)) for n in range(concurrency)]
+            started = time.perf_counter()
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            wall = time.perf_counter() - started
+
+            flush_started = time.perf_counter()
+            buffer.stop()
+            final_flush = time.perf_counter() - flush_started
+        finally:
+            views.location_buffer = original
+
+        return {
+            'flush_interval': flush_interval,
+            'pings': pings,
+            'errors': sum(errors),
+            'wall_seconds': round(wall, 3),
+            'throughput_per_s': round(pings / wall, 1),
+            'rows_written': buffer.flushed,
+            'final_flush_ms': round(final_flush * 1000, 3),
+            **summarize(durations),
+        }
+
+    def report(self, results):
+        self.stdout.write(f"{'mode':<16}{'pings/s':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'errors':>8}{'rows written':>14}")
+        for mode in ('write_through', 'buffered'):
+            r = results[mode]
+            self.stdout.write(
+                f"{mode:<16}{r['throughput_per_s']:>10.0f}{r['p50_ms']:>8.2f}ms{r['p95_ms']:>8.2f}ms"
+                f"{r['p99_ms']:>8.2f}ms{r['errors']:>8}{r['rows_written']:>14}"
+            )
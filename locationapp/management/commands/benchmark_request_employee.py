@@ -0,0 +1,144 @@
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import Permission, User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from locationapp.benchmarking import benchmark_database, default_benchmark_db, summarize, write_results
+from locationapp import middleware
+from locationapp.location_buffer import location_buffer
+from locationapp.models import Attendance, Employee, OFFICE_LAT, OFFICE_LON
+
+
+# (label, user, method, path, data)
+REQUESTS = [
+    ('employee_dashboard', 'employee', 'get', '/employee_dashboard/', None),
+    ('update_location', 'employee', 'post', '/update_location/', {'latitude': OFFICE_LAT, 'longitude': OFFICE_LON}),
+    ('manager_dashboard', 'manager', 'get', '/manager_dashboard/', None),
+    ('add_user', 'manager', 'get', '/add_user/', None),
+]
+
+
+def _employee_of(user):
+    try:
+        return Employee.objects.get(user=user)
+    except Employee.DoesNotExist:
+        return None
+
+
+async def _aemployee_of(user):
+    try:
+        return await Employee.objects.aget(user=user)
+    except Employee.DoesNotExist:
+        return None
+
+
+def baseline_lookup():
+    """request.employee as the views loaded it before the middleware: one query, no stamp"""
+    def lookup(request):
+        return _employee_of(request.user) if request.user.is_authenticated else None
+
+    async def alookup(request):
+        user = await request.auser()
+        return await _aemployee_of(user) if user.is_authenticated else None
+
+    return mock.patch.multiple(middleware, get_request_employee=lookup, aget_request_employee=alookup)
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure queries and latency of authenticated views with the old per-view "
+        "Employee.objects.get(user=request.user) against the session-cached "
+        "request.employee, and the cost of the version stamp read the cached path "
+        "makes on every request."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help="Requests per view and mode")
+        parser.add_argument('--db-name', default=default_benchmark_db('bench_request_employee'))
+        parser.add_argument('--json', help="Write the results to this JSON file")
+
+    def handle(self, *args, **options):
+        with benchmark_database(options['db_name']), override_settings(ALLOWED_HOSTS=['*']):
+            clients = self.create_clients()
+            results = {'vendor': connection.vendor, 'requests': options['requests']}
+            with baseline_lookup():
+                results['per_request'] = self.measure_views(clients, options['requests'])
+            with override_settings(EMPLOYEE_SESSION_MAX_AGE=300):
+                results['session_cached'] = self.measure_views(clients, options['requests'])
+            results['version_stamp'] = self.measure_stamp(options['requests'])
+            # update_location pings are buffered: write them before the database goes
+            location_buffer.flush()
+
+        self.report(results)
+        if options['json']:
+            write_results(options['json'], results)
+            self.stdout.write(f"Results written to {options['json']}")
+
+    def create_clients(self):
+        manager_user = User.objects.create_user('bench_manager', password='x')
+        manager_user.user_permissions.add(*Permission.objects.filter(content_type__app_label='locationapp'))
+        Employee.objects.create(user=manager_user, E_id='BM1', E_name='Bench Manager', is_manager=True)
+
+        employee_user = User.objects.create_user('bench_employee', password='x')
+        emp = Employee.objects.create(user=employee_user, E_id='BE1', E_name='Bench Employee', is_checked_in=True)
+        Attendance.objects.create(employee=emp, status='Present')
+
+        clients = {}
+        for who, user in (('manager', manager_user), ('employee', employee_user)):
+            clients[who] = Client()
+            clients[who].force_login(user)
+        return clients
+
+    def measure_views(self, clients, repeat):
+        return {
+            label: self.measure(clients[who], method, path, data, repeat)
+            for label, who, method, path, data in REQUESTS
+        }
+
+    def measure_stamp(self, repeat):
+        """employee_version() alone: the read the session-cached path adds to each request"""
+        user_id = User.objects.get(username='bench_employee').pk
+        middleware.employee_version(user_id)
+        durations = []
+        with CaptureQueriesContext(connection) as ctx:
+            for _ in range(repeat):
+                started = time.perf_counter()
+                middleware.employee_version(user_id)
+                durations.append(time.perf_counter() - started)
+        return {
+            'cache': settings.CACHES[getattr(settings, 'EMPLOYEE_SESSION_CACHE_ALIAS', 'default')]['BACKEND'],
+            'queries': round(len(ctx.captured_queries) / repeat, 2),
+            **summarize(durations),
+        }
+
+    def measure(self, client, method, path, data, repeat):
+        call = getattr(client, method)
+        call(path, data)  # warm up: templates, session copy
+        durations, queries = [], []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                call(path, data)
+                durations.append(time.perf_counter() - started)
+            queries.append(len(ctx.captured_queries))
+        return {'queries': round(sum(queries) / len(queries), 2), **summarize(durations)}
+
+    def report(self, results):
+        self.stdout.write(f"{'view':<22}{'queries before':>16}{'after':>8}{'p50 before':>14}{'after':>10}{'saved':>9}")
+        for label, *_ in REQUESTS:
+            before, after = results['per_request'][label], results['session_cached'][label]
+            self.stdout.write(
+                f"{label:<22}{before['queries']:>16.1f}{after['queries']:>8.1f}"
+                f"{before['p50_ms']:>12.2f}ms{after['p50_ms']:>8.2f}ms"
+                f"{before['p50_ms'] - after['p50_ms']:>7.2f}ms"
+            )
+        stamp = results['version_stamp']
+        self.stdout.write(
+            f"version stamp read ({stamp['cache']}): {stamp['queries']:.1f} queries, "
+            f"p50 {stamp['p50_ms']:.3f}ms, included in every 'after' figure"
+        )
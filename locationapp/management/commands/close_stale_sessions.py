@@ -0,0 +1,42 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from locationapp.session_sweeper import close_stale_sessions
+
+
+class Command(BaseCommand):
+    help = (
+        "Auto check out open sessions whose employee sent no location ping for a while "
+        "(phone died, tab closed), at the time they were last seen."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--idle-minutes', type=int,
+            default=getattr(settings, 'STALE_SESSION_MINUTES', 30),
+            help="Close sessions without a ping for this many minutes",
+        )
+        parser.add_argument('--batch-size', type=int, default=500, help="Sessions closed per UPDATE")
+        parser.add_argument(
+            '--interval', type=int, default=0,
+            help="Keep running and repeat every N seconds (0 = run once)",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            self.sweep(options)
+            if not options['interval']:
+                break
+            close_old_connections()
+            time.sleep(options['interval'])
+
+    def sweep(self, options):
+        started = time.perf_counter()
+        closed, checked_out = close_stale_sessions(options['idle_minutes'], options['batch_size'])
+        self.stdout.write(
+            f"Stale sessions: {closed:,} closed, {checked_out:,} employees checked out "
+            f"({time.perf_counter() - started:.2f}s)"
+        )
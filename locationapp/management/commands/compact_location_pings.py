@@ -0,0 +1,58 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from locationapp.location_history import days_to_downsample, downsample_day, purge_before
+
+
+class Command(BaseCommand):
+    help = "Downsample old LocationPing history and delete pings past the retention period."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--downsample-after', type=int,
+            default=getattr(settings, 'LOCATION_HISTORY_DOWNSAMPLE_DAYS', 7),
+            help="Downsample days older than this many days",
+        )
+        parser.add_argument(
+            '--bucket-minutes', type=int,
+            default=getattr(settings, 'LOCATION_HISTORY_DOWNSAMPLE_MINUTES', 15),
+            help="Keep one ping per employee per this many minutes",
+        )
+        parser.add_argument(
+            '--retain', type=int,
+            default=getattr(settings, 'LOCATION_HISTORY_RETENTION_DAYS', 90),
+            help="Delete pings older than this many days",
+        )
+        parser.add_argument('--chunk-size', type=int, default=5000, help="Rows per delete transaction")
+        parser.add_argument(
+            '--interval', type=int, default=0,
+            help="Keep running and repeat every N seconds (0 = run once)",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            self.compact(options)
+            if not options['interval']:
+                break
+            close_old_connections()
+            time.sleep(options['interval'])
+
+    def compact(self, options):
+        today = timezone.localdate()
+        started = time.perf_counter()
+
+        purged = purge_before(today - timedelta(days=options['retain']), options['chunk_size'])
+
+        merged = 0
+        for day in days_to_downsample(today, options['downsample_after'], options['retain']):
+            merged += downsample_day(day, options['bucket_minutes'], options['chunk_size'])
+
+        self.stdout.write(
+            f"Location history: {purged:,} expired pings deleted, {merged:,} pings merged "
+            f"by downsampling ({time.perf_counter() - started:.1f}s)"
+        )
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from locationapp.onboarding import IMPORT_COLUMNS, ImportResult, import_employees, read_csv, validate_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Create users and employees from a CSV file (columns: "
+        + ", ".join(IMPORT_COLUMNS)
+        + "). Every row is validated first; invalid rows are reported and skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file')
+        parser.add_argument('--workers', type=int, default=4, help="Password hashing processes (1 = this process)")
+        parser.add_argument('--dry-run', action='store_true', help="Only validate the file")
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['csv_file'], 'rb') as fh:
+                rows = read_csv(fh.read())
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        if options['dry_run']:
+            result = ImportResult()
+            valid = validate_rows(rows, result)
+            self.report(result)
+            self.stdout.write(f"{len(valid)} of {len(rows)} rows would be imported")
+            return
+
+        try:
+            result = import_employees(rows, workers=options['workers'])
+        except IntegrityError as e:
+            # A username/E_id was taken between validation and insert
+            raise CommandError(f"Nothing imported: {e}")
+        self.report(result)
+        self.stdout.write(self.style.SUCCESS(f"Imported {len(result.created)} of {len(rows)} employees"))
+
+    def report(self, result):
+        for line, message in result.errors:
+            self.stderr.write(f"line {line}: {message}")
@@ -0,0 +1,275 @@
+import heapq
+import random
+import secrets
+import threading
+import time
+from collections import defaultdict, namedtuple
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+
+from locationapp.benchmarking import (
+    benchmark_database, default_benchmark_db, is_throwaway_database, summarize, write_results,
+)
+from locationapp.loadgen import (
+    HttpSession, delete_sessions, delete_synthetic_employees, ensure_synthetic_employees, set_password,
+)
+from locationapp.location_buffer import location_buffer
+from locationapp.models import Employee, OFFICE_LAT, OFFICE_LON
+
+# One request of a simulated user: `pause` seconds are waited after it
+Step = namedtuple('Step', 'endpoint method path data expect pause')
+
+
+class InProcessSession:
+    """HttpSession look-alike that drives the full middleware/URL stack in this process"""
+
+    def __init__(self):
+        # A host ALLOWED_HOSTS accepts ('localhost' is allowed when it is empty and DEBUG is on)
+        hosts = [h for h in settings.ALLOWED_HOSTS if h != '*' and not h.startswith('.')]
+        self.client = Client(HTTP_HOST=hosts[0] if hosts else 'localhost')
+
+    def request(self, method, path, data=None):
+        call = self.client.post if method == 'POST' else self.client.get
+        response = call(path, data or {})
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response.status_code
+
+    @property
+    def session_key(self):
+        morsel = self.client.cookies.get(settings.SESSION_COOKIE_NAME)
+        return morsel.value if morsel is not None and morsel.value else None
+
+    def close(self):
+        pass
+
+
+def employee_day(user, password, E_id, options, rng):
+    """Login, check in, dashboard, a ping every interval (dashboard now and then), checkout, logout"""
+    position = {'latitude': OFFICE_LAT, 'longitude': OFFICE_LON}
+    interval = options['ping_interval']
+    yield Step('login', 'POST', '/login/', {'username': user.username, 'password': password}, 302, 0)
+    yield Step('check_in', 'POST', '/', {'E_id': E_id, **position}, 200, 0)
+    yield Step('employee_dashboard', 'GET', '/employee_dashboard/', None, 200, interval)
+    for i in range(1, options['pings'] + 1):
+        ping = {'latitude': OFFICE_LAT + rng.randint(-50, 50) * 1e-6, 'longitude': OFFICE_LON}
+        if i % options['dashboard_every']:
+            yield Step('update_location', 'POST', '/update_location/', ping, 200, interval)
+        else:
+            yield Step('update_location', 'POST', '/update_location/', ping, 200, 0)
+            yield Step('employee_dashboard', 'GET', '/employee_dashboard/', None, 200, interval)
+    yield Step('checkout', 'GET', '/checkout/', {'E_id': E_id}, 302, 0)
+    yield Step('logout', 'GET', '/logout/', None, 302, 0)
+
+
+def manager_day(user, password, employee_ids, rounds, options, rng):
+    """Login, then every manager interval: dashboard, payroll overview and one employee's salary"""
+    yield Step('login', 'POST', '/login/', {'username': user.username, 'password': password}, 302, 0)
+    for _ in range(rounds):
+        yield Step('manager_dashboard', 'GET', '/manager_dashboard/', None, 200, 0)
+        yield Step('salary_overview', 'GET', '/manager/salary-overview/', None, 200, 0)
+        employee_id = rng.choice(employee_ids)
+        yield Step('salary_detail', 'GET', f'/manager/salary/{employee_id}/view/', None, 200, options['manager_interval'])
+    yield Step('logout', 'GET', '/logout/', None, 302, 0)
+
+
+class Command(BaseCommand):
+    help = (
+        "End-to-end load test: N synthetic employees log in, check in, ping "
+        "update_location every interval, load their dashboard and check out "
+        "while managers browse the dashboard and payroll pages. Reports "
+        "throughput and p50/p95/p99 per endpoint. Runs in-process against a "
+        "throwaway database, or against a running server with --url (which "
+        "must use the same database as this command, a test/temporary one "
+        "unless --i-know is given). The synthetic users and their data are "
+        "deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employees', type=int, default=200, help="Simulated employees")
+        parser.add_argument('--managers', type=int, default=2, help="Simulated managers")
+        parser.add_argument('--pings', type=int, default=10, help="Location pings per employee (the length of the day)")
+        parser.add_argument('--ping-interval', type=float, default=60.0, help="Seconds between pings, as the frontend")
+        parser.add_argument('--dashboard-every', type=int, default=5, help="Reload the dashboard every N pings")
+        parser.add_argument('--manager-interval', type=float, default=30.0, help="Seconds between manager page rounds")
+        parser.add_argument('--ramp-up', type=float, help="Seconds over which employees arrive (default: one ping interval)")
+        parser.add_argument('--concurrency', type=int, default=16, help="Requests in flight at most (worker threads)")
+        parser.add_argument('--url', help="Drive a running server, e.g. http://127.0.0.1:8000")
+        parser.add_argument(
+            '--i-know', action='store_true',
+            help="With --url, allow a database that is not a test/temporary one",
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--json', help="Write the results to this JSON file")
+
+    def handle(self, *args, **options):
+        if options['employees'] < 1 or options['concurrency'] < 1 or options['dashboard_every'] < 1:
+            raise CommandError("--employees, --concurrency and --dashboard-every must be at least 1")
+        if options['url'] and not options['url'].startswith('http://'):
+            raise CommandError(f"Invalid --url {options['url']!r}, expected http://host:port")
+        if options['url'] and not options['i_know'] and not is_throwaway_database():
+            raise CommandError(
+                f"--url writes synthetic managers, employees and attendance to {connection.settings_dict['NAME']}, "
+                "which is not a test/temporary database. Point the server and this command at a throwaway "
+                "database, or pass --i-know."
+            )
+        if options['ramp_up'] is None:
+            options['ramp_up'] = options['ping_interval']
+
+        if options['url']:
+            try:
+                results = self.run(options)
+            finally:
+                # The server writes to a real database: leave nothing behind
+                delete_sessions(self.session_keys)
+                deleted = delete_synthetic_employees() + delete_synthetic_employees(prefix='loadmgr')
+                self.stdout.write(f"Deleted {deleted:,} synthetic users, employees and related rows")
+        else:
+            with benchmark_database(default_benchmark_db('load_test')):
+                results = self.run(options)
+                # Buffered pings must reach the throwaway database before it goes
+                location_buffer.flush()
+
+        self.report(results)
+        if options['json']:
+            write_results(options['json'], results)
+            self.stdout.write(f"Results written to {options['json']}")
+
+    def run(self, options):
+        self.session_keys = []
+        users = ensure_synthetic_employees(options['employees'])
+        managers = ensure_synthetic_employees(options['managers'], prefix='loadmgr', is_manager=True)
+        # Fresh for every run, never printed: the accounts cannot be reused
+        password = secrets.token_urlsafe(16)
+        set_password(users + managers, password)
+        Employee.objects.filter(user__in=users).update(is_checked_in=False)
+        employees = dict(Employee.objects.filter(user__in=users).values_list('user_id', 'E_id'))
+        employee_ids = list(Employee.objects.filter(user__in=users).values_list('pk', flat=True))
+
+        rng = random.Random(options['seed'])
+        day = options['ping_interval'] * options['pings'] + options['ramp_up']
+        rounds = max(1, int(day // options['manager_interval']))
+        actors = [
+            (employee_day(u, password, employees[u.pk], options, rng), rng.uniform(0, options['ramp_up']))
+            for u in users
+        ]
+        actors += [(manager_day(u, password, employee_ids, rounds, options, rng), 0.0) for u in managers]
+        connection.close()
+
+        self.stdout.write(
+            f"Simulating {len(users)} employees and {len(managers)} managers "
+            f"({'in-process' if not options['url'] else options['url']}, ~{day:.0f}s)..."
+        )
+        return {
+            'target': options['url'] or 'in-process',
+            'vendor': connection.vendor,
+            'employees': len(users),
+            'managers': len(managers),
+            'pings_per_employee': options['pings'],
+            'ping_interval': options['ping_interval'],
+            'concurrency': options['concurrency'],
+            **self.replay(actors, options),
+        }
+
+    def replay(self, actors, options):
+        """
+        Run every simulated user's steps at their scheduled times on a pool
+        of worker threads. When the server cannot keep up, requests start
+        late: the schedule lag is reported next to the latencies.
+        """
+        new_session = (lambda: HttpSession(options['url'])) if options['url'] else InProcessSession
+        started = time.monotonic()
+        queue = [(started + offset, n, steps, new_session()) for n, (steps, offset) in enumerate(actors)]
+        sessions = [session for _, _, _, session in queue]
+        heapq.heapify(queue)
+        ready = threading.Condition()
+        active = [len(queue)]
+
+        durations = defaultdict(list)
+        errors = defaultdict(lambda: defaultdict(int))  # endpoint -> unexpected status -> count
+        lag = []
+        record = threading.Lock()
+
+        def worker():
+            while True:
+                with ready:
+                    while True:
+                        if not active[0]:
+                            ready.notify_all()
+                            connection.close()
+                            return
+                        if queue and queue[0][0] <= time.monotonic():
+                            due, n, steps, session = heapq.heappop(queue)
+                            break
+                        ready.wait(queue[0][0] - time.monotonic() if queue else None)
+
+                step = next(steps, None)
+                if step is None:
+                    session.close()
+                    with ready:
+                        active[0] -= 1
+                        ready.notify_all()
+                    continue
+
+                began = time.perf_counter()
+                late = time.monotonic() - due
+                try:
+                    status = session.request(step.method, step.path, step.data)
+                except Exception as e:
+                    status = type(e).__name__
+                elapsed = time.perf_counter() - began
+                with record:
+                    durations[step.endpoint].append(elapsed)
+                    lag.append(late)
+                    if status != step.expect:
+                        errors[step.endpoint][str(status)] += 1
+
+                with ready:
+                    heapq.heappush(queue, (time.monotonic() + step.pause, n, steps, session))
+                    ready.notify()
+
+        threads = [threading.Thread(target=worker) for _ in range(options['concurrency'])]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        wall = time.monotonic() - started
+        # Sessions not ended by a logout (failed runs)
+        self.session_keys = [session.session_key for session in sessions if session.session_key]
+
+        requests = sum(len(d) for d in durations.values())
+        return {
+            'requests': requests,
+            'errors': sum(sum(e.values()) for e in errors.values()),
+            'wall_seconds': round(wall, 3),
+            'throughput_per_s': round(requests / wall, 1),
+            'schedule_lag': summarize(lag),
+            'endpoints': {
+                endpoint: {
+                    'errors': sum(errors[endpoint].values()),
+                    'unexpected_status': dict(errors[endpoint]),
+                    'throughput_per_s': round(len(samples) / wall, 2),
+                    **summarize(samples),
+                }
+                for endpoint, samples in sorted(durations.items())
+            },
+        }
+
+    def report(self, results):
+        self.stdout.write(
+            f"{'endpoint':<20}{'count':>7}{'req/s':>9}{'p50':>10}{'p95':>10}{'p99':>10}{'errors':>8}"
+        )
+        for endpoint, r in results['endpoints'].items():
+            self.stdout.write(
+                f"{endpoint:<20}{r['count']:>7}{r['throughput_per_s']:>9.2f}{r['p50_ms']:>8.1f}ms"
+                f"{r['p95_ms']:>8.1f}ms{r['p99_ms']:>8.1f}ms{r['errors']:>8}"
+            )
+        lag = results['schedule_lag']
+        self.stdout.write(
+            f"{'total':<20}{results['requests']:>7}{results['throughput_per_s']:>9.2f}  "
+            f"{results['errors']} errors in {results['wall_seconds']:.0f}s; "
+            f"schedule lag p95 {lag['p95_ms']:.0f}ms, max {lag['max_ms']:.0f}ms"
+        )
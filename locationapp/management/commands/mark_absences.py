@@ -0,0 +1,39 @@
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from locationapp.attendance import mark_absences
+
+
+class Command(BaseCommand):
+    help = (
+        "Write an Absent row for every employee without a check-in on each working day "
+        "of a range (default: yesterday). Safe to rerun; use --from/--to to backfill."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=date.fromisoformat, help="Day to mark (YYYY-MM-DD)")
+        parser.add_argument('--from', dest='start', type=date.fromisoformat, help="First day of a range")
+        parser.add_argument('--to', dest='end', type=date.fromisoformat, help="Last day of a range (default: yesterday)")
+        parser.add_argument('--batch-size', type=int, default=2000, help="Rows per INSERT")
+
+    def handle(self, *args, **options):
+        yesterday = timezone.localdate() - timedelta(days=1)
+        if options['date'] and (options['start'] or options['end']):
+            raise CommandError("Use either --date or --from/--to")
+        start = options['date'] or options['start'] or yesterday
+        end = options['date'] or options['end'] or (yesterday if options['start'] else start)
+        if end < start:
+            raise CommandError(f"--to {end} is before --from {start}")
+        if end >= timezone.localdate():
+            self.stderr.write(self.style.WARNING(
+                "Marking a day that is not over: employees who check in later are turned back to Present."
+            ))
+
+        started = time.perf_counter()
+        written = mark_absences(start, end, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Absences {start} to {end}: {written:,} rows written ({time.perf_counter() - started:.1f}s)"
+        ))
@@ -0,0 +1,44 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from locationapp.models import Employee
+from locationapp.summary import rebuild_monthly_summaries, validate_monthly_summaries
+
+
+class Command(BaseCommand):
+    help = "Rebuild or validate AttendanceMonthlySummary from the raw Attendance rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employee', help="Only this E_id")
+        parser.add_argument('--from', dest='start', help="First month to process (YYYY-MM-DD)")
+        parser.add_argument('--to', dest='end', help="Last month to process (YYYY-MM-DD)")
+        parser.add_argument(
+            '--validate', action='store_true',
+            help="Only compare the stored summaries with raw data and report differences",
+        )
+
+    def handle(self, *args, **options):
+        employees = Employee.objects.all()
+        if options['employee']:
+            employees = employees.filter(E_id=options['employee'])
+            if not employees.exists():
+                raise CommandError(f"Employee {options['employee']} not found")
+
+        try:
+            start = date.fromisoformat(options['start']) if options['start'] else None
+            end = date.fromisoformat(options['end']) if options['end'] else None
+        except ValueError as e:
+            raise CommandError(f"Invalid date: {e}")
+
+        if options['validate']:
+            mismatches = validate_monthly_summaries(employees, start, end)
+            for emp_id, year, month, field, stored, expected in mismatches:
+                self.stdout.write(f"employee={emp_id} {month}/{year} {field}: stored={stored} expected={expected}")
+            if mismatches:
+                raise CommandError(f"{len(mismatches)} summary values differ from raw attendance")
+            self.stdout.write(self.style.SUCCESS("Monthly summaries match raw attendance"))
+            return
+
+        count = rebuild_monthly_summaries(employees, start, end)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} monthly summaries"))
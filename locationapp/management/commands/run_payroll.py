@@ -0,0 +1,87 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from locationapp.payroll import (
+    compute_payroll_chunk, finish_payroll_run, pending_employee_ids, save_payroll_chunk, start_payroll_run,
+)
+
+
+def _init_worker():
+    # Spawned workers (macOS/Windows) start without Django; forked ones must
+    # not reuse the parent's database connections
+    django.setup()
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        "Compute the payroll of a month into a PayrollRun snapshot. Employees are "
+        "split into chunks computed by a process pool; each chunk is saved as it "
+        "completes, so an interrupted run resumes where it stopped."
+    )
+
+    def add_arguments(self, parser):
+        today = date.today()
+        parser.add_argument('--year', type=int, default=today.year)
+        parser.add_argument('--month', type=int, default=today.month)
+        parser.add_argument('--workers', type=int, default=4, help="Worker processes (1 = compute in this process)")
+        parser.add_argument('--chunk-size', type=int, default=500, help="Employees per chunk")
+        parser.add_argument(
+            '--rerun', action='store_true',
+            help="Start a new run even if the month already has a completed one",
+        )
+
+    def handle(self, *args, **options):
+        year, month = options['year'], options['month']
+        if not 1 <= month <= 12:
+            raise CommandError(f"Invalid month: {month}")
+
+        run = start_payroll_run(year, month, rerun=options['rerun'])
+        if run is None:
+            raise CommandError(f"Payroll for {month}/{year} already has a completed run; use --rerun for a new one")
+
+        pending = pending_employee_ids(run)
+        run.total_employees = run.processed_employees + len(pending)
+        run.save(update_fields=['total_employees'])
+        if run.processed_employees:
+            self.stdout.write(f"Resuming run #{run.pk}: {run.processed_employees} of {run.total_employees} employees done")
+
+        size = options['chunk_size']
+        chunks = [pending[i:i + size] for i in range(0, len(pending), size)]
+        try:
+            for figures in self.compute(chunks, year, month, options['workers']):
+                save_payroll_chunk(run, figures)
+                run.processed_employees += len(figures)
+                self.stdout.write(f"  {run.processed_employees}/{run.total_employees} employees", ending='\r')
+        except BaseException as e:
+            # KeyboardInterrupt included: the saved chunks are kept for the resume
+            finish_payroll_run(run, error=repr(e))
+            raise
+
+        finish_payroll_run(run)
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(
+            f"Payroll run #{run.pk} for {month}/{year} completed: {run.processed_employees} employees"
+        ))
+
+    def compute(self, chunks, year, month, workers):
+        """Computed chunks, in completion order"""
+        if workers <= 1 or len(chunks) <= 1:
+            for chunk in chunks:
+                yield compute_payroll_chunk(chunk, year, month)
+            return
+
+        # Children open their own connections
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            futures = [pool.submit(compute_payroll_chunk, chunk, year, month) for chunk in chunks]
+            try:
+                for future in as_completed(futures):
+                    yield future.result()
+            finally:
+                for future in futures:
+                    future.cancel()
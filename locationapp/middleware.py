@@ -0,0 +1,159 @@
+import time
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.decorators import sync_and_async_middleware
+from django.utils.functional import SimpleLazyObject
+
+from .employee_cache import RECORD_FIELDS, EmployeeRecord, employee_from_record
+from .models import Employee
+from .permissions import apermission_snapshot, permission_snapshot
+
+
+# ========================= REQUEST EMPLOYEE =========================
+
+SESSION_KEY = '_employee'
+
+_FIELDS = {f.attname: f for f in Employee._meta.concrete_fields}
+
+
+def _cache():
+    return caches[getattr(settings, 'EMPLOYEE_SESSION_CACHE_ALIAS', 'default')]
+
+
+def _version_key(user_id):
+    return f"employee:user:{user_id}:version"
+
+
+def employee_version(user_id):
+    """Current version stamp of a user's employee profile (created on first use)"""
+    cache = _cache()
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+async def aemployee_version(user_id):
+    cache = _cache()
+    key = _version_key(user_id)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, time.time_ns(), None)
+        version = await cache.aget(key)
+    return version
+
+
+def bump_employee_version(user_id):
+    """Make every session copy of this user's employee profile stale"""
+    if user_id is not None:
+        _cache().delete(_version_key(user_id))
+
+
+def _max_age():
+    return getattr(settings, 'EMPLOYEE_SESSION_MAX_AGE', 300)
+
+
+def _session_enabled():
+    """EMPLOYEE_SESSION_MAX_AGE = 0 loads the employee on every request"""
+    return _max_age() > 0
+
+
+def _session_entry(user_id, version, values):
+    return {
+        'user': user_id,
+        'version': version,
+        'at': time.time(),
+        # JSON sessions: Decimals are stored as strings; None = no employee
+        'values': None if values is None else [
+            str(v) if v is not None and not isinstance(v, (bool, int, float, str)) else v for v in values
+        ],
+    }
+
+
+def _from_session(entry, user_id, version):
+    """Employee from a session entry, or False if it is missing or stale"""
+    if (
+        not _session_enabled() or not entry or entry.get('user') != user_id or entry.get('version') != version
+        or time.time() - entry.get('at', 0) > _max_age()
+    ):
+        return False
+    if entry['values'] is None:
+        return None
+    if len(entry['values']) != len(RECORD_FIELDS):
+        return False  # stored with another RECORD_FIELDS layout
+    values = [_FIELDS[name].to_python(value) for name, value in zip(RECORD_FIELDS, entry['values'])]
+    return employee_from_record(EmployeeRecord(*values))
+
+
+def get_request_employee(request):
+    """
+    The Employee linked to request.user, or None. Loaded at most once per
+    request and kept in the session until its version stamp changes
+    (any save of that employee) or EMPLOYEE_SESSION_MAX_AGE passes.
+    """
+    if hasattr(request, '_employee'):
+        return request._employee
+    user = request.user
+    employee = None
+    if user.is_authenticated:
+        version = employee_version(user.pk)
+        employee = _from_session(request.session.get(SESSION_KEY), user.pk, version)
+        if employee is False:
+            values = Employee.objects.filter(user_id=user.pk).values_list(*RECORD_FIELDS).first()
+            if _session_enabled():
+                request.session[SESSION_KEY] = _session_entry(user.pk, version, values)
+            employee = employee_from_record(EmployeeRecord(*values)) if values else None
+    request._employee = employee
+    return employee
+
+
+async def aget_request_employee(request):
+    """get_request_employee() for async views"""
+    if hasattr(request, '_employee'):
+        return request._employee
+    user = await request.auser()
+    employee = None
+    if user.is_authenticated:
+        version = await aemployee_version(user.pk)
+        employee = _from_session(await request.session.aget(SESSION_KEY), user.pk, version)
+        if employee is False:
+            values = await Employee.objects.filter(user_id=user.pk).values_list(*RECORD_FIELDS).afirst()
+            if _session_enabled():
+                await request.session.aset(SESSION_KEY, _session_entry(user.pk, version, values))
+            employee = employee_from_record(EmployeeRecord(*values)) if values else None
+    request._employee = employee
+    return employee
+
+
+def _attach(request):
+    request.employee = SimpleLazyObject(lambda: get_request_employee(request))
+    request.aemployee = lambda: aget_request_employee(request)
+    request.permissions = SimpleLazyObject(lambda: permission_snapshot(request.user))
+    request.apermissions = lambda: _apermissions(request)
+
+
+async def _apermissions(request):
+    return await apermission_snapshot(await request.auser())
+
+
+@sync_and_async_middleware
+def EmployeeMiddleware(get_response):
+    """
+    Adds a lazy request.employee (and awaitable request.aemployee()) so
+    views stop looking up Employee.objects.filter(user=request.user), and
+    request.permissions, the cached PermissionSnapshot of request.user.
+    Must come after AuthenticationMiddleware.
+    """
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            _attach(request)
+            return await get_response(request)
+    else:
+        def middleware(request):
+            _attach(request)
+            return get_response(request)
+    return middleware
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locationapp', '0009_attendance_is_holiday_attendance_is_sunday_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='attendance',
+            name='is_holiday',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='attendance',
+            name='is_sunday',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['employee', 'date', 'status'], name='attendance_emp_date_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['date', 'id'], name='attendance_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['status'], name='attendance_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(condition=models.Q(('check_in_time__isnull', False), ('check_out_time__isnull', True)), fields=['employee', 'date'], name='attendance_open_session_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locationapp', '0010_attendance_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceMonthlySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField()),
+                ('month', models.IntegerField()),
+                ('days_present', models.IntegerField(default=0)),
+                ('full_days', models.IntegerField(default=0)),
+                ('sunday_holiday_days', models.IntegerField(default=0)),
+                ('total_hours', models.DecimalField(decimal_places=2, default=0, max_digits=8)),
+                ('regular_hours', models.DecimalField(decimal_places=2, default=0, max_digits=8)),
+                ('overtime_hours', models.DecimalField(decimal_places=2, default=0, max_digits=8)),
+                ('sunday_holiday_hours', models.DecimalField(decimal_places=2, default=0, max_digits=8)),
+                ('updated_on', models.DateTimeField(auto_now=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='locationapp.employee')),
+            ],
+            options={
+                'unique_together': {('employee', 'year', 'month')},
+            },
+        ),
+    ]
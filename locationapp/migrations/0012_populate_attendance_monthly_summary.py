@@ -0,0 +1,65 @@
+from decimal import Decimal
+
+from django.db import migrations
+
+
+def populate_summaries(apps, schema_editor):
+    """Build AttendanceMonthlySummary rows from the existing attendance history"""
+    Employee = apps.get_model('locationapp', 'Employee')
+    Attendance = apps.get_model('locationapp', 'Attendance')
+    AttendanceMonthlySummary = apps.get_model('locationapp', 'AttendanceMonthlySummary')
+
+    standard_hours = dict(Employee.objects.values_list('id', 'standard_hours_per_day'))
+    totals = {}
+
+    rows = Attendance.objects.filter(status='Present').values_list(
+        'employee_id', 'date', 'check_in_time', 'check_out_time', 'manual_hours', 'is_sunday', 'is_holiday'
+    )
+    for emp_id, day, check_in, check_out, manual, is_sunday, is_holiday in rows.iterator(chunk_size=5000):
+        standard = Decimal(standard_hours[emp_id])
+        if manual is not None:
+            hours = Decimal(str(float(manual)))
+        elif check_in and check_out:
+            hours = Decimal(str(round((check_out - check_in).total_seconds() / 3600, 2)))
+        elif check_in:
+            hours = standard
+        else:
+            hours = Decimal(0)
+        off_day = is_sunday or is_holiday
+
+        key = (emp_id, day.year, day.month)
+        t = totals.setdefault(key, {
+            'days_present': 0, 'full_days': 0, 'sunday_holiday_days': 0,
+            'total_hours': Decimal(0), 'regular_hours': Decimal(0),
+            'overtime_hours': Decimal(0), 'sunday_holiday_hours': Decimal(0),
+        })
+        t['days_present'] += 1
+        t['full_days'] += 1 if hours >= standard else 0
+        t['sunday_holiday_days'] += 1 if off_day else 0
+        t['total_hours'] += hours
+        t['regular_hours'] += min(hours, standard)
+        t['overtime_hours'] += hours if off_day else max(Decimal(0), hours - standard)
+        t['sunday_holiday_hours'] += hours if off_day else Decimal(0)
+
+    AttendanceMonthlySummary.objects.bulk_create(
+        [
+            AttendanceMonthlySummary(employee_id=emp_id, year=year, month=month, **t)
+            for (emp_id, year, month), t in totals.items()
+        ],
+        batch_size=1000,
+    )
+
+
+def clear_summaries(apps, schema_editor):
+    apps.get_model('locationapp', 'AttendanceMonthlySummary').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locationapp', '0011_attendancemonthlysummary'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_summaries, clear_summaries),
+    ]
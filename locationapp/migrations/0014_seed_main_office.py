@@ -0,0 +1,25 @@
+from django.db import migrations
+
+# Values of OFFICE_LAT / OFFICE_LON in models.py when offices were introduced
+MAIN_OFFICE_LAT = 30.8665825
+MAIN_OFFICE_LON = 75.9249735
+
+
+def seed_main_office(apps, schema_editor):
+    """Turn the hard-coded office into the first Office so behaviour is unchanged"""
+    Office = apps.get_model('locationapp', 'Office')
+    if not Office.objects.exists():
+        Office.objects.create(
+            name='Main Office', latitude=MAIN_OFFICE_LAT, longitude=MAIN_OFFICE_LON, radius_m=100
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locationapp', '0013_office'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_main_office, migrations.RunPython.noop),
+    ]
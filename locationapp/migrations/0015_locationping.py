@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locationapp', '0014_seed_main_office'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LocationPing',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('recorded_at', models.DateTimeField()),
+                ('lat_e7', models.IntegerField()),
+                ('lon_e7', models.IntegerField()),
+                ('samples', models.PositiveIntegerField(default=1, help_text='Raw pings merged into this row by downsampling')),
+                ('employee', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='locationapp.employee')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['employee', 'recorded_at'], name='locationping_emp_time_idx'), models.Index(fields=['day'], name='locationping_day_idx')],
+            },
+        ),
+    ]
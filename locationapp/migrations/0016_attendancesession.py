@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:30
+
+import datetime
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locationapp', '0015_locationping'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendance',
+            name='worked_hours',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=5),
+        ),
+        migrations.AlterField(
+            model_name='attendance',
+            name='date',
+            field=models.DateField(default=datetime.date.today),
+        ),
+        migrations.CreateModel(
+            name='AttendanceSession',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('check_in_time', models.DateTimeField()),
+                ('check_out_time', models.DateTimeField(blank=True, null=True)),
+                ('latitude', models.FloatField(blank=True, null=True)),
+                ('longitude', models.FloatField(blank=True, null=True)),
+                ('auto_checkout', models.BooleanField(default=False)),
+                ('checkout_reason', models.CharField(blank=True, max_length=100, null=True)),
+                ('attendance', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sessions', to='locationapp.attendance')),
+                ('office', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='locationapp.office')),
+            ],
+            options={
+                'ordering': ['check_in_time'],
+                'indexes': [models.Index(condition=models.Q(('check_out_time__isnull', True)), fields=['attendance'], name='attsession_open_idx')],
+            },
+        ),
+    ]
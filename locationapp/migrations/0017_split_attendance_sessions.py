@@ -0,0 +1,188 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations
+from django.db.models import Count
+
+CHUNK_SIZE = 2000
+# Duplicate (employee, date) groups merged per round
+GROUP_CHUNK_SIZE = 200
+
+SESSION_COLUMNS = (
+    'id', 'office_id', 'check_in_time', 'check_out_time', 'latitude', 'longitude',
+    'auto_checkout', 'checkout_reason',
+)
+
+
+def _hours(seconds):
+    return Decimal(str(round(seconds / 3600, 2)))
+
+
+def copy_sessions(Attendance, AttendanceSession):
+    """Every existing row with a check-in becomes one session of itself"""
+    last_id = 0
+    while True:
+        chunk = list(
+            Attendance.objects.filter(id__gt=last_id, check_in_time__isnull=False)
+            .order_by('id').values_list(*SESSION_COLUMNS)[:CHUNK_SIZE]
+        )
+        if not chunk:
+            break
+        last_id = chunk[-1][0]
+        AttendanceSession.objects.bulk_create([
+            AttendanceSession(
+                attendance_id=row_id, office_id=office_id, check_in_time=check_in, check_out_time=check_out,
+                latitude=lat, longitude=lon, auto_checkout=auto, checkout_reason=reason,
+            )
+            for row_id, office_id, check_in, check_out, lat, lon, auto, reason in chunk
+            # Some legacy rows hold unparseable times (0 / ''), read back as None
+            if check_in is not None
+        ])
+
+
+def merge_duplicates(Attendance, AttendanceSession):
+    """Fold every extra row of an (employee, date) into the oldest one"""
+    duplicates = (
+        Attendance.objects.values('employee_id', 'date')
+        .annotate(rows=Count('id')).filter(rows__gt=1)
+        .order_by('employee_id', 'date')
+    )
+    while True:
+        groups = {(g['employee_id'], g['date']) for g in duplicates[:GROUP_CHUNK_SIZE]}
+        if not groups:
+            break
+
+        rows = defaultdict(list)
+        candidates = Attendance.objects.filter(
+            employee_id__in={emp_id for emp_id, _ in groups}, date__in={day for _, day in groups},
+        ).order_by('id')
+        for row in candidates:
+            if (row.employee_id, row.date) in groups:
+                rows[(row.employee_id, row.date)].append(row)
+
+        merged_away = []
+        for day_rows in rows.values():
+            keeper, others = day_rows[0], day_rows[1:]
+            latest = day_rows[-1]
+            keeper.status = 'Present' if any(r.status == 'Present' for r in day_rows) else latest.status
+            keeper.is_sunday = any(r.is_sunday for r in day_rows)
+            keeper.is_holiday = any(r.is_holiday for r in day_rows)
+            adjusted = [r for r in day_rows if r.manual_hours is not None]
+            if adjusted:
+                keeper.manual_hours = adjusted[-1].manual_hours
+                keeper.adjustment_reason = adjusted[-1].adjustment_reason
+            keeper.auto_checkout = latest.auto_checkout
+            keeper.checkout_reason = latest.checkout_reason
+            for field in ('office_id', 'latitude', 'longitude'):
+                if getattr(keeper, field) is None:
+                    setattr(keeper, field, next((getattr(r, field) for r in others if getattr(r, field) is not None), None))
+            keeper.save()
+
+            ids = [r.id for r in others]
+            AttendanceSession.objects.filter(attendance_id__in=ids).update(attendance_id=keeper.id)
+            merged_away.extend(ids)
+
+        Attendance.objects.filter(id__in=merged_away).delete()
+
+
+def refresh_day_totals(Attendance, AttendanceSession):
+    """First check-in, last check-out and worked_hours of every row, from its sessions"""
+    last_id = 0
+    while True:
+        ids = list(
+            Attendance.objects.filter(id__gt=last_id, check_in_time__isnull=False)
+            .order_by('id').values_list('id', flat=True)[:CHUNK_SIZE]
+        )
+        if not ids:
+            break
+        last_id = ids[-1]
+
+        sessions = defaultdict(list)
+        for attendance_id, check_in, check_out in AttendanceSession.objects.filter(
+            attendance_id__in=ids
+        ).values_list('attendance_id', 'check_in_time', 'check_out_time'):
+            sessions[attendance_id].append((check_in, check_out))
+
+        rows = []
+        for attendance_id, pairs in sessions.items():
+            open_session = any(out is None for _, out in pairs)
+            rows.append(Attendance(
+                id=attendance_id,
+                check_in_time=min(in_ for in_, _ in pairs),
+                check_out_time=None if open_session else max(out for _, out in pairs),
+                worked_hours=_hours(sum((out - in_).total_seconds() for in_, out in pairs if out is not None)),
+            ))
+        Attendance.objects.bulk_update(rows, ['check_in_time', 'check_out_time', 'worked_hours'], batch_size=500)
+
+
+def rebuild_summaries(Employee, Attendance, AttendanceMonthlySummary):
+    """Merged days count once: recompute AttendanceMonthlySummary (rules of summary.row_contribution)"""
+    standard_hours = dict(Employee.objects.values_list('id', 'standard_hours_per_day'))
+    totals = {}
+
+    rows = Attendance.objects.filter(status='Present').values_list(
+        'employee_id', 'date', 'check_in_time', 'check_out_time', 'manual_hours', 'worked_hours',
+        'is_sunday', 'is_holiday',
+    )
+    for emp_id, day, check_in, check_out, manual, worked, is_sunday, is_holiday in rows.iterator(chunk_size=5000):
+        standard = Decimal(standard_hours[emp_id])
+        if manual is not None:
+            hours = Decimal(str(float(manual)))
+        elif check_in and check_out:
+            hours = Decimal(str(float(worked)))
+        elif check_in:
+            hours = standard
+        else:
+            hours = Decimal(0)
+        off_day = is_sunday or is_holiday
+
+        key = (emp_id, day.year, day.month)
+        t = totals.setdefault(key, {
+            'days_present': 0, 'full_days': 0, 'sunday_holiday_days': 0,
+            'total_hours': Decimal(0), 'regular_hours': Decimal(0),
+            'overtime_hours': Decimal(0), 'sunday_holiday_hours': Decimal(0),
+        })
+        t['days_present'] += 1
+        t['full_days'] += 1 if hours >= standard else 0
+        t['sunday_holiday_days'] += 1 if off_day else 0
+        t['total_hours'] += hours
+        t['regular_hours'] += min(hours, standard)
+        t['overtime_hours'] += hours if off_day else max(Decimal(0), hours - standard)
+        t['sunday_holiday_hours'] += hours if off_day else Decimal(0)
+
+    AttendanceMonthlySummary.objects.all().delete()
+    AttendanceMonthlySummary.objects.bulk_create(
+        [
+            AttendanceMonthlySummary(employee_id=emp_id, year=year, month=month, **t)
+            for (emp_id, year, month), t in totals.items()
+        ],
+        batch_size=1000,
+    )
+
+
+def split_attendance_sessions(apps, schema_editor):
+    Employee = apps.get_model('locationapp', 'Employee')
+    Attendance = apps.get_model('locationapp', 'Attendance')
+    AttendanceSession = apps.get_model('locationapp', 'AttendanceSession')
+    AttendanceMonthlySummary = apps.get_model('locationapp', 'AttendanceMonthlySummary')
+
+    copy_sessions(Attendance, AttendanceSession)
+    merge_duplicates(Attendance, AttendanceSession)
+    refresh_day_totals(Attendance, AttendanceSession)
+    rebuild_summaries(Employee, Attendance, AttendanceMonthlySummary)
+
+
+def drop_sessions(apps, schema_editor):
+    # Merged duplicate rows cannot be restored; the sessions table is dropped by 0016
+    apps.get_model('locationapp', 'AttendanceSession').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locationapp', '0016_attendancesession'),
+    ]
+
+    operations = [
+        migrations.RunPython(split_attendance_sessions, drop_sessions),
+    ]
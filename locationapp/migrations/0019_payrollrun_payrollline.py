@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locationapp', '0018_attendance_one_per_day'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PayrollRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField()),
+                ('month', models.IntegerField()),
+                ('status', models.CharField(choices=[('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='running', max_length=10)),
+                ('total_employees', models.IntegerField(default=0)),
+                ('processed_employees', models.IntegerField(default=0)),
+                ('started_on', models.DateTimeField(auto_now_add=True)),
+                ('finished_on', models.DateTimeField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-started_on'],
+                'indexes': [models.Index(fields=['year', 'month', 'status'], name='payrollrun_month_status_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PayrollLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('E_id', models.CharField(max_length=10)),
+                ('E_name', models.CharField(max_length=100)),
+                ('salary_type', models.CharField(choices=[('monthly', 'Monthly Fixed (Days-based)'), ('hourly', 'Hourly Rate (Hours-based)')], max_length=10)),
+                ('monthly_salary', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('hourly_rate', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('overtime_multiplier', models.DecimalField(decimal_places=2, max_digits=4)),
+                ('base_salary', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('overtime_pay', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('total_salary', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('total_hours', models.DecimalField(decimal_places=2, max_digits=8)),
+                ('regular_hours', models.DecimalField(decimal_places=2, max_digits=8)),
+                ('overtime_hours', models.DecimalField(decimal_places=2, max_digits=8)),
+                ('days_present', models.IntegerField()),
+                ('sunday_count', models.IntegerField()),
+                ('full_days', models.IntegerField()),
+                ('employee', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='locationapp.employee')),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='locationapp.payrollrun')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('run', 'employee'), name='payrollline_one_per_employee')],
+            },
+        ),
+    ]
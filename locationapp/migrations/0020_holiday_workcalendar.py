@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locationapp', '0019_payrollrun_payrollline'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='employee',
+            name='monthly_salary',
+            field=models.DecimalField(decimal_places=2, default=0.0, help_text='Fixed monthly salary (for the working days of the month)', max_digits=10),
+        ),
+        migrations.CreateModel(
+            name='Holiday',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('name', models.CharField(max_length=100)),
+                ('office', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='holidays', to='locationapp.office')),
+            ],
+            options={
+                'ordering': ['date'],
+                'indexes': [models.Index(fields=['date'], name='holiday_date_idx')],
+                'constraints': [models.UniqueConstraint(fields=('office', 'date'), name='holiday_office_day'), models.UniqueConstraint(condition=models.Q(('office__isnull', True)), fields=('date',), name='holiday_company_day')],
+            },
+        ),
+        migrations.CreateModel(
+            name='WorkCalendar',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField()),
+                ('month', models.IntegerField()),
+                ('working_day_bitmap', models.IntegerField()),
+                ('holiday_bitmap', models.IntegerField()),
+                ('working_days', models.IntegerField()),
+                ('holidays', models.IntegerField()),
+                ('computed_on', models.DateTimeField(auto_now=True)),
+                ('office', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='locationapp.office')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('office', 'year', 'month'), name='workcalendar_office_month'), models.UniqueConstraint(condition=models.Q(('office__isnull', True)), fields=('year', 'month'), name='workcalendar_company_month')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locationapp', '0021_shared_cache_table'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employee',
+            name='office',
+            field=models.ForeignKey(blank=True, help_text='Home office: its holidays are days off for the employee (payroll working days)', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='employees', to='locationapp.office'),
+        ),
+    ]
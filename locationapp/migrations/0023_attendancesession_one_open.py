@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:48
+
+from django.db import migrations, models
+from django.db.models import Count
+
+DUPLICATE_REASON = 'Duplicate open session'
+
+
+def close_duplicate_open_sessions(apps, schema_editor):
+    """
+    Days merged from duplicate rows (0018) and concurrent check-ins can
+    hold several open sessions. Keep the latest open and close the others
+    at their own check-in: an open session counts no hours, so the day
+    totals stay as they are.
+    """
+    AttendanceSession = apps.get_model('locationapp', 'AttendanceSession')
+    open_sessions = AttendanceSession.objects.filter(check_out_time__isnull=True)
+    duplicated = (
+        open_sessions.values('attendance_id').annotate(n=Count('id')).filter(n__gt=1).values_list('attendance_id', flat=True)
+    )
+    for attendance_id in list(duplicated):
+        *extra, _ = open_sessions.filter(attendance_id=attendance_id).order_by('check_in_time', 'id')
+        for session in extra:
+            session.check_out_time = session.check_in_time
+            session.checkout_reason = DUPLICATE_REASON
+            session.save(update_fields=['check_out_time', 'checkout_reason'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locationapp', '0022_employee_office'),
+    ]
+
+    operations = [
+        migrations.RunPython(close_duplicate_open_sessions, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='attendancesession',
+            constraint=models.UniqueConstraint(condition=models.Q(('check_out_time__isnull', True)), fields=('attendance',), name='attsession_one_open'),
+        ),
+        migrations.RemoveIndex(
+            model_name='attendancesession',
+            name='attsession_open_idx',
+        ),
+    ]
@@ -1,11 +1,59 @@
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.functions import Cast, Coalesce, Greatest, Least
 from django.contrib.auth.models import User
+from django.utils import timezone
 from math import radians, sin, cos, sqrt, atan2
-from datetime import timedelta, datetime
+from calendar import monthrange
+from datetime import date, timedelta, datetime
+from decimal import Decimal
 
-# Fixed office coordinates
+# Fixed office coordinates (default geofence when no Office is configured)
 OFFICE_LAT = 30.8665825
 OFFICE_LON = 75.9249735
+OFFICE_RADIUS_M = 100
+
+
+class Office(models.Model):
+    """A site employees check in at, with a circular or polygon geofence"""
+    name = models.CharField(max_length=100)
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    radius_m = models.FloatField(
+        default=OFFICE_RADIUS_M,
+        help_text="Geofence radius in meters (used when no polygon is set)"
+    )
+    polygon = models.JSONField(
+        null=True,
+        blank=True,
+        help_text="Optional boundary as [[lat, lon], ...]; overrides the radius"
+    )
+    is_active = models.BooleanField(default=True)
+
+    def __str__(self):
+        return self.name
+
+    def clean(self):
+        """The polygon must be at least 3 [lat, lon] pairs of numbers in degrees"""
+        if self.polygon in (None, '', []):
+            return
+        expected = 'expected a list of [lat, lon] pairs such as [[30.8665, 75.9249], [30.8670, 75.9249], ...]'
+        if not isinstance(self.polygon, list):
+            raise ValidationError({'polygon': f"Polygon is a {type(self.polygon).__name__}, {expected}"})
+        if len(self.polygon) < 3:
+            raise ValidationError({'polygon': f"Polygon has {len(self.polygon)} vertices, at least 3 are needed; {expected}"})
+        for n, vertex in enumerate(self.polygon, 1):
+            if (
+                not isinstance(vertex, (list, tuple)) or len(vertex) != 2
+                or not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in vertex)
+            ):
+                raise ValidationError({'polygon': f"Vertex {n} is {vertex!r}, {expected}"})
+            lat, lon = vertex
+            if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+                raise ValidationError({
+                    'polygon': f"Vertex {n} is {vertex!r}: latitude must be within ±90 and longitude within ±180"
+                })
 
 class Employee(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, null=True, blank=True)
@@ -13,6 +61,14 @@ class Employee(models.Model):
     E_name = models.CharField(max_length=100)
     latitude = models.FloatField(null=True, blank=True)
     longitude = models.FloatField(null=True, blank=True)
+    office = models.ForeignKey(
+        Office,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='employees',
+        help_text="Home office: its holidays are days off for the employee (payroll working days)"
+    )
     
     # Salary Configuration
     SALARY_TYPE_CHOICES = [
@@ -30,7 +86,7 @@ class Employee(models.Model):
         max_digits=10, 
         decimal_places=2, 
         default=0.0,
-        help_text="Fixed monthly salary (for 26 working days)"
+        help_text="Fixed monthly salary (for the working days of the month)"
     )
     
     hourly_rate = models.DecimalField(
@@ -74,9 +130,76 @@ class Employee(models.Model):
         return f"{self.E_name} ({self.E_id})"
 
 
+# ========================= HOURS AS SQL EXPRESSIONS =========================
+# Same rules as Attendance.hours_worked() / regular_hours() / overtime_hours()
+
+HOURS_FIELD = models.DecimalField(max_digits=8, decimal_places=2)
+
+
+def standard_hours_expression():
+    return Cast('employee__standard_hours_per_day', HOURS_FIELD)
+
+
+def hours_expression():
+    """Manual hours, else worked_hours of a closed day, else standard hours while checked in"""
+    return Coalesce(
+        'manual_hours',
+        Case(
+            When(check_in_time__isnull=False, check_out_time__isnull=False, then=F('worked_hours')),
+            When(check_in_time__isnull=False, then=standard_hours_expression()),
+            default=Value(Decimal(0)),
+            output_field=HOURS_FIELD,
+        ),
+        output_field=HOURS_FIELD,
+    )
+
+
+def regular_hours_expression():
+    return Least(hours_expression(), standard_hours_expression(), output_field=HOURS_FIELD)
+
+
+def overtime_expression():
+    """Every hour of a Sunday/holiday, else the hours beyond standard"""
+    return Case(
+        When(Q(is_sunday=True) | Q(is_holiday=True), then=hours_expression()),
+        default=Greatest(
+            hours_expression() - standard_hours_expression(), Value(Decimal(0)), output_field=HOURS_FIELD
+        ),
+        output_field=HOURS_FIELD,
+    )
+
+
+class AttendanceQuerySet(models.QuerySet):
+    """
+    Attendance rows with their hours computed by the database, so month
+    totals are a Sum() instead of a loop over model instances:
+
+        Attendance.objects.filter(...).with_overtime().aggregate(Sum('overtime'))
+    """
+
+    def with_hours(self):
+        return self.annotate(hours=hours_expression())
+
+    def with_regular_hours(self):
+        return self.annotate(regular=regular_hours_expression())
+
+    def with_overtime(self):
+        return self.annotate(overtime=overtime_expression())
+
+
+def day_totals(sessions):
+    """(first check-in, last check-out or None while one is open, worked_hours) of (check_in, check_out) pairs"""
+    check_in = min(in_ for in_, _ in sessions)
+    open_session = any(out is None for _, out in sessions)
+    check_out = None if open_session else max(out for _, out in sessions)
+    seconds = sum((out - in_).total_seconds() for in_, out in sessions if out is not None)
+    return check_in, check_out, Decimal(str(round(seconds / 3600, 2)))
+
+
 class Attendance(models.Model):
     employee = models.ForeignKey('Employee', on_delete=models.CASCADE)
-    date = models.DateField(auto_now_add=True)
+    office = models.ForeignKey(Office, on_delete=models.SET_NULL, null=True, blank=True)
+    date = models.DateField(default=date.today)
     status = models.CharField(max_length=10)  # Present/Absent
     latitude = models.FloatField(null=True, blank=True)
     longitude = models.FloatField(null=True, blank=True)
@@ -89,15 +212,31 @@ class Attendance(models.Model):
     manual_hours = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
     adjustment_reason = models.TextField(null=True, blank=True)
 
-    @property
-    def hours_worked(self):
-        if self.manual_hours is not None:
-            return float(self.manual_hours)
-        if self.check_in_time and self.check_out_time:
-            delta = self.check_out_time - self.check_in_time
-            hours = delta.total_seconds() / 3600
-            return round(hours, 2)
-        return 0.0
+    # One row per employee and day: check_in_time is the first check-in,
+    # check_out_time the last check-out (empty while a session is open) and
+    # worked_hours the total of the closed AttendanceSessions
+    worked_hours = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+
+    objects = AttendanceQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['employee', 'date'], name='attendance_one_per_day'),
+        ]
+        indexes = [
+            # Daily lookups: today's record, calendars, payroll by employee
+            models.Index(fields=['employee', 'date', 'status'], name='attendance_emp_date_status_idx'),
+            # Manager dashboard ordering/keyset pagination and month-wide payroll scans
+            models.Index(fields=['date', 'id'], name='attendance_date_id_idx'),
+            # Present/absent totals
+            models.Index(fields=['status'], name='attendance_status_idx'),
+            # Open sessions (checked in, not checked out); a partial index where supported
+            models.Index(
+                fields=['employee', 'date'],
+                name='attendance_open_session_idx',
+                condition=models.Q(check_in_time__isnull=False, check_out_time__isnull=True),
+            ),
+        ]
 
     def hours_worked(self):
         """Calculate total hours worked"""
@@ -105,9 +244,7 @@ class Attendance(models.Model):
             return float(self.manual_hours)
         
         if self.check_in_time and self.check_out_time:
-            duration = self.check_out_time - self.check_in_time
-            hours = duration.total_seconds() / 3600
-            return round(hours, 2)
+            return float(self.worked_hours)
         
         if self.check_in_time and not self.check_out_time:
             return float(self.employee.standard_hours_per_day)
@@ -136,10 +273,55 @@ class Attendance(models.Model):
         """Calculate how many full days this represents (8 hours = 1 day)"""
         return round(self.regular_hours() / self.employee.standard_hours_per_day, 2)
 
+    def refresh_totals(self, save=True):
+        """Recompute first check-in, last check-out and worked_hours from the sessions"""
+        sessions = list(self.sessions.values_list('check_in_time', 'check_out_time'))
+        if sessions:
+            self.check_in_time, self.check_out_time, self.worked_hours = day_totals(sessions)
+        elif self.check_in_time:
+            # Row written without sessions (older code, direct edits): its own times are the one session
+            _, _, self.worked_hours = day_totals([(self.check_in_time, self.check_out_time)])
+        else:
+            self.worked_hours = Decimal(0)
+        if save:
+            self.save(update_fields=['check_in_time', 'check_out_time', 'worked_hours', 'auto_checkout', 'checkout_reason'])
+
     def __str__(self):
         return f"{self.employee.E_name} - {self.date} - {self.status}"
 
 
+class AttendanceSession(models.Model):
+    """One check-in/check-out pair; a day's Attendance row can have several"""
+    attendance = models.ForeignKey(Attendance, on_delete=models.CASCADE, related_name='sessions')
+    office = models.ForeignKey(Office, on_delete=models.SET_NULL, null=True, blank=True)
+    check_in_time = models.DateTimeField()
+    check_out_time = models.DateTimeField(null=True, blank=True)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    auto_checkout = models.BooleanField(default=False)
+    checkout_reason = models.CharField(max_length=100, null=True, blank=True)
+
+    class Meta:
+        ordering = ['check_in_time']
+        constraints = [
+            # At most one open session a day, also under concurrent check-ins.
+            # The partial unique index also serves the open-session lookups.
+            models.UniqueConstraint(
+                fields=['attendance'],
+                name='attsession_one_open',
+                condition=models.Q(check_out_time__isnull=True),
+            ),
+        ]
+
+    def hours(self):
+        if not self.check_out_time:
+            return 0.0
+        return round((self.check_out_time - self.check_in_time).total_seconds() / 3600, 2)
+
+    def __str__(self):
+        return f"{self.attendance} - {self.check_in_time:%H:%M}"
+
+
 class SalaryAdjustment(models.Model):
     """Model to track HR manual salary adjustments"""
     employee = models.ForeignKey(Employee, on_delete=models.CASCADE)
@@ -158,6 +340,215 @@ class SalaryAdjustment(models.Model):
         return f"{self.employee.E_name} - {self.month}/{self.year} - ₹{self.adjusted_salary}"
 
 
+class Holiday(models.Model):
+    """A day off for the whole company (no office) or for one office"""
+    date = models.DateField()
+    name = models.CharField(max_length=100)
+    office = models.ForeignKey(Office, on_delete=models.CASCADE, null=True, blank=True, related_name='holidays')
+
+    class Meta:
+        ordering = ['date']
+        constraints = [
+            models.UniqueConstraint(fields=['office', 'date'], name='holiday_office_day'),
+            # NULLs are distinct in a unique index: company-wide days need their own
+            models.UniqueConstraint(fields=['date'], condition=Q(office__isnull=True), name='holiday_company_day'),
+        ]
+        indexes = [
+            models.Index(fields=['date'], name='holiday_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} - {self.name} ({self.office or 'all offices'})"
+
+
+class WorkCalendar(models.Model):
+    """
+    Precomputed working days of one month, company-wide (no office) or for
+    one office. Bit d-1 of a bitmap stands for day d of the month.
+    Rebuilt by work_calendar.month_calendar() after a Holiday change.
+    """
+    office = models.ForeignKey(Office, on_delete=models.CASCADE, null=True, blank=True)
+    year = models.IntegerField()
+    month = models.IntegerField()
+    working_day_bitmap = models.IntegerField()
+    holiday_bitmap = models.IntegerField()
+    working_days = models.IntegerField()
+    holidays = models.IntegerField()
+    computed_on = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['office', 'year', 'month'], name='workcalendar_office_month'),
+            models.UniqueConstraint(
+                fields=['year', 'month'], condition=Q(office__isnull=True), name='workcalendar_company_month',
+            ),
+        ]
+
+    @property
+    def days_in_month(self):
+        return monthrange(self.year, self.month)[1]
+
+    def is_working_day(self, day):
+        """day: a date of this month or its day number"""
+        day = getattr(day, 'day', day)
+        return bool(self.working_day_bitmap >> (day - 1) & 1)
+
+    def is_holiday(self, day):
+        day = getattr(day, 'day', day)
+        return bool(self.holiday_bitmap >> (day - 1) & 1)
+
+    def __str__(self):
+        return f"{self.month}/{self.year} ({self.office or 'all offices'}) - {self.working_days} working days"
+
+
+class AttendanceMonthlySummary(models.Model):
+    """Per employee-month attendance totals, kept up to date from Attendance saves"""
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE)
+    year = models.IntegerField()
+    month = models.IntegerField()
+    days_present = models.IntegerField(default=0)
+    full_days = models.IntegerField(default=0)
+    sunday_holiday_days = models.IntegerField(default=0)
+    total_hours = models.DecimalField(max_digits=8, decimal_places=2, default=0)
+    regular_hours = models.DecimalField(max_digits=8, decimal_places=2, default=0)
+    overtime_hours = models.DecimalField(max_digits=8, decimal_places=2, default=0)
+    sunday_holiday_hours = models.DecimalField(max_digits=8, decimal_places=2, default=0)
+    updated_on = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['employee', 'year', 'month']
+
+    def __str__(self):
+        return f"{self.employee.E_name} - {self.month}/{self.year} - {self.days_present} days"
+
+
+class PayrollRun(models.Model):
+    """
+    One month-end payroll computation (manage.py run_payroll). Its lines
+    are a snapshot: salary views read the latest completed run of a month
+    instead of recomputing, and later attendance edits need a new run.
+    """
+    STATUS_CHOICES = [
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    year = models.IntegerField()
+    month = models.IntegerField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='running')
+    total_employees = models.IntegerField(default=0)
+    processed_employees = models.IntegerField(default=0)
+    started_on = models.DateTimeField(auto_now_add=True)
+    finished_on = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-started_on']
+        indexes = [
+            models.Index(fields=['year', 'month', 'status'], name='payrollrun_month_status_idx'),
+        ]
+
+    @property
+    def progress(self):
+        """Percentage of employees processed"""
+        if not self.total_employees:
+            return 100.0 if self.status == 'completed' else 0.0
+        return round(100 * self.processed_employees / self.total_employees, 1)
+
+    def __str__(self):
+        return f"Payroll {self.month}/{self.year} - {self.status} ({self.processed_employees}/{self.total_employees})"
+
+
+class PayrollLine(models.Model):
+    """The salary of one employee in a PayrollRun; written once, never updated"""
+    run = models.ForeignKey(PayrollRun, on_delete=models.CASCADE, related_name='lines')
+    # Kept when the employee is deleted: the E_id/E_name copies identify the line
+    employee = models.ForeignKey(Employee, on_delete=models.SET_NULL, null=True, blank=True)
+    E_id = models.CharField(max_length=10)
+    E_name = models.CharField(max_length=100)
+    salary_type = models.CharField(max_length=10, choices=Employee.SALARY_TYPE_CHOICES)
+    monthly_salary = models.DecimalField(max_digits=10, decimal_places=2)
+    hourly_rate = models.DecimalField(max_digits=10, decimal_places=2)
+    overtime_multiplier = models.DecimalField(max_digits=4, decimal_places=2)
+    base_salary = models.DecimalField(max_digits=12, decimal_places=2)
+    overtime_pay = models.DecimalField(max_digits=12, decimal_places=2)
+    total_salary = models.DecimalField(max_digits=12, decimal_places=2)
+    total_hours = models.DecimalField(max_digits=8, decimal_places=2)
+    regular_hours = models.DecimalField(max_digits=8, decimal_places=2)
+    overtime_hours = models.DecimalField(max_digits=8, decimal_places=2)
+    days_present = models.IntegerField()
+    sunday_count = models.IntegerField()
+    full_days = models.IntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['run', 'employee'], name='payrollline_one_per_employee'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            raise ValueError("Payroll lines are immutable; start a new PayrollRun instead")
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.E_name} - {self.run.month}/{self.run.year} - ₹{self.total_salary}"
+
+
+class LocationPing(models.Model):
+    """
+    Append-only location history. Rows are kept narrow: coordinates are
+    scaled integers (degrees x 1e7, about 1 cm precision) and `day` is the
+    partition key used for range pruning, downsampling and retention.
+    """
+    COORD_SCALE = 10_000_000
+
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, db_index=False)
+    day = models.DateField()
+    recorded_at = models.DateTimeField()
+    lat_e7 = models.IntegerField()
+    lon_e7 = models.IntegerField()
+    samples = models.PositiveIntegerField(default=1, help_text="Raw pings merged into this row by downsampling")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['employee', 'recorded_at'], name='locationping_emp_time_idx'),
+            models.Index(fields=['day'], name='locationping_day_idx'),
+        ]
+
+    @classmethod
+    def from_degrees(cls, employee_id, lat, lon, recorded_at):
+        return cls(
+            employee_id=employee_id,
+            day=timezone.localdate(recorded_at),
+            recorded_at=recorded_at,
+            lat_e7=round(lat * cls.COORD_SCALE),
+            lon_e7=round(lon * cls.COORD_SCALE),
+        )
+
+    @classmethod
+    def history(cls, employee, start, end):
+        """Pings of one employee between two datetimes, oldest first"""
+        return cls.objects.filter(
+            employee=employee,
+            day__gte=timezone.localdate(start),
+            day__lte=timezone.localdate(end),
+            recorded_at__gte=start,
+            recorded_at__lte=end,
+        ).order_by('recorded_at')
+
+    @property
+    def latitude(self):
+        return self.lat_e7 / self.COORD_SCALE
+
+    @property
+    def longitude(self):
+        return self.lon_e7 / self.COORD_SCALE
+
+    def __str__(self):
+        return f"{self.employee_id} @ {self.recorded_at}: {self.latitude}, {self.longitude}"
+
+
 # Haversine formula
 def calculate_distance(lat1, lon1, lat2, lon2):
     R = 6371000
@@ -0,0 +1,183 @@
+import csv
+import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal, InvalidOperation
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from .employee_cache import employee_cache
+from .middleware import bump_employee_version
+from .models import Employee
+
+
+# ========================= BULK EMPLOYEE IMPORT =========================
+
+# CSV header; the first four columns are required
+IMPORT_COLUMNS = ('username', 'password', 'E_id', 'E_name', 'salary_type', 'monthly_salary', 'hourly_rate', 'role')
+REQUIRED_COLUMNS = IMPORT_COLUMNS[:4]
+
+SALARY_TYPES = {value for value, _ in Employee.SALARY_TYPE_CHOICES}
+ROLES = {'employee': False, 'manager': True}
+
+_USERNAME_MAX = User._meta.get_field('username').max_length
+_E_ID_MAX = Employee._meta.get_field('E_id').max_length
+_E_NAME_MAX = Employee._meta.get_field('E_name').max_length
+
+
+class ImportResult:
+    """Outcome of an import: E_ids created and (line, message) of each rejected row"""
+
+    def __init__(self):
+        self.created = []
+        self.errors = []
+
+    @property
+    def ok(self):
+        return not self.errors
+
+
+def read_csv(data):
+    """[(line number, row dict)] from CSV text or bytes; the header is line 1"""
+    if isinstance(data, bytes):
+        data = data.decode('utf-8-sig')
+    reader = csv.DictReader(io.StringIO(data))
+    missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or [])]
+    if missing:
+        raise ValueError(f"Missing column(s): {', '.join(missing)}")
+    return [(reader.line_num, row) for row in reader]
+
+
+def _amount(value, field):
+    try:
+        amount = Decimal(value or 0)
+    except InvalidOperation:
+        raise ValueError(f"{field} is not a number: {value!r}")
+    if amount < 0 or amount >= 10 ** 8:
+        raise ValueError(f"{field} out of range: {value}")
+    return amount.quantize(Decimal('0.01'))
+
+
+def _clean(row):
+    """Normalised values of one row; raises ValueError with the reason"""
+    values = {column: (row.get(column) or '').strip() for column in IMPORT_COLUMNS}
+    values['password'] = row.get('password') or ''
+
+    empty = [column for column in REQUIRED_COLUMNS if not values[column]]
+    if empty:
+        raise ValueError(f"Required: {', '.join(empty)}")
+    if len(values['username']) > _USERNAME_MAX:
+        raise ValueError(f"username longer than {_USERNAME_MAX} characters")
+    if len(values['E_id']) > _E_ID_MAX:
+        raise ValueError(f"E_id longer than {_E_ID_MAX} characters")
+    if len(values['E_name']) > _E_NAME_MAX:
+        raise ValueError(f"E_name longer than {_E_NAME_MAX} characters")
+
+    values['salary_type'] = values['salary_type'].lower() or 'monthly'
+    if values['salary_type'] not in SALARY_TYPES:
+        raise ValueError(f"salary_type must be one of {', '.join(sorted(SALARY_TYPES))}")
+    values['monthly_salary'] = _amount(values['monthly_salary'], 'monthly_salary')
+    values['hourly_rate'] = _amount(values['hourly_rate'], 'hourly_rate')
+
+    role = values.pop('role').lower() or 'employee'
+    if role not in ROLES:
+        raise ValueError("role must be Employee or Manager")
+    values['is_manager'] = ROLES[role]
+    return values
+
+
+def validate_rows(rows, result):
+    """
+    Check every row before anything is written: field values, duplicates
+    inside the file and against the database (one query per key).
+    Returns the valid rows; the others are added to result.errors.
+    """
+    cleaned = []
+    for line, row in rows:
+        try:
+            cleaned.append((line, _clean(row)))
+        except ValueError as e:
+            result.errors.append((line, str(e)))
+
+    usernames = {values['username'] for _, values in cleaned}
+    E_ids = {values['E_id'] for _, values in cleaned}
+    taken_usernames = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+    taken_E_ids = set(Employee.objects.filter(E_id__in=E_ids).values_list('E_id', flat=True))
+
+    valid, seen_usernames, seen_E_ids = [], set(), set()
+    for line, values in cleaned:
+        if values['username'] in taken_usernames:
+            result.errors.append((line, f"Username {values['username']} already exists"))
+        elif values['E_id'] in taken_E_ids:
+            result.errors.append((line, f"Employee ID {values['E_id']} already exists"))
+        elif values['username'] in seen_usernames:
+            result.errors.append((line, f"Username {values['username']} repeated in the file"))
+        elif values['E_id'] in seen_E_ids:
+            result.errors.append((line, f"Employee ID {values['E_id']} repeated in the file"))
+        else:
+            valid.append(values)
+        seen_usernames.add(values['username'])
+        seen_E_ids.add(values['E_id'])
+    return valid
+
+
+def hash_passwords(passwords, workers=4):
+    """
+    make_password() of each password. PBKDF2 costs ~0.5 s of CPU per call,
+    so they are spread over a process pool. Spawned workers: safe to start
+    from a threaded web server. They only import the hashers (this module
+    needs the app registry, so it must not be their initializer).
+    """
+    if workers <= 1 or len(passwords) <= 1:
+        return [make_password(password) for password in passwords]
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=django.setup) as pool:
+        return list(pool.map(make_password, passwords, chunksize=max(1, len(passwords) // (workers * 4))))
+
+
+def import_employees(rows, workers=4):
+    """
+    Create a User and an Employee for every valid row of read_csv().
+    Invalid rows are reported in the result and skipped; the valid ones
+    are inserted with bulk_create in one transaction.
+    """
+    result = ImportResult()
+    valid = validate_rows(rows, result)
+    if not valid:
+        return result
+
+    hashes = hash_passwords([values['password'] for values in valid], workers)
+
+    with transaction.atomic():
+        User.objects.bulk_create(
+            [User(username=values['username'], password=hashed) for values, hashed in zip(valid, hashes)],
+            batch_size=1000,
+        )
+        user_ids = dict(
+            User.objects.filter(username__in=[values['username'] for values in valid]).values_list('username', 'id')
+        )
+        Employee.objects.bulk_create(
+            [
+                Employee(
+                    user_id=user_ids[values['username']],
+                    E_id=values['E_id'],
+                    E_name=values['E_name'],
+                    salary_type=values['salary_type'],
+                    monthly_salary=values['monthly_salary'],
+                    hourly_rate=values['hourly_rate'],
+                    is_manager=values['is_manager'],
+                )
+                for values in valid
+            ],
+            batch_size=1000,
+        )
+
+    # bulk_create sends no post_save: drop cached "no such E_id" lookups by hand
+    for values in valid:
+        employee_cache.invalidate(values['E_id'])
+        bump_employee_version(user_ids[values['username']])
+    result.created = [values['E_id'] for values in valid]
+    return result
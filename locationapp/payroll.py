@@ -0,0 +1,260 @@
+from calendar import monthrange
+from datetime import date
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Employee, PayrollLine, PayrollRun, SalaryAdjustment
+from .payroll_cache import payroll_cache
+from .summary import monthly_summaries
+from .work_calendar import working_days_in_month
+
+
+# ========================= BULK PAYROLL ENGINE =========================
+
+def month_bounds(year, month):
+    """First day of the month and first day of the next month"""
+    start = date(year, month, 1)
+    end = date(year, month, monthrange(year, month)[1])
+    return start, date.fromordinal(end.toordinal() + 1)
+
+
+def _attendance_totals(employees, year, month):
+    """
+    Month totals of every employee from AttendanceMonthlySummary:
+    one indexed query, no scan of the raw attendance rows.
+    """
+    summaries = monthly_summaries([e.pk for e in employees], year, month)
+    return {
+        pk: {
+            'total_hours': float(s.total_hours),
+            'regular_hours': float(s.regular_hours),
+            'overtime_hours': float(s.overtime_hours),
+            'days_present': s.days_present,
+            'sunday_count': s.sunday_holiday_days,
+            'full_days': s.full_days,
+        }
+        for pk, s in summaries.items()
+    }
+
+
+def salary_figures(emp, totals):
+    """The numbers of one salary line, as stored on a PayrollLine"""
+    hourly_rate = float(emp.hourly_rate)
+    multiplier = float(emp.overtime_rate_multiplier)
+
+    if emp.salary_type == 'hourly':
+        base_salary = totals['total_hours'] * hourly_rate
+    else:
+        base_salary = float(emp.salary)
+
+    overtime_pay = totals['overtime_hours'] * hourly_rate * multiplier
+
+    return {
+        'E_id': emp.E_id,
+        'E_name': emp.E_name,
+        'salary_type': emp.salary_type,
+        'monthly_salary': float(emp.monthly_salary),
+        'hourly_rate': round(hourly_rate, 2),
+        'overtime_multiplier': multiplier,
+        'base_salary': round(base_salary, 2),
+        'overtime_pay': round(overtime_pay, 2),
+        'total_salary': round(base_salary + overtime_pay, 2),
+        'total_hours': round(totals['total_hours'], 2),
+        'regular_hours': round(totals['regular_hours'], 2),
+        'overtime_hours': round(totals['overtime_hours'], 2),
+        'days_present': totals['days_present'],
+        'sunday_count': totals['sunday_count'],
+        'full_days': totals['full_days'],
+    }
+
+
+def salary_line(emp, figures, adjustment, working_days):
+    """Template context of a salary line, from live or snapshot figures"""
+    total_salary = figures['total_salary']
+    return {
+        'employee': emp,
+        'E_id': figures['E_id'],
+        'E_name': figures['E_name'],
+        'salary_type': figures['salary_type'],
+        'monthly_salary': figures['monthly_salary'],
+        'working_days': working_days,
+        'daily_rate': round(figures['monthly_salary'] / working_days, 2) if working_days else 0.0,
+        'hourly_rate': figures['hourly_rate'],
+        'overtime_multiplier': figures['overtime_multiplier'],
+        'base_salary': figures['base_salary'],
+        'overtime_pay': figures['overtime_pay'],
+        'overtime_salary': figures['overtime_pay'],
+        'total_salary': total_salary,
+        'calculated_salary': total_salary,
+        'total_hours': figures['total_hours'],
+        'total_regular_hours': figures['regular_hours'],
+        'overtime_hours': figures['overtime_hours'],
+        'total_overtime_hours': figures['overtime_hours'],
+        'total_days_present': figures['days_present'],
+        'weekday_count': figures['days_present'] - figures['sunday_count'],
+        'sunday_count': figures['sunday_count'],
+        'full_days_worked': figures['full_days'],
+        'adjustment': adjustment,
+        'has_adjustment': adjustment is not None,
+        'final_salary': float(adjustment.adjusted_salary) if adjustment else total_salary,
+    }
+
+
+def _adjustments(employee_ids, year, month):
+    return {
+        adj.employee_id: adj
+        for adj in SalaryAdjustment.objects.filter(employee__in=employee_ids, month=month, year=year)
+    }
+
+
+def working_days_by_office(employees, year, month):
+    """{office_id: working days of the month} for the home offices of employees (None: company-wide)"""
+    return {
+        office_id: working_days_in_month(year, month, office_id)
+        for office_id in {emp.office_id for emp in employees}
+    }
+
+
+def calculate_payroll(employees=None, month=None, year=None):
+    """
+    Compute the monthly salary of many employees at once.
+    Returns {employee_id: salary line} using a constant number of queries
+    (employees, monthly summaries, salary adjustments) whatever the headcount.
+    """
+    today = date.today()
+    month = month or today.month
+    year = year or today.year
+    if employees is None:
+        employees = Employee.objects.all()
+    employees = list(employees)
+
+    totals = _attendance_totals(employees, year, month)
+    adjustments = _adjustments([e.pk for e in employees], year, month)
+    working_days = working_days_by_office(employees, year, month)
+
+    return {
+        emp.pk: salary_line(
+            emp, salary_figures(emp, totals[emp.pk]), adjustments.get(emp.pk), working_days[emp.office_id],
+        )
+        for emp in employees
+    }
+
+
+# ========================= PAYROLL RUNS =========================
+
+# salary_figures() keys, i.e. the columns of a PayrollLine
+LINE_FIELDS = (
+    'E_id', 'E_name', 'salary_type', 'monthly_salary', 'hourly_rate', 'overtime_multiplier',
+    'base_salary', 'overtime_pay', 'total_salary', 'total_hours', 'regular_hours', 'overtime_hours',
+    'days_present', 'sunday_count', 'full_days',
+)
+
+
+def start_payroll_run(year, month, rerun=False):
+    """
+    The run to work on for a month: the latest unfinished one if an earlier
+    run was interrupted, else a new run. Returns None when the month already
+    has a completed run and rerun is False.
+    """
+    with transaction.atomic():
+        runs = PayrollRun.objects.select_for_update().filter(year=year, month=month)
+        unfinished = runs.exclude(status='completed').first()
+        if unfinished:
+            unfinished.status = 'running'
+            unfinished.error = None
+            unfinished.save(update_fields=['status', 'error'])
+            return unfinished
+        if not rerun and runs.filter(status='completed').exists():
+            return None
+        return PayrollRun.objects.create(year=year, month=month)
+
+
+def pending_employee_ids(run):
+    """Employees that still have no line in the run, by id"""
+    done = run.lines.filter(employee__isnull=False).values('employee_id')
+    return list(Employee.objects.exclude(pk__in=done).order_by('pk').values_list('pk', flat=True))
+
+
+def compute_payroll_chunk(employee_ids, year, month):
+    """Salary figures of some employees, {employee_id: figures}; run in worker processes"""
+    employees = list(Employee.objects.filter(pk__in=employee_ids))
+    totals = _attendance_totals(employees, year, month)
+    return {emp.pk: salary_figures(emp, totals[emp.pk]) for emp in employees}
+
+
+def save_payroll_chunk(run, figures):
+    """Store the lines of a computed chunk and advance the run's progress, atomically"""
+    with transaction.atomic():
+        PayrollLine.objects.bulk_create(
+            [PayrollLine(run=run, employee_id=pk, **values) for pk, values in figures.items()],
+            batch_size=1000,
+        )
+        PayrollRun.objects.filter(pk=run.pk).update(processed_employees=F('processed_employees') + len(figures))
+
+
+def finish_payroll_run(run, error=None):
+    run.processed_employees = run.lines.count()
+    run.status = 'failed' if error else 'completed'
+    run.error = error
+    run.finished_on = timezone.now()
+    run.save(update_fields=['processed_employees', 'status', 'error', 'finished_on'])
+
+
+def latest_payroll_run(year, month):
+    """The month's most recent completed PayrollRun, or None"""
+    return PayrollRun.objects.filter(year=year, month=month, status='completed').first()
+
+
+def _line_figures(line):
+    return {
+        name: float(value) if isinstance(value, Decimal) else value
+        for name, value in ((name, getattr(line, name)) for name in LINE_FIELDS)
+    }
+
+
+def month_payroll(employees, month, year):
+    """
+    Salary lines of a month, {employee_id: line}, as calculate_payroll().
+    Served from payroll_cache while the data behind them is unchanged;
+    otherwise read from the month's latest completed PayrollRun, and
+    computed live for employees the run does not cover (e.g. hired after
+    it, or no run yet). line['payroll_run'] is the run used, or None.
+    """
+    employees = list(employees)
+    by_pk = {emp.pk: emp for emp in employees}
+    if len(employees) > 1:
+        versions = payroll_cache.month_versions(employees, year, month)
+    else:
+        versions = payroll_cache.versions(employees, year, month)
+    salaries = payroll_cache.get_many('line', versions, year, month)
+
+    missing = [emp for emp in employees if emp.pk not in salaries]
+    if missing:
+        run = latest_payroll_run(year, month)
+        computed = {}
+        if run is not None:
+            lines = run.lines.filter(employee__in=[emp.pk for emp in missing])
+            adjustments = _adjustments([emp.pk for emp in missing], year, month)
+            working_days = working_days_by_office(missing, year, month)
+            computed = {
+                line.employee_id: salary_line(
+                    by_pk[line.employee_id], _line_figures(line), adjustments.get(line.employee_id),
+                    working_days[by_pk[line.employee_id].office_id],
+                )
+                for line in lines
+            }
+        live = [emp for emp in missing if emp.pk not in computed]
+        if live:
+            computed.update(calculate_payroll(live, month, year))
+        live_ids = {emp.pk for emp in live}
+        for pk, line in computed.items():
+            line.pop('employee')
+            line['payroll_run'] = None if pk in live_ids else run
+        payroll_cache.set_many('line', computed, versions, year, month)
+        salaries.update(computed)
+
+    # Fresh dicts: views add their own keys to a line
+    return {emp.pk: {**salaries[emp.pk], 'employee': emp} for emp in employees}
@@ -0,0 +1,178 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+# ========================= PAYROLL RESULT CACHE =========================
+
+# Employee fields a salary depends on (or displays). Their values are part
+# of the data version, so a rate change needs no invalidation.
+RATE_FIELDS = (
+    'E_id', 'E_name', 'salary_type', 'monthly_salary', 'hourly_rate', 'standard_hours_per_day',
+    'overtime_rate_multiplier', 'salary',
+    # The office's holidays set the working days a monthly salary is divided by
+    'office_id',
+)
+
+GENERATION_KEY = 'payroll:generation'
+
+
+def _month_key(year, month):
+    return f"payroll:version:{year}:{month}"
+
+
+def _employee_month_key(employee_id, year, month):
+    return f"payroll:version:{employee_id}:{year}:{month}"
+
+
+def _rates(emp):
+    return tuple(getattr(emp, name) for name in RATE_FIELDS)
+
+
+class PayrollCache:
+    """
+    Computed salary results keyed by (kind, employee, year, month, data
+    version), in a per-process LRU bounded to `maxsize` entries.
+
+    A data version is made of the employee's rates, a global generation
+    (bumped when a PayrollRun completes) and a stamp bumped when
+    Attendance rows or a SalaryAdjustment of the month change: the
+    employee-month's own stamp for single-employee pages, or one stamp
+    for the whole month when many employees are read at once, so a past
+    month's overview costs one version lookup.
+
+    Stamps live in a Django cache (`version_alias`): a bump from any
+    process makes the old entries unreachable everywhere, and they then
+    age out of the LRU. Bumps made inside a transaction are collected and
+    written in one set_many once it commits (dropped if it rolls back),
+    so saving several rows costs one write, outside the write lock.
+    """
+
+    def __init__(self, maxsize=20000, version_alias='default'):
+        self.maxsize = maxsize
+        self.version_alias = version_alias
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.hits = self.misses = 0
+
+    @property
+    def versions_cache(self):
+        return caches[self.version_alias]
+
+    # ---- versions ----
+
+    def _stamps(self, keys):
+        """Current value of each stamp in one round trip; missing ones are created"""
+        cache = self.versions_cache
+        stamps = cache.get_many(keys)
+        missing = [key for key in keys if key not in stamps]
+        if missing:
+            # Never reuse an old value: an evicted stamp comes back as a new one
+            now = time.time_ns()
+            for key in missing:
+                cache.add(key, now, None)
+            stamps.update(cache.get_many(missing))
+        return stamps
+
+    def versions(self, employees, year, month):
+        """{employee_id: data version} from each employee-month's own stamp"""
+        keys = {emp.pk: _employee_month_key(emp.pk, year, month) for emp in employees}
+        stamps = self._stamps([GENERATION_KEY, *keys.values()])
+        return {
+            emp.pk: ('employee', stamps[GENERATION_KEY], stamps[keys[emp.pk]], _rates(emp))
+            for emp in employees
+        }
+
+    def month_versions(self, employees, year, month):
+        """{employee_id: data version} from the stamp of the whole month"""
+        month_key = _month_key(year, month)
+        stamps = self._stamps([GENERATION_KEY, month_key])
+        return {
+            emp.pk: ('month', stamps[GENERATION_KEY], stamps[month_key], _rates(emp))
+            for emp in employees
+        }
+
+    def bump_month(self, employee_id, year, month):
+        self.bump_months([(employee_id, year, month)])
+
+    def bump_months(self, employee_months):
+        """Make the results of these (employee_id, year, month) stale"""
+        keys = set()
+        for employee_id, year, month in employee_months:
+            keys.update((_employee_month_key(employee_id, year, month), _month_key(year, month)))
+        self._bump(keys)
+
+    def bump_all(self):
+        self._bump({GENERATION_KEY})
+
+    def _bump(self, keys):
+        if not keys:
+            return
+        connection = transaction.get_connection()
+        if not connection.in_atomic_block:
+            self._write_stamps(keys)
+            return
+        queued = getattr(self._local, 'queued', None)
+        # A rollback discards the callback, and the keys queued with it
+        if queued is None or queued[0] not in [func for _, func, _ in connection.run_on_commit]:
+            pending = set()
+
+            def write():
+                self._local.queued = None
+                self._write_stamps(pending)
+
+            queued = self._local.queued = (write, pending)
+            transaction.on_commit(write)
+        queued[1].update(keys)
+
+    def _write_stamps(self, keys):
+        now = time.time_ns()
+        self.versions_cache.set_many(dict.fromkeys(keys, now), None)
+
+    # ---- entries ----
+
+    def get_many(self, kind, versions, year, month):
+        """{employee_id: value} of the entries still current for `versions`"""
+        found = {}
+        with self._lock:
+            for pk, version in versions.items():
+                key = (kind, pk, year, month, version)
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    found[pk] = self._entries[key]
+            self.hits += len(found)
+            self.misses += len(versions) - len(found)
+        return found
+
+    def set_many(self, kind, values, versions, year, month):
+        with self._lock:
+            for pk, value in values.items():
+                key = (kind, pk, year, month, versions[pk])
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+payroll_cache = PayrollCache(
+    maxsize=getattr(settings, 'PAYROLL_CACHE_SIZE', 20000),
+    version_alias=getattr(settings, 'PAYROLL_CACHE_VERSION_ALIAS', 'default'),
+)
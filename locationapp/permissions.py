@@ -0,0 +1,115 @@
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+
+from .models import Employee
+
+
+# ========================= PERMISSION SNAPSHOTS =========================
+
+# Bit i of a snapshot is set when the user has the i-th Employee permission
+CODENAMES = tuple(codename for codename, _ in Employee._meta.permissions)
+APP_LABEL = Employee._meta.app_label
+ALL_BITS = (1 << len(CODENAMES)) - 1
+
+GENERATION_KEY = 'perms:generation'
+
+
+class PermissionSnapshot:
+    """
+    The Employee.Meta.permissions a user holds, as a bitmask. Cheap to
+    cache and to check: has() never touches the database.
+    """
+
+    __slots__ = ('bits',)
+
+    def __init__(self, bits=0):
+        self.bits = bits
+
+    @classmethod
+    def from_codenames(cls, codenames):
+        codenames = set(codenames)
+        return cls(sum(1 << i for i, name in enumerate(CODENAMES) if name in codenames))
+
+    def has(self, codename):
+        """has('can_edit_salary'); the 'locationapp.' prefix is optional"""
+        codename = codename.rpartition('.')[2]
+        return bool(self.bits & (1 << CODENAMES.index(codename)))
+
+    def as_dict(self):
+        return {name: bool(self.bits & (1 << i)) for i, name in enumerate(CODENAMES)}
+
+    def __contains__(self, codename):
+        return self.has(codename)
+
+    def __repr__(self):
+        return f"<PermissionSnapshot {sorted(n for n, v in self.as_dict().items() if v)}>"
+
+
+def _cache():
+    return caches[getattr(settings, 'PERMISSION_CACHE_ALIAS', 'default')]
+
+
+def _user_key(user_id):
+    return f"perms:user:{user_id}"
+
+
+def _compute(user):
+    """One pass over the auth backends (user, group and permission tables)"""
+    if not user.is_active:
+        return 0
+    if user.is_superuser:
+        return ALL_BITS
+    prefix = f"{APP_LABEL}."
+    held = {perm[len(prefix):] for perm in user.get_all_permissions() if perm.startswith(prefix)}
+    return PermissionSnapshot.from_codenames(held).bits
+
+
+def _generation(cache):
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, time.time_ns(), None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def permission_snapshot(user):
+    """
+    PermissionSnapshot of a user, cached across requests for
+    PERMISSION_CACHE_TTL seconds and dropped when the user's groups or
+    permissions (or any group's permissions) change.
+
+    The cache must be shared by all workers (see checks.py). Entries are
+    stored as (generation, bits) and read together with the generation in
+    one get_many, so a hit is a single cache round trip (a query when the
+    shared cache is the database fallback, see locationproject/caches.py).
+    """
+    if not user.is_authenticated:
+        return PermissionSnapshot()
+    cache = _cache()
+    key = _user_key(user.pk)
+    found = cache.get_many([GENERATION_KEY, key])
+    generation = found.get(GENERATION_KEY)
+    if generation is None:
+        generation = _generation(cache)
+    entry = found.get(key)
+    if entry is not None and entry[0] == generation:
+        return PermissionSnapshot(entry[1])
+    bits = _compute(user)
+    cache.set(key, (generation, bits), getattr(settings, 'PERMISSION_CACHE_TTL', 300))
+    return PermissionSnapshot(bits)
+
+
+async def apermission_snapshot(user):
+    return await sync_to_async(permission_snapshot)(user)
+
+
+def invalidate_user_permissions(*user_ids):
+    _cache().delete_many([_user_key(user_id) for user_id in user_ids])
+
+
+def invalidate_all_permissions():
+    """A group or permission changed: start a new generation of snapshots"""
+    _cache().set(GENERATION_KEY, time.time_ns(), None)
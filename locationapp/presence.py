@@ -0,0 +1,285 @@
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from datetime import date
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.utils import timezone
+
+from .models import Attendance, Employee
+
+
+# ========================= LIVE PRESENCE REGISTRY =========================
+
+class _Subscriber:
+    """One open presence stream: an asyncio queue fed from any thread"""
+
+    def __init__(self, loop, maxsize):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+    def deliver(self, event):
+        # Runs on the subscriber's event loop
+        if self.queue.full():
+            self.overflowed = True
+        else:
+            self.queue.put_nowait(event)
+
+
+class PresenceRegistry:
+    """
+    In-process view of who is checked in right now.
+
+    Check-in, checkout, auto-checkout and location pings update it and are
+    published as numbered events to every open presence stream. Streams
+    are asyncio queues, so an idle manager connection costs a queue rather
+    than a thread. The last `history` events are kept for clients that
+    reconnect with Last-Event-ID.
+
+    The registry only sees events of its own process; reconcile() picks up
+    check-ins and checkouts made by other workers from the database.
+    """
+
+    def __init__(self, history=500, queue_size=1000, ping_interval=30.0):
+        self.ping_interval = ping_interval
+        self.queue_size = queue_size
+        self._present = {}
+        self._last_ping_event = {}
+        self._events = deque(maxlen=history)
+        self._subscribers = set()
+        self._seq = 0
+        self._loaded = False
+        self._reconciled_at = 0.0
+        self._lock = threading.Lock()
+
+    # ---- state ----
+
+    def load(self):
+        """Seed the registry from the database (checked-in employees)"""
+        today = date.today()
+        offices = dict(
+            Attendance.objects.filter(
+                date=today, check_out_time__isnull=True, employee__is_checked_in=True,
+            ).values_list('employee_id', 'office__name')
+        )
+        present = {
+            row['id']: self._entry(row, offices.get(row['id']))
+            for row in Employee.objects.filter(is_checked_in=True).values(
+                'id', 'E_id', 'E_name', 'latitude', 'longitude', 'last_location_update',
+            )
+        }
+        with self._lock:
+            self._present = present
+            self._loaded = True
+            self._reconciled_at = time.monotonic()
+        return present
+
+    def snapshot(self):
+        """(last event id, list of present employees)"""
+        if not self._loaded:
+            self.load()
+        with self._lock:
+            return self._seq, list(self._present.values())
+
+    def reconcile(self):
+        """
+        Publish the check-ins/checkouts the database knows about but this
+        process has not seen (made by another worker).
+        """
+        if not self._loaded:
+            self.load()
+            return
+        # Claim this round first so concurrent streams do not all query
+        self._reconciled_at = time.monotonic()
+        rows = {
+            row['id']: row
+            for row in Employee.objects.filter(is_checked_in=True).values(
+                'id', 'E_id', 'E_name', 'latitude', 'longitude', 'last_location_update',
+            )
+        }
+        with self._lock:
+            arrived = [rows[pk] for pk in rows.keys() - self._present.keys()]
+            left = list(self._present.keys() - rows.keys())
+        for row in arrived:
+            self._check_in(self._entry(row), 'checkin')
+        for pk in left:
+            self._check_out(pk, 'checkout')
+
+    def reconcile_due(self):
+        resync = getattr(settings, 'PRESENCE_RESYNC_SECONDS', 60)
+        return time.monotonic() - self._reconciled_at >= resync
+
+    def _entry(self, row, office=None):
+        when = row.get('last_location_update')
+        return {
+            'id': row['id'],
+            'E_id': row['E_id'],
+            'E_name': row['E_name'],
+            'office': office,
+            'latitude': row.get('latitude'),
+            'longitude': row.get('longitude'),
+            'last_seen': when.isoformat() if when else None,
+        }
+
+    # ---- updates (called from views) ----
+
+    def checked_in(self, employee, office=None):
+        self._check_in(self._entry({
+            'id': employee.pk,
+            'E_id': employee.E_id,
+            'E_name': employee.E_name,
+            'latitude': employee.latitude,
+            'longitude': employee.longitude,
+            'last_location_update': employee.last_location_update,
+        }, office.name if office is not None else None), 'checkin')
+
+    def checked_out(self, employee, auto=False):
+        self._check_out(employee.pk, 'auto_checkout' if auto else 'checkout')
+
+    def pinged(self, employee_id, lat, lon, when):
+        """Update the position; publish at most one ping per ping_interval per employee"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._present.get(employee_id)
+            if entry is None:
+                return
+            entry.update(latitude=lat, longitude=lon, last_seen=when.isoformat())
+            if now - self._last_ping_event.get(employee_id, 0) < self.ping_interval:
+                return
+            self._last_ping_event[employee_id] = now
+            event = self._record({
+                'type': 'ping', 'id': employee_id, 'latitude': lat, 'longitude': lon,
+                'last_seen': entry['last_seen'],
+            })
+        self._broadcast(event)
+
+    def _check_in(self, entry, kind):
+        with self._lock:
+            self._present[entry['id']] = entry
+            event = self._record({'type': kind, 'employee': dict(entry)})
+        self._broadcast(event)
+
+    def _check_out(self, employee_id, kind):
+        with self._lock:
+            if self._present.pop(employee_id, None) is None:
+                return
+            self._last_ping_event.pop(employee_id, None)
+            event = self._record({'type': kind, 'id': employee_id, 'at': timezone.now().isoformat()})
+        self._broadcast(event)
+
+    # ---- publishing ----
+
+    def _record(self, data):
+        # Caller holds the lock
+        self._seq += 1
+        event = (self._seq, data)
+        self._events.append(event)
+        return event
+
+    def _broadcast(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for sub in subscribers:
+            try:
+                sub.loop.call_soon_threadsafe(sub.deliver, event)
+            except RuntimeError:  # event loop already closed
+                self.unsubscribe(sub)
+
+    def subscribe(self):
+        sub = _Subscriber(asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def events_after(self, seq):
+        """Buffered events newer than seq, or None if some were already dropped"""
+        with self._lock:
+            if self._events and self._events[0][0] > seq + 1:
+                return None
+            if seq > self._seq:
+                return None
+            return [e for e in self._events if e[0] > seq]
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+
+presence = PresenceRegistry(
+    history=getattr(settings, 'PRESENCE_HISTORY', 500),
+    ping_interval=getattr(settings, 'PRESENCE_PING_EVENT_INTERVAL', 30.0),
+)
+
+
+# ========================= SERVER-SENT EVENTS =========================
+
+def streaming_enabled(request):
+    """
+    Whether this request can hold a presence stream open. Only under ASGI:
+    a WSGI server collects an async stream into a list before sending it,
+    which never finishes and ties up a worker. Dashboards poll otherwise.
+    """
+    return getattr(settings, 'PRESENCE_STREAMING', True) and isinstance(request, ASGIRequest)
+
+
+def sse_message(data, event=None, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def presence_events(last_event_id=None, registry=None, keepalive=15.0):
+    """
+    Async generator of SSE messages: a snapshot (or the missed events after
+    last_event_id), then one message per presence change, with a comment
+    line every `keepalive` seconds so proxies keep the connection open.
+    """
+    registry = registry or presence
+    sub = registry.subscribe()
+    try:
+        missed = registry.events_after(last_event_id) if last_event_id is not None else None
+        if missed is None:
+            seq, present = await sync_to_async(registry.snapshot)()
+            yield sse_message({'present': present}, event='snapshot', event_id=seq)
+        else:
+            seq = last_event_id
+            for event_seq, data in missed:
+                seq = event_seq
+                yield sse_message(data, event='presence', event_id=event_seq)
+
+        while True:
+            if registry.reconcile_due():
+                await sync_to_async(registry.reconcile)()
+            try:
+                event_seq, data = await asyncio.wait_for(sub.queue.get(), timeout=keepalive)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+
+            if sub.overflowed:
+                # Fell too far behind: start over from a fresh snapshot
+                sub.overflowed = False
+                while not sub.queue.empty():
+                    sub.queue.get_nowait()
+                seq, present = await sync_to_async(registry.snapshot)()
+                yield sse_message({'present': present}, event='snapshot', event_id=seq)
+                continue
+            if event_seq <= seq:
+                continue  # already sent as part of the snapshot/replay
+            seq = event_seq
+            yield sse_message(data, event='presence', event_id=event_seq)
+    finally:
+        registry.unsubscribe(sub)
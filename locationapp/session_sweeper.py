@@ -0,0 +1,180 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Case, DateTimeField, F, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce, Greatest, Least
+from django.utils import timezone
+
+from .models import Attendance, AttendanceSession, Employee, day_totals
+from .payroll_cache import payroll_cache
+from .presence import presence
+from .summary import SUMMARY_FIELDS, apply_contribution, row_contribution
+
+
+# ========================= STALE SESSION SWEEPER =========================
+
+SWEEP_REASON = "Auto checkout - no location update"
+
+
+def last_seen_expression():
+    """
+    When an open session was last known to be alive: the employee's last
+    ping (Employee.last_location_update), never earlier than its check-in.
+    A correlated subquery rather than a join, so it can be used in UPDATE.
+    """
+    last_ping = Subquery(
+        Employee.objects.filter(attendance=OuterRef('attendance_id')).values('last_location_update')[:1]
+    )
+    return Greatest(Coalesce(last_ping, F('check_in_time')), F('check_in_time'), output_field=DateTimeField())
+
+
+def _end_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.max))
+
+
+def _stale(cutoff, earlier_day_rows):
+    """No ping since cutoff, or the session belongs to a day that is over"""
+    return Q(last_seen__lt=cutoff) | Q(attendance_id__in=earlier_day_rows)
+
+
+def _close_batch(candidates, cutoff, today, reason):
+    """
+    Close one batch of candidate sessions with a single conditional UPDATE.
+    The WHERE clause re-checks that each session is still open and still
+    stale, so a checkout or a ping that landed in between wins.
+    """
+    earlier_days = defaultdict(list)
+    for _, attendance_id, day in candidates:
+        if day < today:
+            earlier_days[day].append(attendance_id)
+    earlier_day_rows = [pk for rows in earlier_days.values() for pk in rows]
+
+    # A session left open on an earlier day ends with that day at the latest
+    last_seen = last_seen_expression()
+    closed_at = Case(
+        *[
+            When(attendance_id__in=rows, then=Least(last_seen, Value(_end_of_day(day)), output_field=DateTimeField()))
+            for day, rows in earlier_days.items()
+        ],
+        default=last_seen,
+        output_field=DateTimeField(),
+    )
+
+    return (
+        AttendanceSession.objects
+        .filter(pk__in=[pk for pk, _, _ in candidates], check_out_time__isnull=True)
+        .annotate(last_seen=last_seen_expression())
+        .filter(_stale(cutoff, earlier_day_rows))
+        .update(check_out_time=closed_at, auto_checkout=True, checkout_reason=reason)
+    )
+
+
+def _refresh_days(attendance_ids, reason):
+    """
+    Recompute the day totals of the touched Attendance rows (bulk_update)
+    and apply the change to their monthly summaries; bulk_update sends no
+    signals. Returns the (employee_id, date) of every row.
+    """
+    previous = {
+        values['id']: values
+        for values in Attendance.objects.filter(pk__in=attendance_ids).values('id', *SUMMARY_FIELDS)
+    }
+    sessions = defaultdict(list)
+    for attendance_id, check_in, check_out in AttendanceSession.objects.filter(
+        attendance_id__in=attendance_ids
+    ).values_list('attendance_id', 'check_in_time', 'check_out_time'):
+        sessions[attendance_id].append((check_in, check_out))
+    standard_hours = dict(
+        Employee.objects.filter(pk__in={v['employee_id'] for v in previous.values()})
+        .values_list('id', 'standard_hours_per_day')
+    )
+
+    rows = []
+    for pk, old in previous.items():
+        if not sessions.get(pk):
+            continue
+        check_in, check_out, worked = day_totals(sessions[pk])
+        row = Attendance(pk=pk, check_in_time=check_in, check_out_time=check_out, worked_hours=worked)
+        if check_out is not None:
+            row.auto_checkout, row.checkout_reason = True, reason
+        rows.append(row)
+
+        new = dict(old, check_in_time=check_in, check_out_time=check_out, worked_hours=worked)
+        emp_id, day = old['employee_id'], old['date']
+        before = row_contribution(old, standard_hours[emp_id]) or {}
+        after = row_contribution(new, standard_hours[emp_id]) or {}
+        delta = {field: after.get(field, 0) - before.get(field, 0) for field in set(before) | set(after)}
+        if any(delta.values()):
+            apply_contribution(emp_id, day, delta)
+
+    # Rows still open keep their checkout fields: only closed days are written with them
+    closed = [row for row in rows if row.check_out_time is not None]
+    still_open = [row for row in rows if row.check_out_time is None]
+    Attendance.objects.bulk_update(
+        closed, ['check_in_time', 'check_out_time', 'worked_hours', 'auto_checkout', 'checkout_reason'], batch_size=500,
+    )
+    Attendance.objects.bulk_update(still_open, ['check_in_time', 'check_out_time', 'worked_hours'], batch_size=500)
+    return {(old['employee_id'], old['date']) for old in previous.values()}
+
+
+def _check_out_employees(employee_ids):
+    """is_checked_in = False for those of employee_ids left without an open session; returns their ids"""
+    employees = list(
+        Employee.objects.filter(pk__in=employee_ids, is_checked_in=True)
+        .exclude(attendance__sessions__check_out_time__isnull=True)
+        .values_list('id', flat=True)
+    )
+    if employees:
+        Employee.objects.filter(pk__in=employees, is_checked_in=True).update(is_checked_in=False)
+    return employees
+
+
+def close_stale_sessions(idle_minutes=30, batch_size=500, now=None, reason=SWEEP_REASON):
+    """
+    Close every open AttendanceSession whose employee sent no location
+    ping for `idle_minutes` (phone died, tab closed), at the last time
+    the employee was seen, and sessions of earlier days. Then refresh the
+    day rows and clear Employee.is_checked_in.
+
+    Candidates come from the partial index on open sessions, keyset
+    paginated, so the cost follows the number of open sessions
+    rather than the headcount or the attendance history.
+    Returns (sessions closed, employees checked out).
+    """
+    now = now or timezone.now()
+    cutoff = now - timedelta(minutes=idle_minutes)
+    today = timezone.localdate(now)
+
+    closed = checked_out = 0
+    last_attendance_id = 0
+    while True:
+        # Walks attsession_one_open (attendance_id WHERE check_out_time IS NULL).
+        # A day has at most one open session, so attendance_id is a sound cursor.
+        candidates = list(
+            AttendanceSession.objects
+            .filter(check_out_time__isnull=True, attendance_id__gt=last_attendance_id)
+            .annotate(last_seen=last_seen_expression())
+            .filter(Q(last_seen__lt=cutoff) | Q(attendance__date__lt=today))
+            .order_by('attendance_id')
+            .values_list('id', 'attendance_id', 'attendance__date')[:batch_size]
+        )
+        if not candidates:
+            break
+        last_attendance_id = candidates[-1][1]
+
+        with transaction.atomic():
+            count = _close_batch(candidates, cutoff, today, reason)
+            if not count:
+                continue
+            days = _refresh_days({attendance_id for _, attendance_id, _ in candidates}, reason)
+            employees = _check_out_employees({emp_id for emp_id, _ in days})
+
+        # No signals were sent: refresh the payroll cache once the batch is
+        # committed. is_checked_in is not cached, so the employee caches stay.
+        payroll_cache.bump_months((emp_id, day.year, day.month) for emp_id, day in days)
+        for pk in employees:
+            presence.checked_out(Employee(pk=pk), auto=True)
+        closed += count
+        checked_out += len(employees)
+    return closed, checked_out
@@ -0,0 +1,199 @@
+from django.contrib.auth.models import Group, Permission, User
+from django.db.models.signals import m2m_changed, pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Employee, Attendance, Holiday, Office, PayrollRun, SalaryAdjustment
+from .employee_cache import VOLATILE_FIELDS, employee_cache
+from .geofence import invalidate_geofence_index
+from .location_buffer import location_buffer
+from .middleware import bump_employee_version
+from .payroll_cache import payroll_cache
+from .permissions import invalidate_all_permissions, invalidate_user_permissions
+from .summary import SUMMARY_FIELDS, apply_contribution, row_contribution, rebuild_monthly_summaries
+from .work_calendar import holiday_changed
+
+
+# ========================= ATTENDANCE -> MONTHLY SUMMARY =========================
+
+def _standard_hours(employee_id, attendance=None):
+    if attendance is not None and attendance.employee_id == employee_id and 'employee' in attendance._state.fields_cache:
+        return attendance.employee.standard_hours_per_day
+    return Employee.objects.filter(pk=employee_id).values_list('standard_hours_per_day', flat=True).first()
+
+
+def _values(instance):
+    return {field: getattr(instance, field) for field in SUMMARY_FIELDS}
+
+
+@receiver(pre_save, sender=Attendance)
+def remember_previous_attendance(sender, instance, raw=False, **kwargs):
+    """Keep the stored version of the row so its old contribution can be removed"""
+    instance._summary_previous = None
+    if raw or instance._state.adding:
+        return
+    instance._summary_previous = sender.objects.filter(pk=instance.pk).values(*SUMMARY_FIELDS).first()
+
+
+@receiver(post_save, sender=Attendance)
+def update_summary_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+
+    previous = getattr(instance, '_summary_previous', None)
+    if previous:
+        emp_id = previous['employee_id']
+        apply_contribution(emp_id, previous['date'], row_contribution(previous, _standard_hours(emp_id, instance)), -1)
+
+    current = _values(instance)
+    emp_id = current['employee_id']
+    apply_contribution(emp_id, current['date'], row_contribution(current, _standard_hours(emp_id, instance)))
+
+
+@receiver(post_delete, sender=Attendance)
+def update_summary_on_delete(sender, instance, **kwargs):
+    current = _values(instance)
+    standard_hours = _standard_hours(current['employee_id'], instance)
+    if standard_hours is None:
+        # The employee itself is being deleted; its summaries go with it
+        return
+    apply_contribution(current['employee_id'], current['date'], row_contribution(current, standard_hours), -1)
+
+
+# ========================= EMPLOYEE WORKING HOURS CHANGE =========================
+
+@receiver(pre_save, sender=Employee)
+def remember_standard_hours(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._previous_standard_hours = None
+    if raw or instance._state.adding:
+        return
+    if update_fields is not None and 'standard_hours_per_day' not in update_fields:
+        return
+    instance._previous_standard_hours = (
+        sender.objects.filter(pk=instance.pk).values_list('standard_hours_per_day', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Employee)
+def rebuild_summary_on_standard_hours_change(sender, instance, raw=False, **kwargs):
+    """Regular/overtime split depends on standard hours: recompute that employee's months"""
+    previous = getattr(instance, '_previous_standard_hours', None)
+    if raw or previous is None or previous == instance.standard_hours_per_day:
+        return
+    rebuild_monthly_summaries(Employee.objects.filter(pk=instance.pk))
+
+
+# ========================= PAYROLL RESULT CACHE =========================
+
+@receiver(post_save, sender=Attendance)
+@receiver(post_delete, sender=Attendance)
+def refresh_payroll_of_attendance(sender, instance, **kwargs):
+    payroll_cache.bump_month(instance.employee_id, instance.date.year, instance.date.month)
+    previous = getattr(instance, '_summary_previous', None)
+    if previous and (previous['employee_id'], previous['date']) != (instance.employee_id, instance.date):
+        # Moved to another employee or month: the old one changed too
+        payroll_cache.bump_month(previous['employee_id'], previous['date'].year, previous['date'].month)
+
+
+@receiver(post_save, sender=SalaryAdjustment)
+@receiver(post_delete, sender=SalaryAdjustment)
+def refresh_payroll_of_adjustment(sender, instance, **kwargs):
+    payroll_cache.bump_month(instance.employee_id, instance.year, instance.month)
+
+
+@receiver(post_save, sender=PayrollRun)
+@receiver(post_delete, sender=PayrollRun)
+def refresh_payroll_of_run(sender, instance, **kwargs):
+    # Salary views read the latest completed run
+    if instance.status == 'completed':
+        payroll_cache.bump_all()
+
+
+# ========================= E_ID LOOKUP CACHE =========================
+
+@receiver(post_save, sender=Employee)
+def invalidate_cached_employee(sender, instance, update_fields=None, **kwargs):
+    # Location and check-in flag saves do not touch any cached field
+    if update_fields is not None and set(update_fields) <= VOLATILE_FIELDS:
+        return
+    employee_cache.invalidate(instance.E_id, pk=instance.pk)
+    bump_employee_version(instance.user_id)
+
+
+@receiver(post_delete, sender=Employee)
+def forget_cached_employee(sender, instance, **kwargs):
+    employee_cache.invalidate(instance.E_id, pk=instance.pk)
+    bump_employee_version(instance.user_id)
+
+
+# ========================= BUFFERED LOCATIONS =========================
+
+@receiver(post_delete, sender=Employee)
+def forget_buffered_locations(sender, instance, **kwargs):
+    # Its pending pings would fail the next flush on the foreign key
+    location_buffer.forget(instance.pk)
+
+
+# ========================= PERMISSION SNAPSHOTS =========================
+
+@receiver(m2m_changed, sender=User.user_permissions.through)
+@receiver(m2m_changed, sender=User.groups.through)
+def refresh_user_permissions(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        invalidate_user_permissions(instance.pk)
+    elif pk_set:
+        # Changed from the group/permission side: pk_set holds user ids
+        invalidate_user_permissions(*pk_set)
+    else:
+        invalidate_all_permissions()
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+def refresh_group_permissions(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_all_permissions()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def refresh_permissions_of_user(sender, instance, **kwargs):
+    # is_active / is_superuser change what the snapshot holds
+    invalidate_user_permissions(instance.pk)
+
+
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=Permission)
+def refresh_all_permissions(sender, **kwargs):
+    invalidate_all_permissions()
+
+
+# ========================= OFFICE GEOFENCES =========================
+
+@receiver(post_save, sender=Office)
+@receiver(post_delete, sender=Office)
+def refresh_geofence_index(sender, **kwargs):
+    invalidate_geofence_index()
+
+
+# ========================= HOLIDAY CALENDAR =========================
+
+@receiver(pre_save, sender=Holiday)
+def remember_holiday_date(sender, instance, raw=False, **kwargs):
+    instance._previous_date = None
+    if raw or instance._state.adding:
+        return
+    instance._previous_date = sender.objects.filter(pk=instance.pk).values_list('date', flat=True).first()
+
+
+@receiver(post_save, sender=Holiday)
+def refresh_calendar_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_date', None)
+    holiday_changed(instance.date, *([previous] if previous else []))
+
+
+@receiver(post_delete, sender=Holiday)
+def refresh_calendar_on_delete(sender, instance, **kwargs):
+    holiday_changed(instance.date)
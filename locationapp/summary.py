@@ -0,0 +1,174 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum, Value
+from django.db.models.functions import Coalesce, ExtractMonth, ExtractYear
+
+from .models import HOURS_FIELD, Employee, Attendance, AttendanceMonthlySummary, standard_hours_expression
+
+
+# ========================= MONTHLY SUMMARY MAINTENANCE =========================
+
+# Attendance columns a row's contribution to its month depends on
+SUMMARY_FIELDS = (
+    'employee_id', 'date', 'status', 'check_in_time', 'check_out_time',
+    'manual_hours', 'worked_hours', 'is_sunday', 'is_holiday',
+)
+
+COUNT_FIELDS = ('days_present', 'full_days', 'sunday_holiday_days')
+HOURS_FIELDS = ('total_hours', 'regular_hours', 'overtime_hours', 'sunday_holiday_hours')
+
+
+def row_hours(check_in_time, check_out_time, manual_hours, worked_hours, standard_hours):
+    """Same rules as Attendance.hours_worked(), on plain column values"""
+    if manual_hours is not None:
+        return float(manual_hours)
+    if check_in_time and check_out_time:
+        return float(worked_hours)
+    if check_in_time:
+        return float(standard_hours)
+    return 0
+
+
+def row_contribution(values, standard_hours):
+    """
+    What one attendance row adds to its month, from a SUMMARY_FIELDS dict.
+    Only "Present" rows count.
+    """
+    if values['status'] != 'Present':
+        return None
+
+    hours = Decimal(str(row_hours(
+        values['check_in_time'], values['check_out_time'], values['manual_hours'],
+        values['worked_hours'], standard_hours,
+    )))
+    standard = Decimal(standard_hours)
+    off_day = values['is_sunday'] or values['is_holiday']
+
+    return {
+        'days_present': 1,
+        'full_days': 1 if hours >= standard else 0,
+        'sunday_holiday_days': 1 if off_day else 0,
+        'total_hours': hours,
+        'regular_hours': min(hours, standard),
+        'overtime_hours': hours if off_day else max(Decimal(0), hours - standard),
+        'sunday_holiday_hours': hours if off_day else Decimal(0),
+    }
+
+
+def apply_contribution(employee_id, day, contribution, sign=1):
+    """Add (sign=1) or remove (sign=-1) a row's contribution with an F() update"""
+    if not contribution:
+        return
+
+    rows = AttendanceMonthlySummary.objects.filter(employee_id=employee_id, year=day.year, month=day.month)
+    if sign > 0:
+        AttendanceMonthlySummary.objects.get_or_create(employee_id=employee_id, year=day.year, month=day.month)
+
+    rows.update(**{
+        field: F(field) + sign * value for field, value in contribution.items()
+    })
+
+
+def _empty_summary(employee_id, year, month):
+    return AttendanceMonthlySummary(
+        employee_id=employee_id, year=year, month=month,
+        **{f: 0 for f in COUNT_FIELDS}, **{f: Decimal(0) for f in HOURS_FIELDS}
+    )
+
+
+def compute_monthly_summaries(employees=None, start=None, end=None):
+    """
+    Recompute summaries from raw Attendance rows, summed by the database
+    (AttendanceQuerySet hour annotations, one row per employee-month).
+    Returns {(employee_id, year, month): unsaved AttendanceMonthlySummary}.
+    """
+    employees = Employee.objects.all() if employees is None else employees
+
+    rows = Attendance.objects.filter(employee__in=employees, status='Present')
+    if start:
+        rows = rows.filter(date__gte=start)
+    if end:
+        rows = rows.filter(date__lte=end)
+
+    off_day = Q(is_sunday=True) | Q(is_holiday=True)
+    months = (
+        rows.with_hours().with_regular_hours().with_overtime()
+        .annotate(standard=standard_hours_expression())
+        .values('employee_id', year=ExtractYear('date'), month=ExtractMonth('date'))
+        .annotate(
+            days_present=Count('id'),
+            full_days=Count('id', filter=Q(hours__gte=F('standard'))),
+            sunday_holiday_days=Count('id', filter=off_day),
+            total_hours=Sum('hours', output_field=HOURS_FIELD),
+            regular_hours=Sum('regular', output_field=HOURS_FIELD),
+            overtime_hours=Sum('overtime', output_field=HOURS_FIELD),
+            sunday_holiday_hours=Coalesce(
+                Sum('hours', filter=off_day, output_field=HOURS_FIELD), Value(Decimal(0)), output_field=HOURS_FIELD
+            ),
+        )
+        .order_by()
+    )
+
+    summaries = {}
+    for values in months:
+        key = (values.pop('employee_id'), values.pop('year'), values.pop('month'))
+        summaries[key] = AttendanceMonthlySummary(employee_id=key[0], year=key[1], month=key[2], **values)
+    return summaries
+
+
+def _scope(employees, start, end):
+    scope = AttendanceMonthlySummary.objects.filter(employee__in=employees)
+    if start:
+        scope = scope.filter(Q(year__gt=start.year) | Q(year=start.year, month__gte=start.month))
+    if end:
+        scope = scope.filter(Q(year__lt=end.year) | Q(year=end.year, month__lte=end.month))
+    return scope
+
+
+def rebuild_monthly_summaries(employees=None, start=None, end=None):
+    """Replace the stored summaries in scope with values recomputed from Attendance"""
+    employees = Employee.objects.all() if employees is None else employees
+    if start:
+        start = start.replace(day=1)
+    summaries = compute_monthly_summaries(employees, start, None)
+    if end:
+        summaries = {k: v for k, v in summaries.items() if (k[1], k[2]) <= (end.year, end.month)}
+
+    with transaction.atomic():
+        _scope(employees, start, end).delete()
+        AttendanceMonthlySummary.objects.bulk_create(summaries.values(), batch_size=1000)
+    return len(summaries)
+
+
+def validate_monthly_summaries(employees=None, start=None, end=None):
+    """
+    Compare stored summaries with raw data.
+    Returns a list of (employee_id, year, month, field, stored, expected).
+    """
+    employees = Employee.objects.all() if employees is None else employees
+    if start:
+        start = start.replace(day=1)
+    expected = compute_monthly_summaries(employees, start, None)
+    if end:
+        expected = {k: v for k, v in expected.items() if (k[1], k[2]) <= (end.year, end.month)}
+    stored = {(s.employee_id, s.year, s.month): s for s in _scope(employees, start, end)}
+
+    mismatches = []
+    for key in sorted(set(expected) | set(stored)):
+        want = expected.get(key) or _empty_summary(*key)
+        have = stored.get(key) or _empty_summary(*key)
+        for field in COUNT_FIELDS + HOURS_FIELDS:
+            if getattr(have, field) != getattr(want, field):
+                mismatches.append((*key, field, getattr(have, field), getattr(want, field)))
+    return mismatches
+
+
+def monthly_summaries(employee_ids, year, month):
+    """Stored summaries of one month, {employee_id: summary}; missing months are empty"""
+    found = {
+        s.employee_id: s
+        for s in AttendanceMonthlySummary.objects.filter(employee_id__in=employee_ids, year=year, month=month)
+    }
+    return {pk: found.get(pk) or _empty_summary(pk, year, month) for pk in employee_ids}
@@ -1,3 +1,1104 @@
-from django.test import TestCase
+import csv
+import os
+import random
+import tempfile
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipIf
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.contrib.auth.models import Group, Permission, User
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.db.models import Sum
+from django.db.utils import ConnectionHandler
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+
+from locationproject.caches import shared_cache_from_env
+from locationproject.database import database_from_env, sqlite_database
+
+from . import geofence, views, work_calendar
+from . import presence as presence_module
+from .attendance import attendance_page, build_attendance_maps, mark_absences, record_check_in, record_check_out
+from .checks import check_database_shared_caches, check_shared_caches
+from .employee_cache import employee_cache, get_employee
+from .exports import ATTENDANCE_COLUMNS, PAYROLL_COLUMNS, payroll_rows
+from .location_buffer import LocationBuffer, location_buffer
+from .middleware import bump_employee_version, get_request_employee
+from .models import (
+    Attendance, AttendanceMonthlySummary, AttendanceSession, Employee, Holiday, LocationPing, Office,
+    PayrollLine, PayrollRun, SalaryAdjustment, calculate_distance,
+)
+from .onboarding import hash_passwords
+from .payroll import (
+    calculate_payroll, compute_payroll_chunk, month_payroll, save_payroll_chunk, start_payroll_run,
+)
+from .payroll_cache import payroll_cache
+from .permissions import permission_snapshot
+from .presence import PresenceRegistry, presence_events
+from .session_sweeper import close_stale_sessions
+from .summary import validate_monthly_summaries
+
+
+class LocationAppTestCase(TestCase):
+    """
+    Pings recorded into the process-wide location buffer are written
+    through inside the test's transaction (no flush thread racing it) and
+    never outlive the test database.
+    """
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(location_buffer, 'flush_interval', 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        location_buffer.clear()
+        super().tearDown()
+
+
+def aware(*args):
+    return timezone.make_aware(datetime(*args))
+
+
+def fixed_today(day):
+    """Patch date.today() in the attendance module, which stamps check-ins with today's date"""
+    class FixedDate(date):
+        @classmethod
+        def today(cls):
+            return day
+    return mock.patch('locationapp.attendance.date', FixedDate)
+
+
+# ========================= PAYROLL RUNS =========================
+
+class PayrollRunTests(LocationAppTestCase):
+    def setUp(self):
+        super().setUp()
+        payroll_cache.clear()
+        self.alice = Employee.objects.create(E_id='A1', E_name='Alice', salary_type='hourly', hourly_rate=100)
+        self.bob = Employee.objects.create(E_id='B1', E_name='Bob', salary_type='hourly', hourly_rate=100)
+        Attendance.objects.create(employee=self.alice, date=date(2025, 3, 3), status='Present', manual_hours=Decimal('6'))
+        Attendance.objects.create(employee=self.bob, date=date(2025, 3, 3), status='Present', manual_hours=Decimal('4'))
+
+    def run_payroll(self, *args):
+        out = StringIO()
+        call_command('run_payroll', '--year', '2025', '--month', '3', '--workers', '1', *args, stdout=out)
+        return out.getvalue()
+
+    def test_run_snapshots_the_month(self):
+        self.run_payroll()
+        run = PayrollRun.objects.get()
+        self.assertEqual((run.status, run.total_employees, run.processed_employees), ('completed', 2, 2))
+        self.assertEqual(PayrollLine.objects.get(employee=self.alice).total_hours, Decimal('6'))
+
+        # Later attendance edits do not change the snapshot
+        Attendance.objects.create(employee=self.alice, date=date(2025, 3, 4), status='Present', manual_hours=Decimal('2'))
+        self.assertEqual(month_payroll([self.alice], 3, 2025)[self.alice.pk]['total_hours'], 6.0)
+
+    def test_interrupted_run_resumes(self):
+        run = start_payroll_run(2025, 3)
+        save_payroll_chunk(run, compute_payroll_chunk([self.alice.pk], 2025, 3))
+        PayrollRun.objects.filter(pk=run.pk).update(status='failed', error='KeyboardInterrupt()')
+
+        self.assertIn('Resuming', self.run_payroll())
+        run = PayrollRun.objects.get()
+        self.assertEqual((run.status, run.processed_employees, run.error), ('completed', 2, None))
+        self.assertEqual(run.lines.count(), 2)
+
+    def test_completed_month_needs_rerun(self):
+        self.run_payroll()
+        with self.assertRaises(CommandError):
+            self.run_payroll()
+        self.assertEqual(PayrollRun.objects.count(), 1)
+
+        Attendance.objects.create(employee=self.alice, date=date(2025, 3, 4), status='Present', manual_hours=Decimal('2'))
+        self.run_payroll('--rerun')
+        self.assertEqual(PayrollRun.objects.filter(status='completed').count(), 2)
+        self.assertEqual(month_payroll([self.alice], 3, 2025)[self.alice.pk]['total_hours'], 8.0)
+
+
+# ========================= ATTENDANCE CALENDAR =========================
+
+class AttendanceCalendarTests(LocationAppTestCase):
+    def test_one_status_query_for_many_employees(self):
+        emps = [Employee.objects.create(E_id=f'M{i}', E_name='Cal') for i in range(5)]
+        Attendance.objects.create(employee=emps[0], date=date(2025, 3, 3), status='Present')
+        Attendance.objects.create(employee=emps[1], date=date(2025, 3, 2), status='Present')
+        build_attendance_maps(emps[:1], 2025, 3)  # warm the month calendar
+        with CaptureQueriesContext(connection) as ctx:
+            maps = build_attendance_maps(emps, 2025, 3)
+        self.assertEqual(len([q for q in ctx.captured_queries if 'locationapp_attendance' in q['sql']]), 1)
+        self.assertEqual(maps[emps[0].pk][3], 'Present')
+        self.assertEqual(maps[emps[1].pk][2], 'Present')  # a worked Sunday
+        self.assertEqual(maps[emps[2].pk][3], 'Absent')
+        self.assertNotIn(2, maps[emps[2].pk])
+
+    def test_checkout_logs_instead_of_printing(self):
+        emp = Employee.objects.create(E_id='M9', E_name='Leaving')
+        record_check_in(emp)
+        with self.assertLogs('locationapp.views', 'INFO') as logs, mock.patch('builtins.print') as printed:
+            self.client.get('/checkout/', {'E_id': 'M9'})
+        self.assertIn('Leaving checked out', logs.output[0])
+        printed.assert_not_called()
+
+
+# ========================= MANAGER DASHBOARD =========================
+
+class ManagerDashboardTests(LocationAppTestCase):
+    def setUp(self):
+        super().setUp()
+        user = User.objects.create_user('boss', password='x')
+        user.user_permissions.add(*Permission.objects.filter(content_type__app_label='locationapp'))
+        Employee.objects.create(user=user, E_id='B0', E_name='Boss', is_manager=True)
+        self.client.force_login(user)
+
+    def add_employee(self, n):
+        emp = Employee.objects.create(E_id=f'D{n}', E_name=f'Dash {n}')
+        Attendance.objects.create(employee=emp, date=date(2025, 3, 3), status='Present')
+        Attendance.objects.create(employee=emp, date=date(2025, 3, 4), status='Absent')
+        Attendance.objects.create(employee=emp, date=date(2025, 3, 5), status='Present')
+        return emp
+
+    def dashboard_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/manager_dashboard/')
+        return response, len(ctx.captured_queries)
+
+    def test_counts_and_totals(self):
+        self.add_employee(1)
+        response, _ = self.dashboard_queries()
+        counts = {e['E_id']: (e['present_count'], e['absent_count']) for e in response.context['employees']}
+        self.assertEqual(counts, {'B0': (0, 0), 'D1': (2, 1)})
+        self.assertEqual(
+            (response.context['total_records'], response.context['total_present'], response.context['total_absent']),
+            (3, 2, 1),
+        )
+
+    def test_queries_do_not_grow_with_the_company(self):
+        self.add_employee(1)
+        self.dashboard_queries()  # warm the session and permission caches
+        _, few = self.dashboard_queries()
+        for n in range(2, 8):
+            self.add_employee(n)
+        _, many = self.dashboard_queries()
+        self.assertEqual(few, many)
+
+    def test_pages_walk_every_row_once(self):
+        for n in range(1, 4):
+            self.add_employee(n)
+        seen, cursor = [], None
+        while True:
+            rows, cursor = attendance_page(Attendance.objects.all(), cursor=cursor, page_size=4)
+            seen += [(row.date, row.id) for row in rows]
+            if cursor is None:
+                break
+        self.assertEqual(seen, sorted(Attendance.objects.values_list('date', 'id'), reverse=True))
+
+    def test_filters(self):
+        self.add_employee(1)
+        self.add_employee(2)
+        response = self.client.get('/manager_dashboard/', {'employee': 'D2', 'date_from': '2025-03-04'})
+        self.assertEqual(
+            [(row.employee.E_id, row.date) for row in response.context['attendance']],
+            [('D2', date(2025, 3, 5)), ('D2', date(2025, 3, 4))],
+        )
+
+
+# ========================= SUMMARY TABLES =========================
+
+class MonthlySummaryTests(LocationAppTestCase):
+    def test_summary_follows_attendance_edits(self):
+        emp = Employee.objects.create(E_id='S1', E_name='Sam', standard_hours_per_day=8)
+        row = Attendance.objects.create(employee=emp, date=date(2025, 3, 3), status='Present', manual_hours=Decimal('10'))
+        summary = AttendanceMonthlySummary.objects.get(employee=emp, year=2025, month=3)
+        self.assertEqual(
+            (summary.days_present, summary.total_hours, summary.overtime_hours, summary.full_days),
+            (1, Decimal('10'), Decimal('2'), 1),
+        )
+
+        row.manual_hours = Decimal('3.5')
+        row.is_sunday = True
+        row.save()
+        summary.refresh_from_db()
+        self.assertEqual((summary.total_hours, summary.sunday_holiday_hours), (Decimal('3.5'), Decimal('3.5')))
+
+        other = Attendance.objects.create(employee=emp, date=date(2025, 3, 4), status='Present', manual_hours=Decimal('9'))
+        emp.standard_hours_per_day = 6
+        emp.save()
+        self.assertEqual(validate_monthly_summaries(), [])
+        other.delete()
+        self.assertEqual(validate_monthly_summaries(), [])
+
+    def test_rebuild_repairs_drift(self):
+        emp = Employee.objects.create(E_id='S1', E_name='Sam')
+        Attendance.objects.create(employee=emp, date=date(2025, 3, 3), status='Present', manual_hours=Decimal('8'))
+        AttendanceMonthlySummary.objects.update(days_present=99)
+        self.assertNotEqual(validate_monthly_summaries(), [])
+        call_command('rebuild_attendance_summary', stdout=StringIO())
+        self.assertEqual(validate_monthly_summaries(), [])
+        emp.delete()
+        self.assertFalse(AttendanceMonthlySummary.objects.exists())
+
+
+class EmployeeCacheTests(LocationAppTestCase):
+    def setUp(self):
+        super().setUp()
+        employee_cache.clear()
+
+    def test_lookups_follow_saves_and_deletes(self):
+        emp = Employee.objects.create(E_id='C1', E_name='One')
+        with self.assertNumQueries(1):
+            get_employee('C1')
+            get_employee('C1')
+
+        emp.E_name = 'Uno'
+        emp.save()
+        self.assertEqual(get_employee('C1').E_name, 'Uno')
+
+        emp.E_id = 'C2'
+        emp.save()
+        with self.assertRaises(Employee.DoesNotExist):
+            get_employee('C1')
+
+        emp.delete()
+        with self.assertRaises(Employee.DoesNotExist):
+            get_employee('C2')
+
+    def test_check_in_flag_is_read_fresh(self):
+        emp = Employee.objects.create(E_id='C1', E_name='One')
+        get_employee('C1')
+        # Another process checks the employee in
+        Employee.objects.filter(pk=emp.pk).update(is_checked_in=True)
+        cached = get_employee('C1')
+        with self.assertNumQueries(1):
+            self.assertTrue(cached.is_checked_in)
+
+        # Saving only the flag leaves the cached record alone
+        cached.is_checked_in = False
+        with self.assertNumQueries(1):
+            cached.save(update_fields=['is_checked_in'])
+        with self.assertNumQueries(0):
+            get_employee('C1')
+
+    def test_dashboard_sees_employee_changes(self):
+        user = User.objects.create_user('e1', password='x')
+        emp = Employee.objects.create(user=user, E_id='X1', E_name='Ex')
+        self.client.force_login(user)
+        self.assertContains(self.client.get('/employee_dashboard/'), 'Ex')
+        emp.E_name = 'Changed'
+        emp.save()
+        self.assertContains(self.client.get('/employee_dashboard/'), 'Changed')
+
+
+# ========================= REQUEST EMPLOYEE =========================
+
+class RequestEmployeeTests(LocationAppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('r1', password='x')
+        self.emp = Employee.objects.create(user=self.user, E_id='R1', E_name='Before')
+        self.session = SessionStore()
+
+    def request(self):
+        request = RequestFactory().get('/')
+        request.user, request.session = self.user, self.session
+        return request
+
+    def employee_queries(self, ctx):
+        return [q for q in ctx.captured_queries if 'locationapp_employee' in q['sql']]
+
+    def test_session_copy_lasts_until_the_stamp_moves(self):
+        self.assertEqual(get_request_employee(self.request()).E_name, 'Before')
+
+        # update() sends no signal: the session copy stays in use
+        Employee.objects.filter(pk=self.emp.pk).update(E_name='After')
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(get_request_employee(self.request()).E_name, 'Before')
+        self.assertEqual(self.employee_queries(ctx), [])
+
+        bump_employee_version(self.user.pk)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(get_request_employee(self.request()).E_name, 'After')
+        self.assertEqual(len(self.employee_queries(ctx)), 1)
+
+    def test_save_moves_the_stamp(self):
+        get_request_employee(self.request())
+        self.emp.E_name = 'Saved'
+        self.emp.save()
+        self.assertEqual(get_request_employee(self.request()).E_name, 'Saved')
+
+
+# ========================= HOURS ANNOTATIONS =========================
+
+class HoursAnnotationTests(LocationAppTestCase):
+    def test_annotations_match_the_model_methods(self):
+        day = date(2025, 3, 3)
+        for n, standard in enumerate((8, 6)):
+            emp = Employee.objects.create(E_id=f'N{n}', E_name='Hours', standard_hours_per_day=standard)
+            rows = [
+                {'manual_hours': Decimal('3.5')},
+                {'manual_hours': Decimal('11'), 'is_sunday': True},
+                {'check_in_time': aware(2025, 3, 1, 9), 'check_out_time': aware(2025, 3, 1, 19),
+                 'worked_hours': Decimal('10')},
+                {'check_in_time': aware(2025, 3, 1, 9), 'check_out_time': aware(2025, 3, 1, 13),
+                 'worked_hours': Decimal('4'), 'is_holiday': True},
+                {'check_in_time': aware(2025, 3, 1, 9)},  # still open
+                {'status': 'Absent'},
+            ]
+            for offset, fields in enumerate(rows):
+                Attendance.objects.create(
+                    employee=emp, date=day + timedelta(days=offset), **{'status': 'Present', **fields},
+                )
+
+        rows = Attendance.objects.select_related('employee').with_hours().with_regular_hours().with_overtime()
+        for row in rows:
+            self.assertAlmostEqual(float(row.hours), row.hours_worked(), places=2, msg=row)
+            self.assertAlmostEqual(float(row.regular), row.regular_hours(), places=2, msg=row)
+            self.assertAlmostEqual(float(row.overtime), row.overtime_hours(), places=2, msg=row)
+
+        totals = Attendance.objects.with_hours().with_overtime().aggregate(
+            total_hours=Sum('hours'), total_overtime=Sum('overtime'),
+        )
+        self.assertAlmostEqual(float(totals['total_hours']), sum(r.hours_worked() for r in rows), places=2)
+        self.assertAlmostEqual(float(totals['total_overtime']), sum(r.overtime_hours() for r in rows), places=2)
+
+
+# ========================= PERMISSION CACHE =========================
+
+class PermissionSnapshotTests(LocationAppTestCase):
+    def fresh(self, user):
+        return User.objects.get(pk=user.pk)
+
+    def test_grants_and_revokes_invalidate(self):
+        user = User.objects.create_user('p1', password='x')
+        self.assertFalse(permission_snapshot(user).has('can_edit_salary'))
+
+        edit_salary = Permission.objects.get(codename='can_edit_salary')
+        user.user_permissions.add(edit_salary)
+        self.assertTrue(permission_snapshot(self.fresh(user)).has('locationapp.can_edit_salary'))
+
+        group = Group.objects.create(name='reports')
+        user.groups.add(group)
+        group.permissions.add(Permission.objects.get(codename='can_view_reports'))
+        self.assertTrue(permission_snapshot(self.fresh(user)).has('can_view_reports'))
+
+        edit_salary.user_set.remove(user)
+        self.assertFalse(permission_snapshot(self.fresh(user)).has('can_edit_salary'))
+
+        group.delete()
+        self.assertFalse(permission_snapshot(self.fresh(user)).has('can_view_reports'))
+
+    def test_cached_snapshot_is_one_cache_read(self):
+        user = User.objects.create_user('p1', password='x')
+        permission_snapshot(user)
+        with self.assertNumQueries(1):
+            permission_snapshot(user)
+
+
+# ========================= GEOFENCE ENGINE =========================
+
+class GeofenceIndexTests(LocationAppTestCase):
+    def linear_scan(self, offices, lat, lon):
+        measured = [(calculate_distance(lat, lon, o.latitude, o.longitude), o) for o in offices]
+        inside = [(d, o) for d, o in measured if geofence.office_contains(o, lat, lon, d)]
+        distance, office = min(inside or measured, key=lambda m: m[0])
+        return office, bool(inside)
+
+    def test_ring_search_matches_a_linear_scan(self):
+        rng = random.Random(7)
+        offices = [
+            Office(name=f'Site {n}', latitude=30 + rng.uniform(0, 0.2), longitude=75 + rng.uniform(0, 0.2),
+                   radius_m=rng.choice([50, 150, 400]))
+            for n in range(40)
+        ]
+        lat, lon = offices[0].latitude, offices[0].longitude
+        offices[0].polygon = [[lat - 0.002, lon - 0.002], [lat - 0.002, lon + 0.002], [lat + 0.002, lon]]
+        index = geofence.GeofenceIndex(offices, cell_deg=0.01)
+        # Points inside fences, between sites and far away (full scan fallback)
+        points = [(o.latitude + 0.0003, o.longitude) for o in offices]
+        points += [(30 + rng.uniform(-0.1, 0.3), 75 + rng.uniform(-0.1, 0.3)) for _ in range(400)]
+        points += [(12.97, 77.59), (31.5, 74.3)]
+        for lat, lon in points:
+            match = index.locate(lat, lon)
+            self.assertEqual((match.office, match.inside), self.linear_scan(offices, lat, lon), (lat, lon))
+
+    def test_polygon_validation_errors(self):
+        cases = [
+            ({'lat': 1}, "Polygon is a dict"),
+            ([[30, 75], [30, 76]], "Polygon has 2 vertices, at least 3 are needed"),
+            ([[30, 75], [30, 76], [31]], "Vertex 3 is [31]"),
+            ([[30, 75], [30, 76], [31, 'x']], "Vertex 3 is [31, 'x']"),
+            ([[30, 75], [30, 76], [91, 75]], "latitude must be within ±90"),
+        ]
+        for polygon, message in cases:
+            with self.assertRaisesMessage(ValidationError, message):
+                Office(name='Bad', latitude=30, longitude=75, polygon=polygon).clean()
+        Office(name='Good', latitude=30, longitude=75, polygon=[[30, 75], [30, 76], [31, 75.5]]).clean()
+
+
+# ========================= GEOFENCE AUDIT =========================
+
+@skipIf(geofence.np is None, "audit_geofence needs NumPy")
+class GeofenceAuditTests(LocationAppTestCase):
+    def audit(self, *args):
+        path = os.path.join(tempfile.mkdtemp(), 'audit.csv')
+        call_command('audit_geofence', '--output', path, *args, stdout=StringIO())
+        with open(path, newline='') as fh:
+            return list(csv.DictReader(fh))
+
+    def test_flags_out_of_fence_check_ins(self):
+        main = Office.objects.get()
+        Office.objects.create(name='Delhi', latitude=28.6, longitude=77.2, radius_m=300)
+        emp = Employee.objects.create(E_id='G1', E_name='Geo')
+        Attendance.objects.create(
+            employee=emp, date=date(2025, 1, 1), status='Present', office=main,
+            latitude=main.latitude, longitude=main.longitude,
+        )
+        wrong_office = Attendance.objects.create(
+            employee=emp, date=date(2025, 1, 2), status='Present', office=main, latitude=28.6, longitude=77.2,
+        )
+        nowhere = Attendance.objects.create(employee=emp, date=date(2025, 1, 3), status='Present', latitude=10, longitude=10)
+
+        rows = self.audit('--from', '2025-01-01', '--to', '2025-01-31', '--chunk-size', '2')
+        self.assertEqual({int(r['attendance_id']) for r in rows}, {wrong_office.pk, nowhere.pk})
+
+        rows = self.audit('--from', '2025-01-01', '--to', '2025-01-31', '--office', main.name)
+        self.assertEqual({int(r['attendance_id']) for r in rows}, {wrong_office.pk})
+
+    def test_every_session_is_audited(self):
+        main = Office.objects.get()
+        emp = Employee.objects.create(E_id='G1', E_name='Geo')
+        row = Attendance.objects.create(
+            employee=emp, date=date(2025, 2, 1), status='Present', office=main,
+            latitude=main.latitude, longitude=main.longitude,
+        )
+        AttendanceSession.objects.create(
+            attendance=row, office=main, check_in_time=aware(2025, 2, 1, 9), check_out_time=aware(2025, 2, 1, 12),
+            latitude=main.latitude, longitude=main.longitude,
+        )
+        away = AttendanceSession.objects.create(
+            attendance=row, office=main, check_in_time=aware(2025, 2, 1, 14), latitude=10, longitude=10,
+        )
+
+        rows = self.audit('--from', '2025-02-01', '--to', '2025-02-01')
+        self.assertEqual([(r['source'], int(r['session_id'])) for r in rows], [('session', away.pk)])
+
+
+# ========================= LOCATION BUFFER =========================
+
+class LocationBufferTests(LocationAppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.emp = Employee.objects.create(E_id='L1', E_name='Loc')
+        self.when = timezone.now()
+
+    def test_flush_writes_position_and_history(self):
+        buffer = LocationBuffer(flush_interval=1000)
+        buffer.record(self.emp.pk, 30.5, 75.5, self.when - timedelta(minutes=1))
+        buffer.record(self.emp.pk, 30.1234567, 75.7654321, self.when)
+        self.assertIsNone(Employee.objects.get(pk=self.emp.pk).latitude)
+
+        self.assertEqual(buffer.flush(), 1)
+        self.emp.refresh_from_db()
+        self.assertEqual((self.emp.latitude, self.emp.longitude), (30.1234567, 75.7654321))
+        self.assertEqual(LocationPing.objects.filter(employee=self.emp).count(), 2)
+        self.assertEqual(buffer.flush(), 0)
+
+    def test_failed_flush_keeps_then_drops_the_batch(self):
+        buffer = LocationBuffer(flush_interval=1000, max_attempts=2)
+        buffer.record(self.emp.pk, 1.0, 2.0, self.when)
+        with mock.patch.object(Employee.objects, 'bulk_update', side_effect=DatabaseError('locked')):
+            with self.assertRaises(DatabaseError):
+                buffer.flush()
+            # The history rows written before the failure were rolled back with it
+            self.assertFalse(LocationPing.objects.exists())
+            self.assertEqual(buffer.latest(self.emp.pk), (1.0, 2.0, self.when))
+            self.assertEqual(buffer.dropped, 0)
+            with self.assertRaises(DatabaseError), self.assertLogs('locationapp.location_buffer', 'ERROR'):
+                buffer.flush()
+        self.assertEqual(buffer.dropped, 2)  # the position and its history ping
+        self.assertEqual(buffer.flush(), 0)
+
+    def test_retried_flush_writes_the_history_once(self):
+        buffer = LocationBuffer(flush_interval=1000)
+        buffer.record(self.emp.pk, 1.0, 2.0, self.when)
+        with mock.patch.object(Employee.objects, 'bulk_update', side_effect=DatabaseError('locked')):
+            with self.assertRaises(DatabaseError):
+                buffer.flush()
+        self.assertEqual(buffer.flush(), 1)
+        self.assertEqual(LocationPing.objects.count(), 1)
+        self.emp.refresh_from_db()
+        self.assertEqual(self.emp.latitude, 1.0)
+
+    def test_asgi_shutdown_writes_the_buffer(self):
+        from locationproject import asgi
+
+        buffer = LocationBuffer(flush_interval=1000)
+        buffer.record(self.emp.pk, 1.0, 2.0, self.when)
+        messages = iter([{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}])
+        sent = []
+
+        async def receive():
+            return next(messages)
+
+        async def send(message):
+            sent.append(message['type'])
+
+        with mock.patch.object(asgi, 'location_buffer', buffer):
+            async_to_sync(asgi.application)({'type': 'lifespan'}, receive, send)
+        self.assertEqual(sent, ['lifespan.startup.complete', 'lifespan.shutdown.complete'])
+        self.emp.refresh_from_db()
+        self.assertEqual(self.emp.latitude, 1.0)
+
+    def test_clear_drops_without_writing(self):
+        buffer = LocationBuffer(flush_interval=1000)
+        buffer.record(self.emp.pk, 1.0, 2.0, self.when)
+        buffer.clear()
+        self.assertEqual(buffer.flush(), 0)
+        self.assertIsNone(buffer.latest(self.emp.pk))
+        self.assertFalse(LocationPing.objects.exists())
+
+    def test_deleted_employee_does_not_block_the_batch(self):
+        other = Employee.objects.create(E_id='L2', E_name='Gone')
+        buffer = LocationBuffer(flush_interval=1000)
+        buffer.record(self.emp.pk, 1.0, 2.0, self.when)
+        buffer.record(other.pk, 3.0, 4.0, self.when)
+        Employee.objects.filter(pk=other.pk)._raw_delete(Employee.objects.db)
+
+        self.assertEqual(buffer.flush(), 1)
+        self.emp.refresh_from_db()
+        self.assertEqual(self.emp.latitude, 1.0)
+        self.assertEqual(LocationPing.objects.count(), 1)
+
+    def test_deleting_an_employee_forgets_its_pings(self):
+        location_buffer.record(self.emp.pk, 1.0, 2.0, self.when)
+        self.emp.delete()
+        self.assertIsNone(location_buffer.latest(self.emp.pk))
+
+
+# ========================= CHECK-IN SESSIONS =========================
+
+class CheckInSessionTests(LocationAppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.emp = Employee.objects.create(E_id='K1', E_name='Twice')
+
+    def test_second_check_in_keeps_the_open_session(self):
+        _, first, opened = record_check_in(self.emp)
+        self.assertTrue(opened)
+        _, second, opened = record_check_in(self.emp)
+        self.assertFalse(opened)
+        self.assertEqual(second, first)
+
+    def test_racing_check_in_finds_the_other_session(self):
+        attendance, first, _ = record_check_in(self.emp)
+        # The concurrent check-in looked before the first one's session existed
+        with mock.patch('django.db.models.QuerySet.last', return_value=None):
+            _, second, opened = record_check_in(self.emp)
+        self.assertFalse(opened)
+        self.assertEqual(second, first)
+        self.assertEqual(attendance.sessions.filter(check_out_time__isnull=True).count(), 1)
+
+    def test_database_allows_one_open_session_a_day(self):
+        attendance, _, _ = record_check_in(self.emp)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            AttendanceSession.objects.create(attendance=attendance, check_in_time=timezone.now())
+
+
+# ========================= LOCATION HISTORY =========================
+
+class LocationHistoryTests(LocationAppTestCase):
+    def test_compaction_in_bounded_pages(self):
+        emps = [Employee.objects.create(E_id=f'H{i}', E_name='Hist') for i in range(2)]
+        now = timezone.now()
+        old = (now - timedelta(days=10)).replace(minute=0, second=0, microsecond=0)
+        pings = [LocationPing.from_degrees(emp.pk, 1, 2, old + timedelta(minutes=m)) for emp in emps for m in range(60)]
+        pings.append(LocationPing.from_degrees(emps[0].pk, 1, 2, now - timedelta(days=200)))
+        LocationPing.objects.bulk_create(pings)
+
+        with CaptureQueriesContext(connection) as ctx:
+            call_command('compact_location_pings', '--chunk-size', '7', stdout=StringIO())
+        reads = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('SELECT "locationapp_locationping"."id"')]
+        self.assertTrue(reads)
+        self.assertTrue(all('LIMIT 7' in sql for sql in reads))
+
+        day = LocationPing.objects.filter(day=timezone.localdate(old))
+        self.assertEqual(day.count(), 8)
+        self.assertEqual(sum(day.values_list('samples', flat=True)), 120)
+        call_command('compact_location_pings', stdout=StringIO())
+        self.assertEqual(sum(day.values_list('samples', flat=True)), 120)
+        self.assertEqual(LocationPing.objects.count(), 8)
+
+
+# ========================= ASYNC LOCATION ENDPOINTS =========================
+
+class AsyncLocationViewTests(LocationAppTestCase):
+    def setUp(self):
+        super().setUp()
+        employee_cache.clear()
+        self.office = Office.objects.get()
+        self.user = User.objects.create_user('a1', password='x')
+        self.emp = Employee.objects.create(user=self.user, E_id='A1', E_name='Async')
+        record_check_in(self.emp)
+        Employee.objects.filter(pk=self.emp.pk).update(is_checked_in=True)
+
+    def test_views_are_async(self):
+        self.assertTrue(iscoroutinefunction(views.update_location))
+        self.assertTrue(iscoroutinefunction(views.employee_details))
+
+    async def test_ping_inside_the_fence_is_buffered(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.post(
+            '/update_location/', {'latitude': self.office.latitude, 'longitude': self.office.longitude},
+        )
+        self.assertEqual(response.json()['auto_checked_out'], False)
+        self.assertTrue(response.json()['is_checked_in'])
+        self.assertEqual(location_buffer.latest(self.emp.pk)[:2], (self.office.latitude, self.office.longitude))
+
+        response = await self.async_client.get('/employee_details/', {'E_id': 'A1'})
+        self.assertEqual((response.json()['latitude'], response.json()['longitude']), (self.office.latitude, self.office.longitude))
+
+    async def test_ping_outside_the_fence_checks_out(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.post('/update_location/', {'latitude': 0, 'longitude': 0})
+        self.assertTrue(response.json()['auto_checked_out'])
+        self.assertFalse(await Employee.objects.filter(pk=self.emp.pk, is_checked_in=True).aexists())
+        attendance = await Attendance.objects.aget(employee=self.emp)
+        self.assertTrue(attendance.auto_checkout)
+
+    async def test_unknown_employee(self):
+        response = await self.async_client.get('/employee_details/', {'E_id': 'nobody'})
+        self.assertEqual(response.status_code, 404)
+
+
+# ========================= LIVE PRESENCE =========================
+
+class PresenceTests(LocationAppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('watcher', password='x')
+        self.user.user_permissions.add(Permission.objects.get(codename='can_view_attendance'))
+        Employee.objects.create(user=self.user, E_id='W0', E_name='Watcher', is_manager=True)
+        self.worker = Employee.objects.create(E_id='W1', E_name='Worker')
+        self.registry = PresenceRegistry()
+        for module in (views, presence_module):
+            patcher = mock.patch.object(module, 'presence', self.registry)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_wsgi_polls_the_snapshot(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get('/manager_dashboard/presence/').status_code, 501)
+        self.assertEqual(self.client.get('/manager_dashboard/presence.json').json()['present'], [])
+
+        self.registry.checked_in(self.worker)
+        data = self.client.get('/manager_dashboard/presence.json').json()
+        self.assertEqual([e['E_id'] for e in data['present']], ['W1'])
+        self.assertEqual(data['last_event_id'], 1)
+
+    async def test_asgi_streams_snapshot_then_deltas(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get('/manager_dashboard/presence/')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        try:
+            self.assertIn(b'event: snapshot', await anext(stream))
+            await sync_to_async(self.registry.checked_in)(self.worker)
+            message = await anext(stream)
+            self.assertIn(b'event: presence', message)
+            self.assertIn(b'"type": "checkin"', message)
+        finally:
+            await stream.aclose()
+
+    async def test_reconnect_replays_missed_events(self):
+        self.registry.checked_in(self.worker)
+        self.registry.checked_out(self.worker, auto=True)
+        stream = presence_events(last_event_id=1, registry=self.registry)
+        try:
+            message = await anext(stream)
+        finally:
+            await stream.aclose()
+        self.assertEqual(self.registry.subscriber_count, 0)
+        self.assertTrue(message.startswith('id: 2\nevent: presence'))
+        self.assertIn('"type": "auto_checkout"', message)
+
+
+# ========================= SESSION SWEEPER =========================
+
+class SessionSweeperTests(LocationAppTestCase):
+    def setUp(self):
+        super().setUp()
+        employee_cache.clear()
+
+    def test_closes_only_stale_sessions(self):
+        now = timezone.now()
+        stale = Employee.objects.create(E_id='S1', E_name='Stale', is_checked_in=True)
+        fresh = Employee.objects.create(E_id='S2', E_name='Fresh', is_checked_in=True)
+        silent = Employee.objects.create(E_id='S3', E_name='Silent', is_checked_in=True)
+        get_employee('S1')
+        for emp in (stale, fresh, silent):
+            record_check_in(emp, when=now - timedelta(hours=3))
+        Employee.objects.filter(pk=stale.pk).update(last_location_update=now - timedelta(hours=1))
+        Employee.objects.filter(pk=fresh.pk).update(last_location_update=now - timedelta(minutes=5))
+
+        self.assertEqual(close_stale_sessions(30, batch_size=2, now=now), (2, 2))
+        closed = Attendance.objects.get(employee=stale)
+        self.assertTrue(closed.auto_checkout)
+        self.assertEqual(closed.worked_hours, Decimal('2.00'))
+        self.assertEqual(Attendance.objects.get(employee=silent).worked_hours, 0)
+        self.assertIsNone(Attendance.objects.get(employee=fresh).check_out_time)
+        self.assertEqual(set(Employee.objects.filter(is_checked_in=True).values_list('E_id', flat=True)), {'S2'})
+        self.assertFalse(get_employee('S1').is_checked_in)
+        self.assertEqual(validate_monthly_summaries(), [])
+        self.assertEqual(close_stale_sessions(30, now=now), (0, 0))
+
+    def test_earlier_day_session_ends_with_its_day(self):
+        now = timezone.now()
+        emp = Employee.objects.create(E_id='S4', E_name='Forgot', is_checked_in=True, last_location_update=now)
+        yesterday = timezone.localdate(now) - timedelta(days=1)
+        row = Attendance.objects.create(employee=emp, date=yesterday, status='Present', check_in_time=now - timedelta(days=1))
+        AttendanceSession.objects.create(attendance=row, check_in_time=now - timedelta(days=1))
+
+        self.assertEqual(close_stale_sessions(30, now=now), (1, 1))
+        row.refresh_from_db()
+        self.assertEqual(timezone.localdate(row.check_out_time), yesterday)
+
+
+# ========================= ABSENCES =========================
+
+class MarkAbsencesTests(LocationAppTestCase):
+    def setUp(self):
+        super().setUp()
+        work_calendar._calendars.clear()
+
+    def test_idempotent(self):
+        # March 2025: the 2nd and 9th are Sundays, the 6th a holiday
+        alice = Employee.objects.create(E_id='A', E_name='Alice')
+        Attendance.objects.create(employee=alice, date=date(2025, 3, 3), status='Present')
+        Holiday.objects.create(date=date(2025, 3, 6), name='Holi')
+
+        self.assertEqual(mark_absences(date(2025, 3, 1), date(2025, 3, 10), batch_size=3), 6)
+        self.assertEqual(mark_absences(date(2025, 3, 1), date(2025, 3, 10)), 0)
+        self.assertEqual(Attendance.objects.filter(status='Absent').count(), 6)
+        self.assertFalse(Attendance.objects.filter(date__in=[date(2025, 3, 2), date(2025, 3, 6), date(2025, 3, 9)]).exists())
+        self.assertEqual(Attendance.objects.get(date=date(2025, 3, 3)).status, 'Present')
+
+    def test_later_check_in_turns_the_row_present(self):
+        office = Office.objects.get()
+        emp = Employee.objects.create(E_id='A', E_name='Alice', office=office)
+        mark_absences(date(2025, 3, 4))
+        self.assertEqual(Attendance.objects.get(employee=emp).status, 'Absent')
+
+        with fixed_today(date(2025, 3, 4)):
+            row, session, opened = record_check_in(
+                emp, when=aware(2025, 3, 4, 11), office=office, latitude=1.5, longitude=2.5,
+            )
+        self.assertTrue(opened)
+        row.refresh_from_db()
+        self.assertEqual(
+            (row.status, row.office_id, row.latitude, row.longitude, row.check_in_time),
+            ('Present', office.pk, 1.5, 2.5, aware(2025, 3, 4, 11)),
+        )
+        self.assertEqual(Attendance.objects.filter(employee=emp).count(), 1)
+        self.assertEqual(AttendanceMonthlySummary.objects.get(employee=emp).days_present, 1)
+
+
+# ========================= WORKING DAYS =========================
+
+class WorkingDayTests(LocationAppTestCase):
+    def setUp(self):
+        super().setUp()
+        work_calendar._calendars.clear()
+
+    def test_holidays_reduce_working_days(self):
+        # March 2025: 31 days, Sundays 2, 9, 16, 23 and 30
+        self.assertEqual(work_calendar.working_days_in_month(2025, 3), 26)
+        branch = Office.objects.create(name='Branch', latitude=0, longitude=0)
+        Holiday.objects.create(date=date(2025, 3, 14), name='Holi')
+        Holiday.objects.create(date=date(2025, 3, 20), name='Local', office=branch)
+        self.assertEqual(work_calendar.working_days_in_month(2025, 3), 25)
+        self.assertEqual(work_calendar.working_days_in_month(2025, 3, branch), 24)
+
+        Holiday.objects.filter(name='Holi').delete()
+        self.assertEqual(work_calendar.working_days_in_month(2025, 3), 26)
+
+    def test_payroll_uses_the_employee_office(self):
+        main = Office.objects.get()
+        branch = Office.objects.create(name='Branch', latitude=1, longitude=1)
+        at_main = Employee.objects.create(E_id='A', E_name='Main', office=main, monthly_salary=2600)
+        at_branch = Employee.objects.create(E_id='B', E_name='Branch', office=branch, monthly_salary=2600)
+        nowhere = Employee.objects.create(E_id='N', E_name='None', monthly_salary=2600)
+        Holiday.objects.create(date=date(2025, 3, 4), name='Branch day', office=branch)
+
+        lines = calculate_payroll([at_main, at_branch, nowhere], 3, 2025)
+        self.assertEqual(
+            [lines[e.pk]['working_days'] for e in (at_main, at_branch, nowhere)], [26, 25, 26],
+        )
+        maps = build_attendance_maps([at_main, at_branch], 2025, 3)
+        self.assertIn(4, maps[at_main.pk])
+        self.assertNotIn(4, maps[at_branch.pk])
+
+    def test_holiday_flags_follow_holiday_edits(self):
+        emp = Employee.objects.create(E_id='E', E_name='Eve')
+        row = Attendance.objects.create(employee=emp, date=date(2025, 3, 14), status='Present', manual_hours=Decimal('8'))
+        holiday = Holiday.objects.create(date=date(2025, 3, 14), name='Holi')
+        row.refresh_from_db()
+        self.assertTrue(row.is_holiday)
+        self.assertEqual(AttendanceMonthlySummary.objects.get(employee=emp).overtime_hours, 8)
+
+        holiday.date = date(2025, 3, 17)
+        holiday.save()
+        row.refresh_from_db()
+        self.assertFalse(row.is_holiday)
+        self.assertEqual(validate_monthly_summaries(), [])
+
+
+# ========================= DATABASE PROFILES =========================
+
+class DatabaseProfileTests(LocationAppTestCase):
+    def journal_mode(self, database):
+        wrapper = ConnectionHandler({'default': database})['default']
+        try:
+            with wrapper.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode')
+                return cursor.fetchone()[0]
+        finally:
+            wrapper.close()
+
+    def test_profiles_from_env(self):
+        path = os.path.join(tempfile.mkdtemp(), 'db.sqlite3')
+        self.assertNotIn('OPTIONS', database_from_env(path, {'DB_PROFILE': 'sqlite-legacy'}))
+        default = database_from_env(path, {})
+        self.assertEqual(default['OPTIONS']['transaction_mode'], 'IMMEDIATE')
+        self.assertNotIn('journal_mode', default['OPTIONS']['init_command'])
+        self.assertEqual(database_from_env(path, {'DB_SQLITE_TIMEOUT': '5'})['OPTIONS']['timeout'], 5.0)
+        self.assertIn('journal_mode=WAL', database_from_env(path, {'DB_PROFILE': 'SQLITE-WAL'})['OPTIONS']['init_command'])
+
+        postgres = database_from_env(path, {'DB_PROFILE': 'postgres', 'DB_NAME': 'att', 'DB_POOL': '1', 'DB_POOL_MAX': '8'})
+        self.assertEqual((postgres['NAME'], postgres['CONN_MAX_AGE']), ('att', 0))
+        self.assertEqual(postgres['OPTIONS']['pool'], {'min_size': 2, 'max_size': 8})
+        self.assertEqual(database_from_env(path, {'DB_PROFILE': 'postgres'})['CONN_MAX_AGE'], 60)
+        with self.assertRaises(ValueError):
+            database_from_env(path, {'DB_PROFILE': 'mysql'})
+
+    def test_only_the_wal_profile_converts_the_file(self):
+        path = os.path.join(tempfile.mkdtemp(), 'db.sqlite3')
+        self.assertEqual(self.journal_mode(sqlite_database(path)), 'delete')
+        self.assertEqual(self.journal_mode(sqlite_database(path, wal=True)), 'wal')
+        # Recorded in the file: later connections of any profile keep it
+        self.assertEqual(self.journal_mode(sqlite_database(path, tuned=False)), 'wal')
+
+
+# ========================= SHARED CACHE =========================
+
+class SharedCacheTests(LocationAppTestCase):
+    def test_backend_from_env(self):
+        self.assertEqual(shared_cache_from_env({})['BACKEND'], 'django.core.cache.backends.db.DatabaseCache')
+        redis = shared_cache_from_env({'SHARED_CACHE_URL': 'redis://cache:6379/1'})
+        self.assertEqual(redis, {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://cache:6379/1'})
+        memcached = shared_cache_from_env({'SHARED_CACHE_URL': 'memcached://cache:11211'})
+        self.assertEqual(memcached['LOCATION'], 'cache:11211')
+        with self.assertRaises(ValueError):
+            shared_cache_from_env({'SHARED_CACHE_URL': 'file:///tmp/cache'})
+
+    def test_per_process_stamps_are_flagged(self):
+        self.assertEqual(check_shared_caches(None), [])
+        with self.settings(PERMISSION_CACHE_ALIAS='default'):
+            self.assertEqual([w.id for w in check_shared_caches(None)], ['locationapp.W001'])
+
+    def test_database_stamps_are_flagged_for_deploy(self):
+        self.assertEqual([w.id for w in check_database_shared_caches(None)], ['locationapp.W002'])
+        shared = {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://cache:6379/1'}
+        with self.settings(CACHES={**settings.CACHES, 'shared': shared}):
+            self.assertEqual(check_database_shared_caches(None), [])
+
+
+# ========================= SALARY SUMMARY =========================
+
+class SalarySummaryTests(LocationAppTestCase):
+    def test_overtime_uses_the_employee_multiplier(self):
+        emp = Employee.objects.create(
+            E_id='O1', E_name='Over', salary_type='monthly', monthly_salary=Decimal('20000'),
+            hourly_rate=Decimal('100'), standard_hours_per_day=8, overtime_rate_multiplier=Decimal('2.0'),
+        )
+        Attendance.objects.create(employee=emp, date=date(2025, 3, 5), status='Present', manual_hours=Decimal('10'))
+        context = views._salary_summary(emp, 2025, 3)
+        self.assertEqual(context['overtime_hours'], 2.0)
+        self.assertEqual(context['overtime_money'], 400.0)
+        self.assertIn('₹200.00 (overtime)', context['salary_formula'])
+
+
+# ========================= EMPLOYEE IMPORT =========================
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class EmployeeImportTests(LocationAppTestCase):
+    CSV = (
+        "username,password,E_id,E_name,salary_type,monthly_salary,hourly_rate,role\n"
+        "ann,pw-ann,I1,Ann,monthly,30000,,\n"
+        "bob,pw-bob,I2,Bob,hourly,,150.5,Manager\n"
+        "taken,pw,I3,Taken,,,,\n"
+        "cat,pw,I4,Cat,weekly,,,\n"
+        "ann,pw,I5,Ann Again,,,,\n"
+        "dan,pw,,Dan,,,,\n"
+    )
+
+    def setUp(self):
+        super().setUp()
+        employee_cache.clear()
+        User.objects.create_user('taken')
+        self.path = os.path.join(tempfile.mkdtemp(), 'employees.csv')
+        self.addCleanup(os.remove, self.path)
+        with open(self.path, 'w') as fh:
+            fh.write(self.CSV)
+
+    def run_import(self, *args):
+        err = StringIO()
+        call_command('import_employees', self.path, '--workers', '1', *args, stdout=StringIO(), stderr=err)
+        return err.getvalue()
+
+    def test_valid_rows_imported_errors_reported(self):
+        with self.assertRaises(Employee.DoesNotExist):
+            get_employee('I1')  # caches the miss
+        errors = self.run_import()
+        self.assertEqual(errors.splitlines(), [
+            "line 5: salary_type must be one of hourly, monthly",
+            "line 7: Required: E_id",
+            "line 4: Username taken already exists",
+            "line 6: Username ann repeated in the file",
+        ])
+        self.assertEqual(set(Employee.objects.values_list('E_id', flat=True)), {'I1', 'I2'})
+        bob = Employee.objects.get(E_id='I2')
+        self.assertEqual((bob.salary_type, bob.hourly_rate, bob.is_manager), ('hourly', Decimal('150.50'), True))
+        self.assertTrue(bob.user.check_password('pw-bob'))
+        self.assertEqual(get_employee('I1').E_name, 'Ann')
+
+    def test_dry_run_writes_nothing(self):
+        self.run_import('--dry-run')
+        self.assertFalse(Employee.objects.exists())
+
+    def test_missing_column(self):
+        with open(self.path, 'w') as fh:
+            fh.write("username,E_id,E_name\nann,I1,Ann\n")
+        with self.assertRaisesMessage(CommandError, "Missing column(s): password"):
+            self.run_import()
+
+    def test_process_pool_hashes(self):
+        # Spawned workers load the real settings, not this class's override
+        hashes = hash_passwords(['one', 'two'], workers=2)
+        self.assertTrue(PBKDF2PasswordHasher().verify('one', hashes[0]))
+        self.assertTrue(PBKDF2PasswordHasher().verify('two', hashes[1]))
+
+
+# ========================= CSV EXPORTS =========================
+
+class CsvExportTests(LocationAppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.manager = User.objects.create_user('hr', password='x')
+        self.manager.user_permissions.add(Permission.objects.get(codename='can_view_attendance'))
+        Employee.objects.create(user=self.manager, E_id='HR', E_name='HR', is_manager=True)
+        self.emps = [
+            Employee.objects.create(E_id=f'X{n}', E_name=f'Export {n}', salary_type='hourly', hourly_rate=Decimal('100'))
+            for n in range(5)
+        ]
+        for emp in self.emps:
+            Attendance.objects.create(employee=emp, date=date(2025, 3, 3), status='Present', manual_hours=Decimal('9'))
+        Attendance.objects.create(employee=self.emps[0], date=date(2025, 3, 9), status='Absent', is_sunday=True)
+
+    def export(self, path, **params):
+        response = self.client.get(path, params)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        return list(csv.reader(StringIO(b''.join(response.streaming_content).decode())))
+
+    def test_attendance_export(self):
+        self.client.force_login(self.manager)
+        header, *rows = self.export('/manager/export/attendance.csv', employee='X0')
+        self.assertEqual(header, [title for title, _ in ATTENDANCE_COLUMNS])
+        self.assertEqual([(r[0], r[2], r[3], float(r[9])) for r in rows], [
+            ('X0', '2025-03-03', 'Present', 9.0), ('X0', '2025-03-09', 'Absent', 0.0),
+        ])
+        _, *rows = self.export('/manager/export/attendance.csv', date_from='2025-03-04')
+        self.assertEqual(len(rows), 1)
+
+    def test_payroll_export_in_chunks(self):
+        self.client.force_login(self.manager)
+        header, *rows = self.export('/manager/export/payroll.csv', month=3, year=2025)
+        self.assertEqual(header, [title for title, _ in PAYROLL_COLUMNS])
+        # 9 hours at 100, the hour beyond the standard 8 also at 1.5x overtime
+        self.assertEqual({r[0]: float(r[12]) for r in rows if r[0] != 'HR'}, {e.E_id: 1050.0 for e in self.emps})
+        self.assertEqual(list(payroll_rows(3, 2025, chunk_size=2)), list(payroll_rows(3, 2025)))
+
+    def test_same_permissions_as_the_salary_overview(self):
+        clerk = User.objects.create_user('clerk', password='x')
+        Employee.objects.create(user=clerk, E_id='CL', E_name='Clerk')
+        self.client.force_login(clerk)
+        self.assertRedirects(self.client.get('/manager/export/payroll.csv'), '/employee_dashboard/', fetch_redirect_response=False)
+
+        self.manager.user_permissions.clear()
+        self.client.force_login(User.objects.get(pk=self.manager.pk))
+        self.assertRedirects(self.client.get('/manager/export/attendance.csv'), '/manager_dashboard/', fetch_redirect_response=False)
+
+
+# ========================= PAYROLL RESULT CACHE =========================
+
+class PayrollCacheTests(LocationAppTestCase):
+    def setUp(self):
+        super().setUp()
+        payroll_cache.clear()
+        # Tests run inside a transaction: write the setup's stamps now
+        with self.captureOnCommitCallbacks(execute=True):
+            self.emp = Employee.objects.create(E_id='P1', E_name='Pay', salary_type='hourly', hourly_rate=100)
+            self.row = Attendance.objects.create(
+                employee=self.emp, date=date(2025, 3, 3), status='Present', manual_hours=Decimal('4'),
+            )
+
+    def total(self):
+        return month_payroll([self.emp], 3, 2025)[self.emp.pk]['total_salary']
+
+    def test_results_cached_until_the_month_changes(self):
+        self.assertEqual(self.total(), 400)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.total(), 400)
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks, transaction.atomic():
+            self.row.manual_hours = Decimal('5')
+            self.row.save()
+            Attendance.objects.create(employee=self.emp, date=date(2025, 3, 4), status='Present', manual_hours=Decimal('1'))
+        # Several saves, one stamp write after the commit
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(self.total(), 600)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            SalaryAdjustment.objects.create(
+                employee=self.emp, month=3, year=2025, calculated_salary=600, adjusted_salary=550, adjustment_reason='x',
+            )
+        self.assertEqual(month_payroll([self.emp], 3, 2025)[self.emp.pk]['final_salary'], 550)
+
+        self.emp.hourly_rate = 200
+        self.emp.save()
+        self.assertEqual(self.total(), 1200)
+
+    def test_no_stamp_writes_inside_the_transaction(self):
+        with CaptureQueriesContext(connection) as ctx, transaction.atomic():
+            record_check_in(self.emp)
+            record_check_out(self.emp)
+        self.assertFalse([q for q in ctx.captured_queries if 'shared_cache' in q['sql']])
+
+    def test_rolled_back_bumps_are_dropped(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.row.save()
+            raise RuntimeError
+        with self.captureOnCommitCallbacks() as callbacks, transaction.atomic():
+            self.row.save()
+        self.assertEqual(len(callbacks), 1)
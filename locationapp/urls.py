@@ -14,10 +14,13 @@ urlpatterns = [
     
     # Manager Dashboard
     path("manager_dashboard/", views.manager_dashboard, name="manager_dashboard"),
+    path("manager_dashboard/presence/", views.presence_stream, name="presence_stream"),
+    path("manager_dashboard/presence.json", views.presence_snapshot, name="presence_snapshot"),
     
     # Employee Management
     path("add_user/", views.add_user, name="add_user"),
     path('add_employee/', views.add_employee, name='add_employee'),
+    path('import_employees/', views.import_employees_view, name='import_employees'),
     path('edit_salary/<int:employee_id>/', views.edit_salary, name='edit_salary'),
     path('delete_employee/<int:employee_id>/', views.delete_employee, name='delete_employee'),
     
@@ -32,4 +35,8 @@ urlpatterns = [
     path('manager/salary-overview/', views.manager_salary_overview, name='manager_salary_overview'),
     path('manager/salary/<int:employee_id>/view/', views.view_employee_salary_detail, name='view_salary_detail'),
     path('manager/salary/<int:employee_id>/adjust/', views.adjust_salary, name='adjust_salary'),
+
+    # CSV exports (streamed)
+    path('manager/export/attendance.csv', views.export_attendance_csv, name='export_attendance_csv'),
+    path('manager/export/payroll.csv', views.export_payroll_csv, name='export_payroll_csv'),
 ]
@@ -1,16 +1,34 @@
+import logging
+
+from asgiref.sync import sync_to_async
 from django.views.decorators.csrf import csrf_protect
 from django.shortcuts import render, redirect
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
-from .models import Employee, Attendance, SalaryAdjustment, calculate_distance, OFFICE_LAT, OFFICE_LON
+from .models import Employee, Attendance, SalaryAdjustment
+from .geofence import locate_office, alocate_office
+from .attendance import (
+    build_attendance_map, employees_with_counts, attendance_totals, filter_attendance, attendance_page,
+    record_check_in, record_check_out,
+)
+from .payroll import month_payroll
+from .onboarding import IMPORT_COLUMNS, import_employees, read_csv
+from .exports import ATTENDANCE_COLUMNS, PAYROLL_COLUMNS, attendance_rows, csv_lines, payroll_rows
+from .payroll_cache import payroll_cache
+from .work_calendar import month_calendar, working_days_in_month
+from .summary import monthly_summaries
+from .location_buffer import location_buffer
+from .presence import presence, presence_events, streaming_enabled
+from .employee_cache import employee_cache, get_employee, get_employee_or_404
 from datetime import date, datetime, timedelta
-from calendar import monthrange
 from django.shortcuts import render, redirect, get_object_or_404
 from django.http import JsonResponse
 from django.utils import timezone
+from django.db import IntegrityError
 from django.db.models import Sum
+from django.conf import settings
 
 try:
     from django.utils.http import url_has_allowed_host_and_scheme
@@ -19,35 +37,32 @@ except ImportError:
     url_has_allowed_host_and_scheme = is_safe_url
 
 
+logger = logging.getLogger(__name__)
+
+
 # ========================= AUTO CHECK-OUT FUNCTION =========================
 
-def auto_checkout_if_far(employee, lat, lon):
+def auto_checkout_if_far(employee, lat, lon, match=None):
     """
-    Automatically check out employee if they move >100m from office
+    Automatically check out employee if they move outside every office geofence
     Returns: (checked_out: bool, distance: float)
     """
-    distance = round(calculate_distance(lat, lon, OFFICE_LAT, OFFICE_LON), 2)
+    if match is None:
+        match = locate_office(lat, lon)
+    distance = round(match.distance, 2)
     
     # Check if employee is currently checked in
-    if employee.is_checked_in and distance > 100:
-        # Find today's active attendance (checked in but not checked out)
-        today_attendance = Attendance.objects.filter(
-            employee=employee,
-            date=date.today(),
-            check_in_time__isnull=False,
-            check_out_time__isnull=True
-        ).order_by('-id').first()
+    if employee.is_checked_in and not match.inside:
+        # Close today's open session (auto check-out)
+        today_attendance = record_check_out(
+            employee, auto=True, reason=f"Auto checkout - moved {distance}m from office"
+        )
         
         if today_attendance:
-            # Auto check-out
-            today_attendance.check_out_time = timezone.now()
-            today_attendance.auto_checkout = True
-            today_attendance.checkout_reason = f"Auto checkout - moved {distance}m from office"
-            today_attendance.save()
-            
             # Update employee status
             employee.is_checked_in = False
-            employee.save()
+            employee.save(update_fields=['is_checked_in'])
+            presence.checked_out(employee, auto=True)
             
             return True, distance
     
@@ -60,9 +75,9 @@ from django.utils import timezone
 from .models import Employee, Attendance
 
 def attendance_dashboard(request):
-    emp = get_object_or_404(Employee, E_id=request.GET.get('E_id'))
+    emp = get_employee_or_404(request.GET.get('E_id'))
     today = timezone.localdate()
-    today_record = Attendance.objects.filter(employee=emp, date=today).order_by('-check_in_time').first()
+    today_record = Attendance.objects.filter(employee=emp, date=today).first()
     context = {
         'emp': emp,
         'today_record': today_record,
@@ -70,18 +85,13 @@ def attendance_dashboard(request):
     return render(request, 'attendance_dashboard.html', context)
 
 def check_in(request):
-    emp = get_object_or_404(Employee, E_id=request.GET.get('E_id'))
-    now = timezone.now()
-    Attendance.objects.create(employee=emp, date=now.date(), check_in_time=now, status='Present')
+    emp = get_employee_or_404(request.GET.get('E_id'))
+    record_check_in(emp)
     return redirect('attendance_dashboard')
 
 def check_out(request):
-    emp = get_object_or_404(Employee, E_id=request.GET.get('E_id'))
-    today = timezone.localdate()
-    att = Attendance.objects.filter(employee=emp, date=today, check_out_time__isnull=True).first()
-    if att:
-        att.check_out_time = timezone.now()
-        att.save()
+    emp = get_employee_or_404(request.GET.get('E_id'))
+    record_check_out(emp)
     return redirect('attendance_dashboard')
 
 
@@ -95,7 +105,7 @@ def employee_salary_summary(request):
     if not E_id:
         return render(request, "employee_salary_dashboard.html", {"error": "No Employee ID provided."})
     try:
-        emp = Employee.objects.get(E_id=E_id)
+        emp = get_employee(E_id)
     except Employee.DoesNotExist:
         return render(request, "employee_salary_dashboard.html", {"error": "Invalid Employee ID."})
     
@@ -103,27 +113,41 @@ def employee_salary_summary(request):
     month = today.month
     year = today.year
 
-    attendances = Attendance.objects.filter(
-        employee=emp, date__year=year, date__month=month, status="Present"
-    )
+    # Same figures until the employee's attendance, rates or adjustment change
+    versions = payroll_cache.versions([emp], year, month)
+    context = payroll_cache.get_many('summary', versions, year, month).get(emp.pk)
+    if context is None:
+        context = _salary_summary(emp, year, month)
+        payroll_cache.set_many('summary', {emp.pk: context}, versions, year, month)
+    return render(request, "employee_salary_dashboard.html", {**context, "emp": emp})
+
+
+def _salary_summary(emp, year, month):
+    """employee_salary_summary context, without the employee"""
+    # Month totals maintained incrementally in AttendanceMonthlySummary
+    summary = monthly_summaries([emp.pk], year, month)[emp.pk]
 
     standard_hours = emp.standard_hours_per_day
     monthly_salary = float(emp.monthly_salary)
     hourly_rate = float(emp.hourly_rate)
+    overtime_rate = hourly_rate * float(emp.overtime_rate_multiplier)  # as on the payroll lines
+
+    total_hours = float(summary.total_hours)
+    full_days = summary.full_days
+    partial_days = summary.days_present - full_days
 
-    total_hours = sum(a.hours_worked() for a in attendances)
-    full_days = sum(1 for a in attendances if a.hours_worked() >= standard_hours)
-    partial_days = attendances.count() - full_days
+    # Same working-day count as the payroll lines
+    working_days = working_days_in_month(year, month, emp.office_id)
 
     if emp.salary_type == 'monthly':
-        daily_rate = monthly_salary / 26
-        base_hours = sum(min(a.hours_worked(), standard_hours) for a in attendances)
-        salary_for_days = (base_hours / (standard_hours * 26)) * monthly_salary
-        overtime_hours = sum(max(a.hours_worked() - standard_hours, 0) for a in attendances)
-        overtime_money = overtime_hours * hourly_rate * 1.5  # 1.5x multiplier
+        base_hours = float(summary.regular_hours)
+        salary_for_days = (base_hours / (standard_hours * working_days)) * monthly_salary if working_days else 0.0
+        # Hours beyond the standard day, Sundays included
+        overtime_hours = float(summary.total_hours - summary.regular_hours)
+        overtime_money = overtime_hours * overtime_rate
         salary_formula = (
-            f"({base_hours:.2f}h ÷ {standard_hours*26}h) × ₹{monthly_salary:.2f}"
-            f" + {overtime_hours:.2f}h × ₹{hourly_rate*1.5:.2f} (overtime)"
+            f"({base_hours:.2f}h ÷ {standard_hours*working_days}h) × ₹{monthly_salary:.2f}"
+            f" + {overtime_hours:.2f}h × ₹{overtime_rate:.2f} (overtime)"
         )
         this_month_income = salary_for_days + overtime_money
     else:
@@ -133,14 +157,14 @@ def employee_salary_summary(request):
         salary_formula = f"{total_hours:.2f}h × ₹{hourly_rate:.2f}/hour"
         this_month_income = salary_for_days
 
-    context = {
-        "emp": emp,
+    return {
         "month": month,
         "year": year,
         "salary_type": emp.salary_type,
+        "working_days": working_days,
         "full_days": full_days,
         "partial_days": partial_days,
-        "total_days_present": attendances.count(),
+        "total_days_present": summary.days_present,
         "total_hours": round(total_hours, 2),
         "salary_for_days": round(salary_for_days, 2),
         "overtime_hours": round(overtime_hours, 2),
@@ -150,7 +174,6 @@ def employee_salary_summary(request):
         "salary_formula": salary_formula,
         "this_month_income": round(this_month_income, 2),
     }
-    return render(request, "employee_salary_dashboard.html", context)
 
 
 
@@ -170,54 +193,46 @@ def home(request):
         lon = float(lon)
 
         try:
-            emp = Employee.objects.get(E_id=E_id)
+            emp = get_employee(E_id)
             emp.latitude = lat
             emp.longitude = lon
             emp.last_location_update = timezone.now()
-            emp.save()
+            location_buffer.record(emp.pk, lat, lon, emp.last_location_update)
+            presence.pinged(emp.pk, lat, lon, emp.last_location_update)
 
             # Check for auto-checkout
-            auto_checked_out, distance = auto_checkout_if_far(emp, lat, lon)
+            match = locate_office(lat, lon)
+            auto_checked_out, distance = auto_checkout_if_far(emp, lat, lon, match)
             if auto_checked_out:
                 return render(request, "home.html", {
                     "warning": f"⚠️ You were automatically checked out because you moved {distance}m from office.",
                     "auto_checkout": True
                 })
 
-            if distance > 100:
+            if not match.inside:
                 return render(request, "home.html", {
-                    "error": f"You are not within 100 meters! (Distance: {distance} m)"
+                    "error": f"You are not within {match.office.radius_m:g} meters of {match.office.name}! (Distance: {distance} m)"
                 })
 
-            # Check if today is Sunday
-            today = date.today()
-            is_sunday = (today.weekday() == 6)
-
-            # Create attendance record
-            Attendance.objects.create(
-                employee=emp, 
-                status="Present", 
-                latitude=lat, 
+            # Open a session on today's attendance row (created on the first check-in)
+            record_check_in(
+                emp,
+                office=match.office if match.office.pk else None,
+                latitude=lat,
                 longitude=lon,
-                check_in_time=timezone.now(),
-                checkout_reason="Manual check-in",
-                is_sunday=is_sunday
             )
             emp.is_checked_in = True
-            emp.save()
+            emp.save(update_fields=['is_checked_in'])
+            presence.checked_in(emp, match.office if match.office.pk else None)
 
             # ---- RENDER dashboard directly here ----
             records = Attendance.objects.filter(employee=emp).order_by("-date")
             today_record = records.filter(date=date.today()).first()
             year = date.today().year
             month = date.today().month
-            total_days = 26  # Your standard working days
+            total_days = month_calendar(year, month, emp.office_id).working_days
 
-            attendance_map = {}
-            for day in range(1, total_days + 1):
-                day_date = date(year, month, day)
-                latest_attendance = Attendance.objects.filter(employee=emp, date=day_date).order_by('-id').first()
-                attendance_map[day] = latest_attendance.status if latest_attendance else "Absent"
+            attendance_map = build_attendance_map(emp, year, month)
 
             return render(request, "employee_dashboard.html", {
                 "emp": emp,
@@ -244,10 +259,11 @@ def home(request):
 # ========================= LOCATION UPDATE (for auto-checkout monitoring) =========================
 
 @login_required
-def update_location(request):
+async def update_location(request):
     """
     API endpoint for continuous location monitoring
-    Called by frontend every minute to check if employee has moved away
+    Called by frontend every minute to check if employee has moved away.
+    Async: a waiting ping does not hold a worker thread under ASGI.
     """
     if request.method == "POST":
         lat = request.POST.get("latitude")
@@ -259,18 +275,22 @@ def update_location(request):
         lat = float(lat)
         lon = float(lon)
         
-        emp = Employee.objects.filter(user=request.user).first()
+        emp = await request.aemployee()
         if not emp:
             return JsonResponse({"error": "Employee not found"}, status=404)
         
-        # Update location
-        emp.latitude = lat
-        emp.longitude = lon
-        emp.last_location_update = timezone.now()
-        emp.save()
+        # Buffer the location; it is written in batches by location_buffer
+        now = timezone.now()
+        await location_buffer.arecord(emp.pk, lat, lon, now)
+        presence.pinged(emp.pk, lat, lon, now)
         
-        # Check if auto-checkout needed
-        auto_checked_out, distance = auto_checkout_if_far(emp, lat, lon)
+        # Only a geofence transition (auto-checkout) writes synchronously
+        match = await alocate_office(lat, lon)
+        await emp.arefresh_from_db(fields=['is_checked_in'])
+        if emp.is_checked_in and not match.inside:
+            auto_checked_out, distance = await sync_to_async(auto_checkout_if_far)(emp, lat, lon, match)
+        else:
+            auto_checked_out, distance = False, round(match.distance, 2)
         
         return JsonResponse({
             "success": True,
@@ -285,28 +305,35 @@ def update_location(request):
 
 # ========================= EMPLOYEE DETAILS API =========================
 
-def employee_details(request):
+async def employee_details(request):
     E_id = request.GET.get("E_id")
     if not E_id:
         return JsonResponse({"error": "E_id is required"}, status=400)
 
-    try:
-        emp = Employee.objects.get(E_id=E_id)
-        data = {
-            "E_id": emp.E_id,
-            "E_name": emp.E_name,
-            "salary": float(emp.salary),
-            "monthly_salary": float(emp.monthly_salary),
-            "hourly_rate": float(emp.hourly_rate),
-            "salary_type": emp.salary_type,
-            "is_manager": emp.is_manager,
-            "latitude": emp.latitude,
-            "longitude": emp.longitude,
-        }
-        return JsonResponse(data)
-    except Employee.DoesNotExist:
+    emp = await employee_cache.aget(E_id)
+    if emp is None:
         return JsonResponse({"error": "Employee not found"}, status=404)
 
+    # Prefer the newest buffered position over the last flushed one
+    latest = location_buffer.latest(emp.id)
+    if latest:
+        latitude, longitude = latest[0], latest[1]
+    else:
+        latitude, longitude = await Employee.objects.filter(pk=emp.id).values_list('latitude', 'longitude').afirst()
+
+    data = {
+        "E_id": emp.E_id,
+        "E_name": emp.E_name,
+        "salary": float(emp.salary),
+        "monthly_salary": float(emp.monthly_salary),
+        "hourly_rate": float(emp.hourly_rate),
+        "salary_type": emp.salary_type,
+        "is_manager": emp.is_manager,
+        "latitude": latitude,
+        "longitude": longitude,
+    }
+    return JsonResponse(data)
+
 
 # ========================= LOGIN =========================
 
@@ -335,7 +362,7 @@ def user_login(request):
         if user.is_superuser:
             return redirect("/admin/")
 
-        emp = Employee.objects.filter(user=user).first()
+        emp = request.employee
 
         if not emp:
             logout(request)
@@ -376,34 +403,23 @@ def checkout(request):
         return redirect('home')
     
     try:
-        emp = Employee.objects.get(E_id=E_id)
+        emp = get_employee(E_id)
     except Employee.DoesNotExist:
         return redirect('home')
     
-    # Get today's attendance record
-    today = date.today()
-    today_record = Attendance.objects.filter(
-        employee=emp, 
-        date=today,
-        status='Present'
-    ).first()
-    
-    if today_record and today_record.check_in_time and not today_record.check_out_time:
-        # Record check-out time
-        today_record.check_out_time = timezone.now()
-        today_record.checkout_reason = "Manual checkout"
-        today_record.auto_checkout = False
-        today_record.save()
-        
+    # Close today's open session, if any
+    today_record = record_check_out(emp)
+    
+    if today_record:
         # Update employee status
         emp.is_checked_in = False
-        emp.save()
+        emp.save(update_fields=['is_checked_in'])
+        presence.checked_out(emp)
         
         # Calculate hours worked (this triggers the hours_worked() method)
         hours = today_record.hours_worked()
         
-        # Success message (optional)
-        print(f"✅ {emp.E_name} checked out. Worked {hours} hours today.")
+        logger.info("%s checked out, worked %s hours today", emp.E_name, hours)
     
     # Redirect to home page
     return redirect('home')
@@ -415,7 +431,7 @@ def checkout(request):
 @login_required
 def employee_salary_report(request):
     """Employee view to see their own salary"""
-    emp = Employee.objects.filter(user=request.user).first()
+    emp = request.employee
     
     if not emp:
         return redirect("login")
@@ -424,7 +440,7 @@ def employee_salary_report(request):
     year = int(request.GET.get('year', date.today().year))
     month = int(request.GET.get('month', date.today().month))
     
-    salary_data = calculate_monthly_salary(emp.id, year, month)
+    salary_data = calculate_monthly_salary(emp, month, year)
     salary_data['is_employee_view'] = True
     
     return render(request, 'employee_salary.html', salary_data)
@@ -436,84 +452,43 @@ from django.utils import timezone
 
 def calculate_monthly_salary(employee, month=None, year=None):
     """
-    Calculate monthly salary for an employee based on attendance
+    Monthly salary of an employee: the month's payroll run snapshot when
+    there is one, else calculated from attendance
     """
-    if month is None:
-        month = timezone.now().month
-    if year is None:
-        year = timezone.now().year
-    
-    # Get all attendance records for the month
-    attendance_records = Attendance.objects.filter(
-        employee=employee,
-        date__month=month,
-        date__year=year,
-        status='Present'
-    )
-    
-    # Calculate totals
-    total_hours = sum(record.hours_worked() for record in attendance_records)
-    overtime_hours = sum(record.overtime_hours() for record in attendance_records)
-    
-    # Hourly rate, safe for field or method
-    if hasattr(employee, 'hourly_rate'):
-        hr = getattr(employee, 'hourly_rate')
-        hourly_rate = hr() if callable(hr) else hr
-    else:
-        hourly_rate = employee.salary / (employee.standard_hours_per_day * 22)
-    
-    # Calculate salary
-    if employee.salary_type == 'hourly':
-        base_salary = total_hours * float(hourly_rate)
-    else:
-        base_salary = float(employee.salary)
-    
-    # Add overtime
-    overtime_pay = overtime_hours * float(hourly_rate) * 1.5
-    
-    total_salary = base_salary + overtime_pay
-    
-    return {
-        'base_salary': round(base_salary, 2),
-        'overtime_pay': round(overtime_pay, 2),
-        'total_salary': round(total_salary, 2),
-        'total_hours': round(total_hours, 2),
-        'overtime_hours': round(overtime_hours, 2),
-        'hourly_rate': round(float(hourly_rate), 2),
-        'total_days_present': attendance_records.count()
-    }
+    if not isinstance(employee, Employee):
+        employee = Employee.objects.get(id=employee)
+    month = month or date.today().month
+    year = year or date.today().year
+    return month_payroll([employee], month, year)[employee.pk]
 
 # ========================= MANAGER SALARY VIEWS =========================
 
+def _manager_only(request):
+    """Redirect for non-managers on salary pages and exports, else None"""
+    emp = request.employee
+    if not emp or not emp.is_manager:
+        return redirect("employee_dashboard")
+    return None
+
+
 @login_required
 def manager_salary_overview(request):
     """Manager view to see all employee salaries"""
+    denied = _manager_only(request)
+    if denied:
+        return denied
+
     # Get current month/year or from request
     month = int(request.GET.get('month', timezone.now().month))
     year = int(request.GET.get('year', timezone.now().year))
     
-    # Get all employees
-    employees = Employee.objects.all()
-    
-    salary_data = []
-    for emp in employees:
-        # Calculate salary for this employee
-        salary_info = calculate_monthly_salary(emp, month, year)
-        
-        salary_data.append({
-            'employee': emp,
-            'E_id': emp.E_id,
-            'E_name': emp.E_name,
-            'base_salary': salary_info['base_salary'],
-            'overtime_pay': salary_info['overtime_pay'],
-            'total_salary': salary_info['total_salary'],
-            'total_hours': salary_info['total_hours'],
-            'overtime_hours': salary_info['overtime_hours'],
-            'total_days_present': salary_info['total_days_present']
-        })
+    # Salaries of all employees: cached, else the month-end payroll run if one completed, else computed in bulk
+    salary_data = list(month_payroll(Employee.objects.all(), month, year).values())
+    payroll_run = next((line['payroll_run'] for line in salary_data if line['payroll_run']), None)
     
     context = {
         'salary_data': salary_data,
+        'payroll_run': payroll_run,
         'month': month,
         'year': year
     }
@@ -521,16 +496,56 @@ def manager_salary_overview(request):
     return render(request, 'manager_salary_overview.html', context)
 
 
+# ========================= CSV EXPORTS =========================
+
+def _csv_response(lines, filename):
+    response = StreamingHttpResponse(lines, content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@login_required
+def export_payroll_csv(request):
+    """Salary overview of a month as CSV, streamed"""
+    denied = _manager_only(request)
+    if denied:
+        return denied
+
+    month = int(request.GET.get('month', timezone.now().month))
+    year = int(request.GET.get('year', timezone.now().year))
+    lines = csv_lines([title for title, _ in PAYROLL_COLUMNS], payroll_rows(month, year))
+    return _csv_response(lines, f"payroll_{year}_{month:02d}.csv")
+
+
+@login_required
+def export_attendance_csv(request):
+    """Attendance rows (dashboard filters: date_from, date_to, employee) as CSV, streamed"""
+    denied = _manager_only(request)
+    if denied:
+        return denied
+    if not request.permissions.has('can_view_attendance'):
+        return redirect("manager_dashboard")
+
+    filters = {
+        'date_from': _parse_date(request.GET.get('date_from')),
+        'date_to': _parse_date(request.GET.get('date_to')),
+        'E_id': request.GET.get('employee') or None,
+    }
+    rows = attendance_rows(filter_attendance(Attendance.objects.all(), **filters))
+    lines = csv_lines([title for title, _ in ATTENDANCE_COLUMNS], rows)
+    return _csv_response(lines, "attendance.csv")
+
+
 
 @login_required
 def adjust_salary(request, employee_id):
     """HR can manually adjust calculated salary"""
-    emp = Employee.objects.filter(user=request.user).first()
+    emp = request.employee
     
     if not emp or not emp.is_manager:
         return redirect("employee_dashboard")
     
-    if not request.user.has_perm('locationapp.can_manipulate_salary'):
+    if not request.permissions.has('can_manipulate_salary'):
         return redirect("manager_salary_overview")
     
     employee = get_object_or_404(Employee, id=employee_id)
@@ -539,7 +554,7 @@ def adjust_salary(request, employee_id):
     year = int(request.GET.get('year', date.today().year))
     month = int(request.GET.get('month', date.today().month))
     
-    salary_data = calculate_monthly_salary(employee_id, year, month)
+    salary_data = calculate_monthly_salary(employee, month, year)
     
     if request.method == "POST":
         adjusted_salary = request.POST.get("adjusted_salary")
@@ -573,20 +588,22 @@ def adjust_salary(request, employee_id):
 @login_required
 def view_employee_salary_detail(request, employee_id):
     """Detailed salary view for HR"""
-    emp = Employee.objects.filter(user=request.user).first()
+    emp = request.employee
     
     if not emp or not emp.is_manager:
         return redirect("employee_dashboard")
     
+    employee = get_object_or_404(Employee, id=employee_id)
+    
     year = int(request.GET.get('year', date.today().year))
     month = int(request.GET.get('month', date.today().month))
     
-    salary_data = calculate_monthly_salary(employee_id, year, month)
+    salary_data = calculate_monthly_salary(employee, month, year)
     salary_data.update({
         'year': year,
         'month': month,
         'emp': emp,
-        'can_manipulate': request.user.has_perm('locationapp.can_manipulate_salary'),
+        'can_manipulate': request.permissions.has('can_manipulate_salary'),
     })
     
     return render(request, 'salary_detail.html', salary_data)
@@ -604,11 +621,19 @@ def get_greeting():
         return "Good evening"
 
 
+def _parse_date(value):
+    """Parse a YYYY-MM-DD query parameter, ignoring bad input"""
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
 # ========================= ADD USER/EMPLOYEE VIEWS (Keep your existing ones) =========================
 
 @login_required
 def add_user(request):
-    emp = Employee.objects.filter(user=request.user).first()
+    emp = request.employee
 
     if not emp or not emp.is_manager:
         return redirect("employee_dashboard")
@@ -660,9 +685,37 @@ def add_user(request):
     return render(request, "add_user.html")
 
 
+@login_required
+def import_employees_view(request):
+    """Create many users and employees from an uploaded CSV"""
+    emp = request.employee
+
+    if not emp or not emp.is_manager:
+        return redirect("employee_dashboard")
+    if not request.permissions.has('can_add_employee'):
+        return redirect("manager_dashboard")
+
+    context = {'columns': IMPORT_COLUMNS}
+    upload = request.FILES.get('csv_file')
+    if request.method == "POST" and upload:
+        try:
+            rows = read_csv(upload.read())
+            result = import_employees(rows, workers=getattr(settings, 'EMPLOYEE_IMPORT_WORKERS', 4))
+        except ValueError as e:
+            context['error'] = str(e)
+        except IntegrityError as e:
+            context['error'] = f"Nothing imported: {e}"
+        else:
+            context.update({'result': result, 'total': len(rows)})
+    elif request.method == "POST":
+        context['error'] = "Choose a CSV file."
+
+    return render(request, "import_employees.html", context)
+
+
 @login_required
 def add_employee(request):
-    emp = Employee.objects.filter(user=request.user).first()
+    emp = request.employee
 
     if not emp or not emp.is_manager:
         return redirect("employee_dashboard")
@@ -708,41 +761,14 @@ def add_employee(request):
 
 @login_required
 def manager_dashboard(request):
-    emp = Employee.objects.filter(user=request.user).first()
+    emp = request.employee
     greeting = get_greeting() 
     
     if not emp or not emp.is_manager:
         return redirect("employee_dashboard")
     
-    user_permissions = request.user.get_all_permissions()
-    
-    permissions = {
-        'can_view_attendance': 'locationapp.can_view_attendance' in user_permissions,
-        'can_edit_salary': 'locationapp.can_edit_salary' in user_permissions,
-        'can_add_employee': 'locationapp.can_add_employee' in user_permissions,
-        'can_delete_employee': 'locationapp.can_delete_employee' in user_permissions,
-        'can_view_reports': 'locationapp.can_view_reports' in user_permissions,
-    }
-    
-    employees_raw = Employee.objects.all()
-    attendance = Attendance.objects.all()
-
-    employees = []
-    for e in employees_raw:
-        present_count = attendance.filter(employee=e, status='Present').count()
-        absent_count = attendance.filter(employee=e, status='Absent').count()
-        employees.append({
-            'E_name': e.E_name,
-            'E_id': e.E_id,
-            'salary': e.salary,
-            'salary_type': e.get_salary_type_display(),
-            'id': e.id,
-            'present_count': present_count,
-            'absent_count': absent_count,
-        })
-
-    total_present = attendance.filter(status='Present').count()
-    total_absent = attendance.filter(status='Absent').count()
+    # Cached snapshot: no user/group/permission queries
+    permissions = request.permissions.as_dict()
     
     error = None
     success = None
@@ -770,47 +796,107 @@ def manager_dashboard(request):
                     is_manager=is_manager
                 )
                 success = f"Employee {E_name} added successfully!"
-                # Refresh list
-                employees_raw = Employee.objects.all()
-                employees = []
-                for e in employees_raw:
-                    present_count = attendance.filter(employee=e, status='Present').count()
-                    absent_count = attendance.filter(employee=e, status='Absent').count()
-                    employees.append({
-                        'E_name': e.E_name,
-                        'E_id': e.E_id,
-                        'salary': e.salary,
-                        'salary_type': e.get_salary_type_display(),
-                        'id': e.id,
-                        'present_count': present_count,
-                        'absent_count': absent_count,
-                    })
             except Exception as e:
                 error = f"Error creating employee: {str(e)}"
     
+    # Present/absent counts for every employee in one grouped query
+    employees = []
+    for e in employees_with_counts():
+        employees.append({
+            'E_name': e.E_name,
+            'E_id': e.E_id,
+            'salary': e.salary,
+            'salary_type': e.get_salary_type_display(),
+            'id': e.id,
+            'present_count': e.present_count,
+            'absent_count': e.absent_count,
+        })
+
+    totals = attendance_totals()
+
+    # Attendance table: filtered and keyset paginated
+    filters = {
+        'date_from': _parse_date(request.GET.get('date_from')),
+        'date_to': _parse_date(request.GET.get('date_to')),
+        'E_id': request.GET.get('employee') or None,
+    }
+    attendance, next_cursor = attendance_page(
+        filter_attendance(Attendance.objects.all(), **filters),
+        cursor=request.GET.get('after'),
+    )
+    
     context = {
         'emp': emp,
         'employees': employees,
         'attendance': attendance,
+        'next_cursor': next_cursor,
+        'filters': filters,
         'permissions': permissions,
-        'total_present': total_present,
-        'total_absent': total_absent,
+        'total_records': totals['total_records'],
+        'total_present': totals['total_present'],
+        'total_absent': totals['total_absent'],
         'error': error,
         'success': success,
         'greeting': greeting,
+        'presence_streaming': streaming_enabled(request),
+        'presence_poll_seconds': getattr(settings, 'PRESENCE_POLL_SECONDS', 15),
     }
     
     return render(request, 'manager_dashboard.html', context)
 
 
+# ========================= LIVE PRESENCE STREAM =========================
+
+async def presence_stream(request):
+    """
+    Server-Sent Events feed of check-ins, checkouts and pings for the
+    manager dashboard. Serve it over ASGI: each open stream then waits on
+    an asyncio queue instead of holding a worker thread.
+    """
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({"error": "Login required"}, status=401)
+    emp = await request.aemployee()
+    if not emp or not emp.is_manager or not (await request.apermissions()).has('can_view_attendance'):
+        return JsonResponse({"error": "Permission denied"}, status=403)
+    if not streaming_enabled(request):
+        return JsonResponse({"error": "Live streaming needs an ASGI server; poll presence_snapshot instead"}, status=501)
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+
+    response = StreamingHttpResponse(presence_events(last_event_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def presence_snapshot(request):
+    """Who is checked in right now, as JSON: the polling fallback of presence_stream"""
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "Login required"}, status=401)
+    emp = request.employee
+    if not emp or not emp.is_manager or not request.permissions.has('can_view_attendance'):
+        return JsonResponse({"error": "Permission denied"}, status=403)
+
+    # Pick up check-ins and checkouts handled by other workers
+    if presence.reconcile_due():
+        presence.reconcile()
+    seq, present = presence.snapshot()
+    return JsonResponse({"last_event_id": seq, "present": present})
+
+
 @login_required
 def edit_salary(request, employee_id):
-    emp = Employee.objects.filter(user=request.user).first()
+    emp = request.employee
     
     if not emp or not emp.is_manager:
         return redirect("employee_dashboard")
     
-    if not request.user.has_perm('locationapp.can_edit_salary'):
+    if not request.permissions.has('can_edit_salary'):
         return redirect("manager_dashboard")
     
     employee = get_object_or_404(Employee, id=employee_id)
@@ -833,12 +919,12 @@ def edit_salary(request, employee_id):
 
 @login_required
 def delete_employee(request, employee_id):
-    emp = Employee.objects.filter(user=request.user).first()
+    emp = request.employee
     
     if not emp or not emp.is_manager:
         return redirect("employee_dashboard")
     
-    if not request.user.has_perm('locationapp.can_delete_employee'):
+    if not request.permissions.has('can_delete_employee'):
         return redirect("manager_dashboard")
     
     employee = get_object_or_404(Employee, id=employee_id)
@@ -854,7 +940,7 @@ def delete_employee(request, employee_id):
 
 @login_required
 def employee_dashboard(request):
-    emp = Employee.objects.filter(user=request.user).first()
+    emp = request.employee
     
     if not emp:
         return redirect("login")
@@ -864,21 +950,9 @@ def employee_dashboard(request):
 
     year = date.today().year
     month = date.today().month
-    total_days = monthrange(year, month)[1]
+    total_days = month_calendar(year, month, emp.office_id).working_days
 
-    attendance_map = {}
-    
-    for day in range(1, total_days + 1):
-        day_date = date(year, month, day)
-        latest_attendance = Attendance.objects.filter(
-            employee=emp, 
-            date=day_date
-        ).order_by('-id').first()
-        
-        if latest_attendance:
-            attendance_map[day] = latest_attendance.status
-        else:
-            attendance_map[day] = "Absent"
+    attendance_map = build_attendance_map(emp, year, month)
 
     return render(request, "employee_dashboard.html", {
         "emp": emp,
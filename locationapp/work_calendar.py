@@ -0,0 +1,139 @@
+import threading
+import time
+from calendar import monthrange
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from .models import Attendance, Employee, Holiday, WorkCalendar
+from .payroll_cache import payroll_cache
+from .summary import rebuild_monthly_summaries
+
+
+# ========================= WORKING-DAY CALENDAR =========================
+
+# Weekly day off (date.weekday()): Sunday
+WEEKLY_OFF = 6
+
+
+def _office_id(office):
+    return getattr(office, 'pk', office)
+
+
+def compute_month(year, month, office=None):
+    """Unsaved WorkCalendar of a month: every day but Sundays and the holidays (company-wide and the office's)"""
+    office_id = _office_id(office)
+    scope = Q(office__isnull=True)
+    if office_id is not None:
+        scope |= Q(office_id=office_id)
+    holidays = set(
+        Holiday.objects.filter(scope, date__year=year, date__month=month).values_list('date', flat=True)
+    )
+
+    working = holiday = 0
+    for day in range(1, monthrange(year, month)[1] + 1):
+        current = date(year, month, day)
+        if current in holidays:
+            holiday |= 1 << (day - 1)
+        elif current.weekday() != WEEKLY_OFF:
+            working |= 1 << (day - 1)
+    return WorkCalendar(
+        office_id=office_id, year=year, month=month,
+        working_day_bitmap=working, holiday_bitmap=holiday,
+        working_days=bin(working).count('1'), holidays=bin(holiday).count('1'),
+    )
+
+
+_calendars = {}
+_lock = threading.Lock()
+
+
+def month_calendar(year, month, office=None):
+    """
+    WorkCalendar of a month, from a per-process cache, else its stored row,
+    else computed and stored. Holiday changes drop the stored rows (signals);
+    other processes pick them up within WORK_CALENDAR_REFRESH_SECONDS.
+    """
+    key = (_office_id(office), year, month)
+    refresh = getattr(settings, 'WORK_CALENDAR_REFRESH_SECONDS', 300)
+    with _lock:
+        cached = _calendars.get(key)
+    if cached and time.monotonic() - cached[1] <= refresh:
+        return cached[0]
+
+    office_id, _, _ = key
+    calendar = WorkCalendar.objects.filter(office_id=office_id, year=year, month=month).first()
+    if calendar is None:
+        calendar = compute_month(year, month, office_id)
+        try:
+            with transaction.atomic():
+                calendar.save()
+        except IntegrityError:
+            pass  # stored meanwhile by another process: same content
+    with _lock:
+        _calendars[key] = (calendar, time.monotonic())
+    return calendar
+
+
+def invalidate_month(year, month):
+    """Forget every calendar (all offices) of a month, stored and cached"""
+    WorkCalendar.objects.filter(year=year, month=month).delete()
+    with _lock:
+        for key in [key for key in _calendars if key[1:] == (year, month)]:
+            del _calendars[key]
+
+
+def working_days_in_month(year, month, office=None):
+    """The working-day count every salary formula divides by"""
+    return month_calendar(year, month, office).working_days
+
+
+def is_holiday(day, office=None):
+    return month_calendar(day.year, day.month, office).is_holiday(day)
+
+
+def working_days(start, end, office=None):
+    """Working days of [start, end]"""
+    days = (start + timedelta(days=i) for i in range((end - start).days + 1))
+    return [day for day in days if month_calendar(day.year, day.month, office).is_working_day(day)]
+
+
+def refresh_holiday_flags(day):
+    """
+    Bring Attendance.is_holiday of one date in line with the Holiday rows
+    (a company-wide holiday covers every row, an office one the rows of
+    that office, or of its employees for rows without an office) and drop
+    the Absent rows materialized for a day that is now off. Rebuilds the monthly summaries of the employees whose rows
+    changed, since holiday hours count as overtime.
+    """
+    holidays = Holiday.objects.filter(date=day)
+    rows = Attendance.objects.filter(date=day)
+    if holidays.filter(office__isnull=True).exists():
+        on, off = rows, rows.none()
+    else:
+        office_ids = list(holidays.values_list('office_id', flat=True))
+        at_office = Q(office_id__in=office_ids) | Q(office__isnull=True, employee__office_id__in=office_ids)
+        on, off = rows.filter(at_office), rows.exclude(at_office)
+
+    turned_on, turned_off = on.filter(is_holiday=False), off.filter(is_holiday=True)
+    employee_ids = set(turned_on.values_list('employee_id', flat=True))
+    employee_ids |= set(turned_off.values_list('employee_id', flat=True))
+    turned_on.update(is_holiday=True)
+    turned_off.update(is_holiday=False)
+    # Signals of the delete keep the summaries and caches right
+    on.filter(status='Absent', check_in_time__isnull=True).delete()
+
+    if employee_ids:
+        # update() sends no signals
+        rebuild_monthly_summaries(Employee.objects.filter(pk__in=employee_ids), start=day, end=day)
+
+
+def holiday_changed(*days):
+    """A Holiday was added, moved or removed: recompute what depends on its day(s)"""
+    for day in set(days):
+        invalidate_month(day.year, day.month)
+        refresh_holiday_flags(day)
+    # Working-day counts feed every salary line of the month
+    payroll_cache.bump_all()
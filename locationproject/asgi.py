@@ -13,4 +13,24 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'locationproject.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported once the apps are loaded
+from locationapp.location_buffer import location_buffer  # noqa: E402
+
+
+async def application(scope, receive, send):
+    """
+    Django, plus the ASGI lifespan protocol: location pings still buffered
+    when the server shuts down are written before the process exits.
+    """
+    if scope['type'] != 'lifespan':
+        return await django_application(scope, receive, send)
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await location_buffer.astop()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
@@ -0,0 +1,33 @@
+"""
+The 'shared' cache (version stamps and permission generations seen by
+every worker process), picked with the SHARED_CACHE_URL environment
+variable:
+
+    redis://host:6379/0      Redis (needs redis-py)
+    memcached://host:11211   Memcached (needs pymemcache)
+    (unset)                  a database table, created by migrate
+
+The database fallback needs no extra server but turns every cache read
+into a query: an authenticated request then reads the employee version
+stamp and the permission snapshot from locationapp_shared_cache, and
+each stamp bump is a write. Fine for a single small server; use Redis
+or Memcached in production (check --deploy warns, locationapp.W002).
+"""
+import os
+
+SHARED_CACHE_TABLE = 'locationapp_shared_cache'
+
+
+def shared_cache_from_env(environ=os.environ):
+    """settings.CACHES['shared'] for the SHARED_CACHE_URL named in environ"""
+    url = environ.get('SHARED_CACHE_URL', '')
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': url}
+    if url.startswith('memcached://'):
+        return {
+            'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+            'LOCATION': url[len('memcached://'):],
+        }
+    if url:
+        raise ValueError(f"Unsupported SHARED_CACHE_URL {url!r}, expected redis://... or memcached://...")
+    return {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': SHARED_CACHE_TABLE}
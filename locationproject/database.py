@@ -0,0 +1,95 @@
+"""
+Database profiles, picked with the DB_PROFILE environment variable:
+
+    sqlite         (default) db.sqlite3 with a busy timeout and write
+                   transactions that take the lock up front; the file's
+                   journal mode is left as it is
+    sqlite-wal     the same in WAL mode, for many concurrent writers. WAL
+                   is recorded in the database file itself: every later
+                   connection (any profile) keeps using it until it is
+                   switched back with PRAGMA journal_mode=DELETE
+    sqlite-legacy  db.sqlite3 with SQLite's defaults (rollback journal)
+    postgres       PostgreSQL from DB_NAME, DB_USER, DB_PASSWORD, DB_HOST,
+                   DB_PORT; DB_POOL=1 for a psycopg connection pool,
+                   otherwise connections persist for DB_CONN_MAX_AGE seconds
+"""
+import os
+
+PROFILES = ('sqlite', 'sqlite-wal', 'sqlite-legacy', 'postgres')
+
+# Run on every new SQLite connection; they only last as long as it does
+SQLITE_TUNING = (
+    "PRAGMA temp_store=MEMORY;"
+    "PRAGMA cache_size=-20000"
+)
+
+# WAL lets readers work while one writer commits; synchronous=NORMAL is
+# durable across crashes in WAL mode and saves an fsync per commit. The
+# journal mode persists in the file, so it is only set when asked for.
+SQLITE_WAL = (
+    "PRAGMA journal_mode=WAL;"
+    "PRAGMA synchronous=NORMAL;"
+)
+
+
+def sqlite_database(path, tuned=True, wal=False, timeout=20):
+    if not tuned:
+        return {'ENGINE': 'django.db.backends.sqlite3', 'NAME': path}
+    return {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': path,
+        'OPTIONS': {
+            'init_command': (SQLITE_WAL if wal else '') + SQLITE_TUNING,
+            # Busy timeout: wait up to this many seconds for the write lock
+            'timeout': timeout,
+            # Take the write lock when the transaction starts: a deferred
+            # transaction that later needs it fails at once with
+            # "database is locked" instead of waiting
+            'transaction_mode': 'IMMEDIATE',
+        },
+    }
+
+
+def postgres_database(name, user='', password='', host='', port='', pool=False, pool_min=2, pool_max=20,
+                      conn_max_age=60):
+    database = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': name,
+        'USER': user,
+        'PASSWORD': password,
+        'HOST': host,
+        'PORT': port,
+        'CONN_HEALTH_CHECKS': True,
+    }
+    if pool:
+        # Django's psycopg 3 pool (needs psycopg[pool]); safe under ASGI,
+        # where persistent connections are not reused between requests
+        database['CONN_MAX_AGE'] = 0
+        database['OPTIONS'] = {'pool': {'min_size': pool_min, 'max_size': pool_max}}
+    else:
+        database['CONN_MAX_AGE'] = conn_max_age
+    return database
+
+
+def database_from_env(sqlite_path, environ=os.environ):
+    """settings.DATABASES['default'] of the DB_PROFILE named in environ"""
+    profile = environ.get('DB_PROFILE', 'sqlite').lower()
+    if profile in ('sqlite', 'sqlite-wal'):
+        return sqlite_database(
+            sqlite_path, wal=profile == 'sqlite-wal', timeout=float(environ.get('DB_SQLITE_TIMEOUT', 20)),
+        )
+    if profile == 'sqlite-legacy':
+        return sqlite_database(sqlite_path, tuned=False)
+    if profile == 'postgres':
+        return postgres_database(
+            environ.get('DB_NAME', 'attendance'),
+            user=environ.get('DB_USER', ''),
+            password=environ.get('DB_PASSWORD', ''),
+            host=environ.get('DB_HOST', ''),
+            port=environ.get('DB_PORT', ''),
+            pool=environ.get('DB_POOL', '') == '1',
+            pool_min=int(environ.get('DB_POOL_MIN', 2)),
+            pool_max=int(environ.get('DB_POOL_MAX', 20)),
+            conn_max_age=int(environ.get('DB_CONN_MAX_AGE', 60)),
+        )
+    raise ValueError(f"Unknown DB_PROFILE {profile!r}, expected one of {', '.join(PROFILES)}")
@@ -12,6 +12,9 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 
+from .caches import shared_cache_from_env
+from .database import database_from_env
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -46,6 +49,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'locationapp.middleware.EmployeeMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -76,12 +80,12 @@ WSGI_APPLICATION = 'locationproject.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
+# Profile chosen with the DB_PROFILE environment variable (see database.py):
+# SQLite with a busy timeout by default (DB_PROFILE=sqlite-wal for WAL mode,
+# which converts the database file), or PostgreSQL with persistent/pooled connections
 
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': database_from_env(BASE_DIR / 'db.sqlite3'),
 }
 
 
@@ -136,6 +140,78 @@ LOGIN_REDIRECT_URL = 'employee_dashboard'
 LOGOUT_REDIRECT_URL = 'login'
 LOGIN_URL = 'login'
 
+# Location pings are buffered in memory and written in batches every
+# LOCATION_FLUSH_INTERVAL seconds (0 = write every ping immediately). The
+# ASGI application writes what is left on shutdown (see asgi.py / wsgi.py)
+LOCATION_FLUSH_INTERVAL = 5
+LOCATION_FLUSH_MAX_PENDING = 2000
+
+# Every ping is also appended to the LocationPing history; compact_location_pings
+# downsamples it after LOCATION_HISTORY_DOWNSAMPLE_DAYS and deletes it after
+# LOCATION_HISTORY_RETENTION_DAYS
+LOCATION_HISTORY_ENABLED = True
+LOCATION_HISTORY_DOWNSAMPLE_DAYS = 7
+LOCATION_HISTORY_DOWNSAMPLE_MINUTES = 15
+LOCATION_HISTORY_RETENTION_DAYS = 90
+
+# Live presence feed (manager dashboard): ping events are sent at most every
+# PRESENCE_PING_EVENT_INTERVAL seconds per employee, and each worker re-reads
+# check-ins made by other workers every PRESENCE_RESYNC_SECONDS.
+# The feed streams only when served over ASGI (and PRESENCE_STREAMING is on);
+# otherwise the dashboard polls a snapshot every PRESENCE_POLL_SECONDS
+PRESENCE_PING_EVENT_INTERVAL = 30
+PRESENCE_RESYNC_SECONDS = 60
+PRESENCE_HISTORY = 500
+PRESENCE_STREAMING = True
+PRESENCE_POLL_SECONDS = 15
+
+# 'default' is per process. 'shared' is seen by every worker process;
+# version stamps and permission generations must live there, or a change
+# made in one worker stays invisible to the others. SHARED_CACHE_URL picks
+# Redis or Memcached (see caches.py). Without it 'shared' is a database
+# table: every authenticated request then pays a query for the employee
+# version stamp and one for the permission snapshot (check --deploy warns)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': shared_cache_from_env(),
+}
+
+# E_id -> employee lookups are cached per process (LRU of EMPLOYEE_CACHE_SIZE
+# entries, EMPLOYEE_CACHE_TTL seconds). Set EMPLOYEE_CACHE_SHARED_ALIAS to a
+# CACHES alias (e.g. a Redis cache) to share the entries between workers.
+EMPLOYEE_CACHE_SIZE = 10000
+EMPLOYEE_CACHE_TTL = 300
+EMPLOYEE_CACHE_SHARED_ALIAS = None
+
+# request.employee is kept in the session, stamped with a version held in
+# this shared cache and bumped whenever the employee is saved
+EMPLOYEE_SESSION_CACHE_ALIAS = 'shared'
+EMPLOYEE_SESSION_MAX_AGE = 300
+
+# Per-user permission snapshots (bitmask of Employee.Meta.permissions) are
+# cached in this shared cache and dropped when group/permission membership changes
+PERMISSION_CACHE_ALIAS = 'shared'
+PERMISSION_CACHE_TTL = 300
+
+# Salary results are cached per process (LRU of PAYROLL_CACHE_SIZE entries)
+# under data version stamps kept in this shared cache, bumped on attendance,
+# salary adjustment and payroll run changes
+PAYROLL_CACHE_SIZE = 20000
+PAYROLL_CACHE_VERSION_ALIAS = 'shared'
+
+# Bulk employee import (manager page): processes hashing the passwords
+EMPLOYEE_IMPORT_WORKERS = 4
+
+# close_stale_sessions (run with --interval to keep it running) auto checks
+# out sessions whose employee sent no location ping for this many minutes
+STALE_SESSION_MINUTES = 30
+
+# Working-day calendars (Sundays and Holiday rows off) are cached per process
+# and re-read from WorkCalendar after this many seconds
+WORK_CALENDAR_REFRESH_SECONDS = 300
+
 CSRF_TRUSTED_ORIGINS = [
     "http://127.0.0.1:8000",
     "http://localhost:8000",
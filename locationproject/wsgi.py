@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'locationproject.settings')
 
 application = get_wsgi_application()
+
+# WSGI has no shutdown event: call locationapp.location_buffer.location_buffer.stop()
+# from the server's worker exit hook (gunicorn: worker_exit in gunicorn.conf.py) to
+# write the location pings still buffered when a worker stops.